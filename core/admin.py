@@ -1,5 +1,6 @@
 from django.contrib import admin
-from .models import HomePage, InformationPage, ContactInfo, SiteSettings
+from django.utils import timezone
+from .models import HomePage, InformationPage, ContactInfo, SiteSettings, OutboxEmail
 
 
 @admin.register(SiteSettings)
@@ -77,3 +78,28 @@ class ContactInfoAdmin(admin.ModelAdmin):
     def has_delete_permission(self, request, obj=None):
         # Don't allow deletion
         return False
+
+
+@admin.register(OutboxEmail)
+class OutboxEmailAdmin(admin.ModelAdmin):
+    list_display = ['subject', 'kind', 'status', 'attempts', 'created_at', 'sent_at']
+    list_filter = ['status', 'kind', 'created_at']
+    search_fields = ['subject', 'recipients']
+    readonly_fields = [
+        'subject', 'body', 'from_email', 'recipients', 'kind', 'status', 'attempts',
+        'last_error', 'next_attempt_at', 'sent_at', 'created_at',
+    ]
+    exclude = ['claimed_by', 'claimed_until']
+    actions = ['retry_now']
+
+    def has_add_permission(self, request):
+        # Emails are queued by the application
+        return False
+
+    @admin.action(description="Retry selected emails now")
+    def retry_now(self, request, queryset):
+        # A fresh set of attempts, or emails that used theirs up fail again at once
+        count = queryset.exclude(status='sent').update(
+            status='pending', attempts=0, next_attempt_at=timezone.now(), claimed_by='', claimed_until=None
+        )
+        self.message_user(request, f"{count} email(s) queued for another attempt.")
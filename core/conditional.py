@@ -0,0 +1,119 @@
+# Conditional GET for pages built from a handful of rows.
+#
+# A page's ETag is a hash of the newest updated_at and row count of every
+# queryset it renders, fetched together in one query, plus the site-wide
+# singletons (already cached in-process) and a token that changes when
+# templates are deployed. A matching If-None-Match gets a 304 before any
+# object is loaded or template rendered.
+import functools
+import hashlib
+import os
+
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.db import connection
+from django.db.models import F
+from django.template.utils import get_app_template_dirs
+from django.utils.cache import get_conditional_response, patch_cache_control
+
+from .models import ContactInfo, SiteSettings
+
+
+def latest_changes(*sources):
+    """
+    [(newest value, row count)] for each (queryset, field) source, in one query.
+
+    Only the aggregated column is read; no model instances are built.
+    """
+    if not sources:
+        return []
+    # One aggregate row per source, so each queryset is scanned once
+    selects, params = [], []
+    for index, (queryset, field) in enumerate(sources):
+        sql, query_params = queryset.order_by().values(v=F(field)).query.sql_with_params()
+        selects.append(f"SELECT {index}, MAX(v), COUNT(*) FROM ({sql}) s{index}")
+        params.extend(query_params)
+    with connection.cursor() as cursor:
+        cursor.execute(" UNION ALL ".join(selects), params)
+        rows = sorted(cursor.fetchall())
+    return [(newest, count) for index, newest, count in rows]
+
+
+@functools.lru_cache(maxsize=None)
+def release_token():
+    """Changes whenever template files change, so a deploy invalidates ETags"""
+    newest = 0
+    dirs = [str(d) for engine in settings.TEMPLATES for d in engine.get('DIRS', [])]
+    dirs.extend(str(d) for d in get_app_template_dirs('templates'))
+    for directory in dirs:
+        for root, _, files in os.walk(directory):
+            for name in files:
+                newest = max(newest, os.stat(os.path.join(root, name)).st_mtime_ns)
+    return f"{getattr(settings, 'ETAG_VERSION', '')}:{newest}"
+
+
+def site_state():
+    """Site-wide content shown on every page (logo, footer contact details)"""
+    site_settings, contact = SiteSettings.load(), ContactInfo.load()
+    return [site_settings.pk, site_settings.updated_at, contact.pk, contact.updated_at]
+
+
+def make_etag(*parts):
+    raw = repr([release_token(), site_state(), *parts])
+    return '"%s"' % hashlib.sha1(raw.encode()).hexdigest()
+
+
+def conditional_allowed(request):
+    """
+    Whether a request may be answered from the client's copy.
+
+    Staff see admin-only links and users with pending messages would lose
+    them, so both always get a fresh render.
+    """
+    if request.method not in ('GET', 'HEAD'):
+        return False
+    if getattr(request, 'user', None) is not None and request.user.is_staff:
+        return False
+    return len(get_messages(request)) == 0
+
+
+def not_modified(request, etag):
+    """A 304 response if the client already has this version, else None"""
+    response = get_conditional_response(request, etag=etag)
+    if response is not None:
+        set_validators(response, etag)
+    return response
+
+
+def set_validators(response, etag):
+    """Attach the ETag to a full response"""
+    response['ETag'] = etag
+    # Let browsers keep the page but check back every time
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def conditional_page(etag_func):
+    """
+    Decorate a view with an ETag validator.
+
+    ``etag_func(request, *args, **kwargs)`` returns the ETag, or None to
+    skip validation (e.g. when the object does not exist).
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if not conditional_allowed(request):
+                return view(request, *args, **kwargs)
+            etag = etag_func(request, *args, **kwargs)
+            if etag is None:
+                return view(request, *args, **kwargs)
+            response = not_modified(request, etag)
+            if response is not None:
+                return response
+            response = view(request, *args, **kwargs)
+            if response.status_code == 200:
+                set_validators(response, etag)
+            return response
+        return wrapper
+    return decorator
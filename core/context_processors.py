@@ -1,9 +1,15 @@
+from django.utils.functional import SimpleLazyObject
 from .models import ContactInfo, SiteSettings
 
 
 def contact_info(request):
-    """Make contact info available to all templates"""
+    """
+    Make contact info available to all templates.
+
+    The objects are only loaded when a template actually reads them, and are
+    then memoized for the rest of the request.
+    """
     return {
-        'contact_info': ContactInfo.load(),
-        'site_settings': SiteSettings.load()
+        'contact_info': SimpleLazyObject(ContactInfo.load),
+        'site_settings': SimpleLazyObject(SiteSettings.load),
     }
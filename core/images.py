@@ -0,0 +1,206 @@
+# Resized copies of uploaded images.
+#
+# Every image in IMAGE_FIELDS gets one file per width in
+# IMAGE_VARIANT_WIDTHS, in its own format and as WebP, stored next to the
+# original under a variants/ folder:
+#
+#     products/chair.jpg -> products/variants/chair-jpg-320w.jpg
+#                           products/variants/chair-jpg-320w.webp
+#
+# Widths larger than the original are skipped; the original's own width is
+# added instead. Variants are written after an upload is saved
+# (core.signals) and for existing media by the generate_image_variants
+# command, which record the widths written in the cache so rendering never
+# touches storage. Templates use the {% responsive_image %} tag to offer
+# them through srcset.
+import hashlib
+import logging
+import os
+import re
+from io import BytesIO
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+# (model label, field name) of every image that gets variants
+IMAGE_FIELDS = [
+    ('products.Product', 'main_image'),
+    ('products.ProductImage', 'image'),
+    ('products.Category', 'image'),
+    ('services.Service', 'image'),
+    ('core.HomePage', 'hero_image'),
+]
+
+DEFAULT_WIDTHS = (160, 320, 640, 1200)
+
+# Pillow format for each original extension that gets variants (animated
+# GIFs and other formats are always served as uploaded)
+_FORMATS = {'.jpg': 'JPEG', '.jpeg': 'JPEG', '.png': 'PNG', '.webp': 'WEBP'}
+_EXTENSIONS = {'JPEG': '.jpg', 'PNG': '.png', 'WEBP': '.webp'}
+
+
+def variant_widths():
+    return tuple(getattr(settings, 'IMAGE_VARIANT_WIDTHS', DEFAULT_WIDTHS))
+
+
+def _original_format(name):
+    return _FORMATS.get(os.path.splitext(name)[1].lower())
+
+
+def supports_variants(name):
+    return _original_format(name) is not None
+
+
+def _variant_prefix(name):
+    """(variants folder, file name prefix) shared by every variant of name"""
+    directory, filename = os.path.split(name)
+    stem, extension = os.path.splitext(filename)
+    # The original extension keeps chair.jpg and chair.png apart
+    return os.path.join(directory, 'variants').replace(os.sep, '/'), f"{stem}-{extension[1:].lower()}-"
+
+
+def variant_name(name, width, webp=False):
+    """Storage name of one variant of the image stored as name"""
+    directory, prefix = _variant_prefix(name)
+    extension = '.webp' if webp else _EXTENSIONS[_original_format(name)]
+    return f"{directory}/{prefix}{width}w{extension}"
+
+
+def target_widths(original_width):
+    """Variant widths for an image original_width pixels wide"""
+    widths = [width for width in variant_widths() if width < original_width]
+    if original_width <= max(variant_widths()):
+        widths.append(original_width)
+    return widths
+
+
+def _cache_key(name):
+    return 'image_variants:%s' % hashlib.sha1(name.encode()).hexdigest()
+
+
+def _variant_pattern(name, webp_only=False):
+    """Matches exactly the variant file names of name, capturing the width"""
+    prefix = _variant_prefix(name)[1]
+    extensions = ['webp'] if webp_only else ['webp', _EXTENSIONS[_original_format(name)][1:]]
+    return re.compile(re.escape(prefix) + r'(\d+)w\.(?:%s)$' % '|'.join(map(re.escape, extensions)))
+
+
+def _stored_widths(name, storage):
+    directory = _variant_prefix(name)[0]
+    pattern = _variant_pattern(name, webp_only=True)
+    try:
+        files = storage.listdir(directory)[1]
+    except (FileNotFoundError, NotImplementedError):
+        return []
+    return sorted(int(match.group(1)) for match in map(pattern.match, files) if match)
+
+
+def stored_widths(name, storage=default_storage):
+    """
+    Widths of the variants generated for name, smallest first.
+
+    Read from the cache entry written at generation time; storage is only
+    listed when that entry is missing (e.g. after a cache flush).
+    """
+    if not supports_variants(name):
+        return []
+    key = _cache_key(name)
+    widths = cache.get(key)
+    if widths is None:
+        widths = _stored_widths(name, storage)
+        # Re-check missing variants now and then in case another process made them
+        cache.set(key, widths, None if widths else 10 * 60)
+    return widths
+
+
+def has_variants(name, storage=default_storage):
+    """Whether the variants of name have been generated"""
+    return bool(stored_widths(name, storage))
+
+
+def forget_variants(name):
+    """Drop the recorded widths of name so the next lookup re-reads storage"""
+    cache.delete(_cache_key(name))
+
+
+def delete_variants(name, storage=default_storage):
+    """Remove every variant of name, e.g. after the image was replaced"""
+    if not supports_variants(name):
+        return
+    directory = _variant_prefix(name)[0]
+    pattern = _variant_pattern(name)
+    try:
+        files = storage.listdir(directory)[1]
+    except (FileNotFoundError, NotImplementedError):
+        files = []
+    for filename in files:
+        # Anchored, so chair.jpg does not take chair-jpg-x.jpg's variants along
+        if pattern.match(filename):
+            storage.delete(f"{directory}/{filename}")
+    forget_variants(name)
+
+
+def _encode(image, image_format):
+    if image_format == 'JPEG' and image.mode not in ('RGB', 'L'):
+        image = image.convert('RGB')
+    buffer = BytesIO()
+    options = {'quality': getattr(settings, 'IMAGE_VARIANT_QUALITY', 82)}
+    if image_format == 'PNG':
+        options = {'optimize': True}
+    image.save(buffer, image_format, **options)
+    return buffer.getvalue()
+
+
+def generate_variants(name, storage=default_storage, force=False):
+    """
+    Write every target width of name in its own format and as WebP.
+
+    Images are never enlarged. Returns the number of files written.
+    """
+    if not supports_variants(name) or (not force and has_variants(name, storage)):
+        return 0
+
+    with storage.open(name, 'rb') as original:
+        image = ImageOps.exif_transpose(Image.open(original))
+        image.load()
+    if image.mode == 'P':
+        image = image.convert('RGBA')
+
+    image_format = _original_format(name)
+    widths = target_widths(image.width)
+    written = 0
+    for width in widths:
+        resized = image
+        if image.width > width:
+            resized = image.resize((width, max(1, round(image.height * width / image.width))), Image.LANCZOS)
+        for webp, target_format in ((False, image_format), (True, 'WEBP')):
+            target = variant_name(name, width, webp)
+            if storage.exists(target):
+                storage.delete(target)
+            storage.save(target, ContentFile(_encode(resized, target_format)))
+            written += 1
+    cache.set(_cache_key(name), widths, None)
+    return written
+
+
+def generate_variants_safely(name):
+    """generate_variants for callers that must not fail on a bad upload"""
+    try:
+        return generate_variants(name)
+    except FileNotFoundError:
+        return 0
+    except Exception as e:
+        logger.error(f"Could not create image variants for {name}: {str(e)}")
+        return 0
+
+
+def srcset(name, webp=False):
+    """srcset value listing every variant of name"""
+    return ', '.join(
+        f"{default_storage.url(variant_name(name, width, webp))} {width}w" for width in stored_widths(name)
+    )
@@ -0,0 +1,50 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from core.images import IMAGE_FIELDS, forget_variants, generate_variants
+
+
+def _generate(name, force):
+    try:
+        return name, generate_variants(name, force=force), None
+    except Exception as e:
+        return name, 0, str(e)
+
+
+class Command(BaseCommand):
+    help = "Create resized and WebP variants for every uploaded product, category, service and hero image"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help="Regenerate variants that already exist")
+        parser.add_argument('--workers', type=int, default=os.cpu_count(), help="Number of worker processes")
+
+    def handle(self, *args, **options):
+        names = set()
+        for label, field_name in IMAGE_FIELDS:
+            model = apps.get_model(label)
+            names.update(
+                model.objects.exclude(**{field_name: ''}).exclude(**{f'{field_name}__isnull': True})
+                .values_list(field_name, flat=True)
+            )
+
+        # Workers only touch media files; don't hand them our database connection
+        connections.close_all()
+        written = failed = 0
+        with ProcessPoolExecutor(max_workers=options['workers'], initializer=django.setup) as pool:
+            results = pool.map(_generate, sorted(names), [options['force']] * len(names), chunksize=8)
+            for name, count, error in results:
+                if error:
+                    failed += 1
+                    self.stderr.write(f"{name}: {error}")
+                written += count
+                # Recorded by the worker; make sure this process's cache re-reads it
+                forget_variants(name)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Checked {len(names)} images, wrote {written} variant files, {failed} failed"
+        ))
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from core import page_cache, search
+from core.models import HomePage, InformationPage
+from core.richtext import rebuild_rich_text
+from products.models import Product
+from services.models import Service
+
+RICH_TEXT_MODELS = (Product, Service, HomePage, InformationPage)
+
+
+class Command(BaseCommand):
+    help = "Recompute the sanitized HTML, plain text and excerpts derived from rich text fields"
+
+    def handle(self, *args, **options):
+        for model in RICH_TEXT_MODELS:
+            count = rebuild_rich_text(model.objects.all(), model.RICH_TEXT_FIELDS)
+            # Rows were bulk updated, so no save signals fired
+            page_cache.purge_tag(model._meta.label)
+            self.stdout.write(f"{model._meta.verbose_name_plural}: {count}")
+        if search.search_enabled():
+            search.rebuild_index()
+        self.stdout.write(self.style.SUCCESS("Rich text rebuilt"))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core import search
+
+
+class Command(BaseCommand):
+    help = "Rebuild the full-text search index for products and services"
+
+    def handle(self, *args, **options):
+        if not search.search_enabled():
+            raise CommandError("The full-text search index is only available on SQLite.")
+        count = search.rebuild_index()
+        self.stdout.write(self.style.SUCCESS(f"Indexed {count} products and services"))
@@ -0,0 +1,23 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.outbox import drain
+
+
+class Command(BaseCommand):
+    help = "Deliver queued outgoing emails (RFQ and form notifications)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=50, help="Emails sent per SMTP connection")
+        parser.add_argument('--loop', action='store_true', help="Keep running and poll for new emails")
+        parser.add_argument('--interval', type=float, default=10, help="Seconds between polls with --loop")
+
+    def handle(self, *args, **options):
+        while True:
+            sent, failed = drain(options['batch_size'])
+            if sent or failed:
+                self.stdout.write(f"Sent {sent} emails, {failed} failed")
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
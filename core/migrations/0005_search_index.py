@@ -0,0 +1,68 @@
+import html
+import re
+
+from django.db import migrations
+from django.utils.html import strip_tags
+
+CREATE_INDEX = """
+CREATE VIRTUAL TABLE IF NOT EXISTS core_search_index USING fts5(
+    kind UNINDEXED,
+    object_id UNINDEXED,
+    title,
+    body,
+    tokenize = 'unicode61 remove_diacritics 2',
+    prefix = '2 3'
+)
+"""
+
+
+def plain_text(*parts):
+    text = " ".join(html.unescape(strip_tags(part or "")) for part in parts)
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    Product = apps.get_model("products", "Product")
+    Service = apps.get_model("services", "Service")
+    rows = [
+        (
+            "product",
+            p.pk,
+            p.name,
+            plain_text(
+                p.sku, p.company, p.short_description, p.description, p.specifications
+            ),
+        )
+        for p in Product.objects.filter(is_active=True)
+    ] + [
+        ("service", s.pk, s.title, plain_text(s.short_description, s.description))
+        for s in Service.objects.filter(is_active=True)
+    ]
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(CREATE_INDEX)
+        cursor.executemany(
+            "INSERT INTO core_search_index (kind, object_id, title, body) "
+            "VALUES (%s, %s, %s, %s)",
+            rows,
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    schema_editor.execute("DROP TABLE IF EXISTS core_search_index")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0004_sitesettings"),
+        ("products", "0006_category_product_counts"),
+        ("services", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
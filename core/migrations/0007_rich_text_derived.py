@@ -0,0 +1,66 @@
+# Generated by Django 4.2.30 on 2026-10-18 08:59
+
+from django.db import migrations, models
+
+from core.richtext import rebuild_rich_text
+
+
+def fill_rich_text(apps, schema_editor):
+    rebuild_rich_text(apps.get_model("core", "HomePage").objects.all(), ("content", "welcome_section"))
+    rebuild_rich_text(apps.get_model("core", "InformationPage").objects.all(), ("content", "mission", "vision"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0006_outboxemail"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="homepage",
+            name="body_text",
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name="homepage",
+            name="content_html",
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name="homepage",
+            name="excerpt",
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name="homepage",
+            name="welcome_section_html",
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name="informationpage",
+            name="body_text",
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name="informationpage",
+            name="content_html",
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name="informationpage",
+            name="excerpt",
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name="informationpage",
+            name="mission_html",
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name="informationpage",
+            name="vision_html",
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.RunPython(fill_rich_text, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-18 09:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0007_rich_text_derived"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="contactinfo",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
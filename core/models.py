@@ -1,5 +1,8 @@
 from django.db import models
+from django.utils import timezone
 from ckeditor.fields import RichTextField
+from .richtext import update_rich_text
+from .singletons import load_singleton
 
 
 class SiteSettings(models.Model):
@@ -31,17 +34,23 @@ class SiteSettings(models.Model):
 
     @classmethod
     def load(cls):
-        obj, created = cls.objects.get_or_create(pk=1)
-        return obj
+        return load_singleton(cls)
 
 
 class HomePage(models.Model):
     """Model for managing homepage content"""
+    RICH_TEXT_FIELDS = ('content', 'welcome_section')
+
     title = models.CharField(max_length=200, default="Welcome to KiyaGreen")
     subtitle = models.CharField(max_length=300, blank=True, default="Your trusted partner for eco-friendly and sustainable solutions")
     hero_image = models.ImageField(upload_to='homepage/', blank=True, null=True)
     content = RichTextField(blank=True)
     welcome_section = RichTextField(blank=True)
+    # Derived from the fields above on save (core.richtext)
+    content_html = models.TextField(blank=True, editable=False)
+    welcome_section_html = models.TextField(blank=True, editable=False)
+    body_text = models.TextField(blank=True, editable=False)
+    excerpt = models.TextField(blank=True, editable=False)
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -56,20 +65,28 @@ class HomePage(models.Model):
     def save(self, *args, **kwargs):
         # Single instance model
         self.pk = 1
+        kwargs['update_fields'] = update_rich_text(self, kwargs.get('update_fields'))
         super().save(*args, **kwargs)
 
     @classmethod
     def load(cls):
-        obj, created = cls.objects.get_or_create(pk=1)
-        return obj
+        return load_singleton(cls)
 
 
 class InformationPage(models.Model):
     """Model for Information/About Us page"""
+    RICH_TEXT_FIELDS = ('content', 'mission', 'vision')
+
     title = models.CharField(max_length=200, default="About Us")
     content = RichTextField()
     mission = RichTextField(blank=True, help_text="Mission statement")
     vision = RichTextField(blank=True, help_text="Vision statement")
+    # Derived from the fields above on save (core.richtext)
+    content_html = models.TextField(blank=True, editable=False)
+    mission_html = models.TextField(blank=True, editable=False)
+    vision_html = models.TextField(blank=True, editable=False)
+    body_text = models.TextField(blank=True, editable=False)
+    excerpt = models.TextField(blank=True, editable=False)
     image = models.ImageField(upload_to='information/', blank=True, null=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -83,12 +100,12 @@ class InformationPage(models.Model):
     def save(self, *args, **kwargs):
         # Single instance model
         self.pk = 1
+        kwargs['update_fields'] = update_rich_text(self, kwargs.get('update_fields'))
         super().save(*args, **kwargs)
 
     @classmethod
     def load(cls):
-        obj, created = cls.objects.get_or_create(pk=1)
-        return obj
+        return load_singleton(cls)
 
 
 class ContactInfo(models.Model):
@@ -100,6 +117,7 @@ class ContactInfo(models.Model):
     wechat_qr = models.ImageField(upload_to='contact/', blank=True, null=True, help_text="WeChat QR code image")
     working_hours = models.CharField(max_length=200, blank=True)
     map_embed = models.TextField(blank=True, help_text="Google Maps embed code")
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         verbose_name = "Contact Information"
@@ -115,5 +133,42 @@ class ContactInfo(models.Model):
 
     @classmethod
     def load(cls):
-        obj, created = cls.objects.get_or_create(pk=1)
-        return obj
+        return load_singleton(cls)
+
+
+class OutboxEmail(models.Model):
+    """Outgoing email queued in the sender's transaction and delivered by core.outbox"""
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    ]
+
+    subject = models.CharField(max_length=300)
+    body = models.TextField()
+    from_email = models.CharField(max_length=254)
+    recipients = models.JSONField(default=list)
+    kind = models.CharField(max_length=50, blank=True, help_text="What triggered the email, e.g. rfq_confirmation")
+
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    # Set by the worker that is currently delivering this row
+    claimed_by = models.CharField(max_length=32, blank=True)
+    claimed_until = models.DateTimeField(null=True, blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Outgoing Email"
+        verbose_name_plural = "Outgoing Emails"
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='outbox_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} → {', '.join(self.recipients)}"
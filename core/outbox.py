@@ -0,0 +1,166 @@
+import logging
+import threading
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import OutboxEmail
+
+logger = logging.getLogger(__name__)
+
+_worker_lock = threading.Lock()
+_worker_thread = None
+# Set by start_worker_thread() while a worker runs, so the worker makes
+# another pass for emails committed after its last claim
+_worker_woken = False
+
+
+def queue_email(subject, body, recipients, from_email=None, kind=''):
+    """
+    Queue an email for delivery.
+
+    The row is written in the caller's transaction, so it only exists if the
+    surrounding change is committed. Delivery happens outside the request,
+    either in a background thread started after commit or by the
+    send_queued_email command, depending on EMAIL_OUTBOX_WORKER.
+    """
+    email = OutboxEmail.objects.create(
+        subject=subject,
+        body=body,
+        from_email=from_email or getattr(settings, "DEFAULT_FROM_EMAIL", "noreply@kyagreen.com"),
+        recipients=list(recipients),
+        kind=kind,
+    )
+    if getattr(settings, 'EMAIL_OUTBOX_WORKER', 'thread') == 'thread':
+        transaction.on_commit(start_worker_thread)
+    return email
+
+
+def retry_delay(attempts):
+    """Exponential backoff after the given number of failed attempts"""
+    base = getattr(settings, 'EMAIL_OUTBOX_RETRY_DELAY', 60)
+    return timedelta(seconds=min(base * 2 ** (attempts - 1), 6 * 60 * 60))
+
+
+def _claim_batch(batch_size, now):
+    """Reserve up to batch_size due emails for this worker and return them"""
+    token = uuid.uuid4().hex
+    lease = timedelta(seconds=getattr(settings, 'EMAIL_OUTBOX_CLAIM_SECONDS', 300))
+    due = (
+        OutboxEmail.objects.filter(status='pending', next_attempt_at__lte=now)
+        .filter(Q(claimed_until__isnull=True) | Q(claimed_until__lt=now))
+        .order_by('next_attempt_at', 'pk')
+        .values_list('pk', flat=True)[:batch_size]
+    )
+    OutboxEmail.objects.filter(pk__in=list(due)).filter(
+        Q(claimed_until__isnull=True) | Q(claimed_until__lt=now)
+    ).update(claimed_by=token, claimed_until=now + lease)
+    return list(OutboxEmail.objects.filter(claimed_by=token).order_by('pk'))
+
+
+def send_queued(batch_size=50):
+    """
+    Deliver one batch of due emails over a single connection.
+
+    Returns (sent, failed) counts. Failures are retried with exponential
+    backoff until EMAIL_OUTBOX_MAX_ATTEMPTS, then marked failed.
+    """
+    now = timezone.now()
+    emails = _claim_batch(batch_size, now)
+    if not emails:
+        return 0, 0
+
+    max_attempts = getattr(settings, 'EMAIL_OUTBOX_MAX_ATTEMPTS', 5)
+    sent = failed = 0
+    connection = get_connection(fail_silently=False)
+    try:
+        connection.open()
+        for email in emails:
+            message = EmailMessage(
+                email.subject, email.body, email.from_email, email.recipients, connection=connection,
+            )
+            email.attempts += 1
+            email.claimed_by = ''
+            email.claimed_until = None
+            try:
+                message.send()
+            except Exception as e:
+                email.last_error = str(e)
+                if email.attempts >= max_attempts:
+                    email.status = 'failed'
+                else:
+                    email.next_attempt_at = timezone.now() + retry_delay(email.attempts)
+                failed += 1
+                logger.error(f"Failed to send queued email {email.pk} to {email.recipients}: {str(e)}")
+            else:
+                email.status = 'sent'
+                email.sent_at = timezone.now()
+                email.last_error = ''
+                sent += 1
+    except Exception as e:
+        # Could not connect at all: retry the whole batch later
+        for email in emails:
+            if email.status == 'pending' and email.claimed_by:
+                email.attempts += 1
+                email.claimed_by = ''
+                email.claimed_until = None
+                email.last_error = str(e)
+                email.next_attempt_at = timezone.now() + retry_delay(email.attempts)
+                failed += 1
+        logger.error(f"Could not open email connection: {str(e)}")
+    finally:
+        connection.close()
+
+    OutboxEmail.objects.bulk_update(
+        emails,
+        ['status', 'attempts', 'last_error', 'next_attempt_at', 'sent_at', 'claimed_by', 'claimed_until'],
+    )
+    return sent, failed
+
+
+def drain(batch_size=50):
+    """Send batches until nothing is due; returns total (sent, failed)"""
+    total_sent = total_failed = 0
+    while True:
+        sent, failed = send_queued(batch_size)
+        total_sent += sent
+        total_failed += failed
+        if not sent and not failed:
+            return total_sent, total_failed
+
+
+def _run_worker():
+    global _worker_thread, _worker_woken
+    try:
+        while True:
+            with _worker_lock:
+                _worker_woken = False
+            drain()
+            with _worker_lock:
+                if not _worker_woken:
+                    # Anything queued from here on starts a new worker
+                    _worker_thread = None
+                    return
+    except Exception:
+        logger.exception("Email outbox worker stopped")
+        with _worker_lock:
+            _worker_thread = None
+    finally:
+        # Database connections are per thread; don't leak this one
+        connections.close_all()
+
+
+def start_worker_thread():
+    """Start a background thread that drains the outbox, or wake the running one"""
+    global _worker_thread, _worker_woken
+    with _worker_lock:
+        if _worker_thread is not None:
+            _worker_woken = True
+            return
+        _worker_thread = threading.Thread(target=_run_worker, name='email-outbox', daemon=True)
+        _worker_thread.start()
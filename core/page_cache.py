@@ -0,0 +1,145 @@
+# Full-page cache for anonymous GET requests.
+#
+# Each cached page records the version of every model ("tag") it was built
+# from. Saving or deleting a row bumps its model's version (core.signals),
+# which makes exactly the pages that used that model stale; everything else
+# stays cached. A stale or expired page is still served to other visitors
+# for up to PAGE_CACHE_STALE_TIMEOUT seconds while one request, holding a
+# short lock, renders the replacement, so a purge never sends every
+# concurrent visitor to the database at once.
+import functools
+import hashlib
+import time
+import uuid
+
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse
+
+# Shown on every page through base.html
+SITE_TAGS = ('core.SiteSettings', 'core.ContactInfo')
+
+_TAG_KEY = 'pagecache:tag:%s'
+_PAGE_KEY = 'pagecache:page:%s'
+_LOCK_KEY = 'pagecache:lock:%s'
+
+
+def tag_versions(tags):
+    """Current version of each tag, creating missing ones"""
+    keys = {tag: _TAG_KEY % tag for tag in tags}
+    found = cache.get_many(keys.values())
+    versions = {}
+    for tag, key in keys.items():
+        version = found.get(key)
+        if version is None:
+            version = uuid.uuid4().hex
+            cache.add(key, version, None)
+            version = cache.get(key, version)
+        versions[tag] = version
+    return versions
+
+
+def purge_tag(tag):
+    """Mark every page built from tag as stale, now and once the write commits"""
+    def _bump():
+        cache.set(_TAG_KEY % tag, uuid.uuid4().hex, None)
+
+    # Bumping again after commit stops a render that read the old rows
+    # from being stored under the new version
+    _bump()
+    transaction.on_commit(_bump)
+
+
+def _cacheable_request(request, query):
+    if request.method not in ('GET', 'HEAD'):
+        return False
+    # Unknown parameters would only fill the cache with copies of one page
+    if not set(request.GET).issubset(query):
+        return False
+    if getattr(request, 'user', None) is not None and request.user.is_authenticated:
+        return False
+    return len(get_messages(request)) == 0
+
+
+def _cacheable_response(request, response):
+    return (
+        response.status_code == 200
+        and not response.streaming
+        and not response.cookies
+        and not request.META.get('CSRF_COOKIE_NEEDS_UPDATE')
+    )
+
+
+def _page_key(request):
+    params = sorted(request.GET.lists())
+    return _PAGE_KEY % hashlib.sha1(f"{request.path}?{params}".encode()).hexdigest()
+
+
+def _to_response(entry, state):
+    response = HttpResponse(entry['content'], status=entry['status'], content_type=entry['content_type'])
+    response['X-Page-Cache'] = state
+    return response
+
+
+def _store(key, response, versions):
+    timeout = getattr(settings, 'PAGE_CACHE_TIMEOUT', 300)
+    cache.set(key, {
+        'content': response.content,
+        'status': response.status_code,
+        'content_type': response['Content-Type'],
+        'versions': versions,
+        'expires': time.time() + timeout,
+    }, timeout + getattr(settings, 'PAGE_CACHE_STALE_TIMEOUT', 60))
+
+
+def cached_page(*tags, query=()):
+    """
+    Cache a view's output for anonymous visitors, tagged with the models it reads.
+
+    ``tags`` are model labels such as 'products.Product'; the site-wide
+    models in SITE_TAGS are always included. ``query`` names the GET
+    parameters the page depends on; requests carrying any other parameter
+    are not cached.
+    """
+    tags = tuple(dict.fromkeys(tags + SITE_TAGS))
+
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if not _cacheable_request(request, query):
+                return view(request, *args, **kwargs)
+
+            key = _page_key(request)
+            lock_key = _LOCK_KEY % key
+            lock_timeout = getattr(settings, 'PAGE_CACHE_LOCK_TIMEOUT', 30)
+            versions = tag_versions(tags)
+            entry = cache.get(key)
+
+            if entry is not None:
+                if entry['versions'] == versions and entry['expires'] > time.time():
+                    return _to_response(entry, 'hit')
+                if not cache.add(lock_key, 1, lock_timeout):
+                    # Someone else is already rebuilding this page
+                    return _to_response(entry, 'stale')
+            elif not cache.add(lock_key, 1, lock_timeout):
+                # First render in progress elsewhere: wait briefly for it
+                deadline = time.time() + getattr(settings, 'PAGE_CACHE_WAIT', 2)
+                while time.time() < deadline:
+                    time.sleep(0.05)
+                    entry = cache.get(key)
+                    if entry is not None:
+                        return _to_response(entry, 'hit')
+                return view(request, *args, **kwargs)
+
+            try:
+                response = view(request, *args, **kwargs)
+                if _cacheable_response(request, response):
+                    _store(key, response, versions)
+                    response['X-Page-Cache'] = 'miss'
+                return response
+            finally:
+                cache.delete(lock_key)
+        return wrapper
+    return decorator
@@ -0,0 +1,183 @@
+# On-demand resizing for /img/<w>x<h>/<fmt>/<path> (see core.views.resized_image).
+#
+# Results are written once to a disk cache named after a hash of the source
+# file's identity (path, size, mtime) and the requested variant, so a
+# replaced source gets a new entry and a new ETag. Only sizes listed in
+# IMAGE_RESIZE_SIZES are served, which bounds the work and disk space an
+# anonymous client can cause.
+import hashlib
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.storage import default_storage
+from django.urls import reverse
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+try:
+    import fcntl
+except ImportError:  # Windows: coalesce within the process only
+    fcntl = None
+
+FORMATS = {'webp': 'WEBP', 'jpeg': 'JPEG', 'png': 'PNG'}
+CONTENT_TYPES = {'webp': 'image/webp', 'jpeg': 'image/jpeg', 'png': 'image/png'}
+SOURCE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.webp', '.gif')
+
+DEFAULT_SIZES = [(60, 60), (160, 160), (320, 0), (640, 0), (1200, 0)]
+
+_locks = {}
+_locks_guard = threading.Lock()
+
+
+class ResizeError(Exception):
+    """The request cannot be served (unknown size, format or source)"""
+
+
+def allowed_sizes():
+    return {tuple(size) for size in getattr(settings, 'IMAGE_RESIZE_SIZES', DEFAULT_SIZES)}
+
+
+def cache_dir():
+    return str(getattr(settings, 'IMAGE_RESIZE_CACHE_DIR', os.path.join(settings.MEDIA_ROOT, 'resized')))
+
+
+def source_path(name):
+    """Absolute path of a media file, refusing anything outside MEDIA_ROOT"""
+    if not name.lower().endswith(SOURCE_EXTENSIONS):
+        raise ResizeError("Unsupported source file")
+    try:
+        path = default_storage.path(name)
+    except (SuspiciousFileOperation, NotImplementedError):
+        raise ResizeError("Invalid source path")
+    if os.path.commonpath([path, cache_dir()]) == cache_dir():
+        raise ResizeError("Invalid source path")
+    if not os.path.isfile(path):
+        raise ResizeError("Source not found")
+    return path
+
+
+def variant_key(name, width, height, fmt):
+    """
+    Content address of one variant: changes when the source file changes.
+
+    Uses the source's size and mtime rather than hashing its bytes, so a
+    cache hit costs one stat.
+    """
+    if (width, height) not in allowed_sizes():
+        raise ResizeError("Size not allowed")
+    if fmt not in FORMATS:
+        raise ResizeError("Format not allowed")
+    stat = os.stat(source_path(name))
+    raw = f"{name}|{stat.st_size}|{stat.st_mtime_ns}|{width}x{height}|{fmt}"
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def cached_path(key, fmt):
+    return os.path.join(cache_dir(), key[:2], f"{key}.{fmt}")
+
+
+@contextmanager
+def _single_flight(key, path):
+    """Hold the lock for one variant, across threads and (with fcntl) processes"""
+    with _locks_guard:
+        lock = _locks.setdefault(key, threading.Lock())
+    with lock:
+        if fcntl is None:
+            yield
+        else:
+            lock_path = f"{path}.lock"
+            with open(lock_path, 'w') as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    # Anyone still waiting on this file re-checks for the
+                    # result once they get the lock; later requests find it
+                    # before locking, so the file can go
+                    try:
+                        os.unlink(lock_path)
+                    except FileNotFoundError:
+                        pass
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+    with _locks_guard:
+        if _locks.get(key) is lock and not lock.locked():
+            del _locks[key]
+
+
+def _open(name):
+    try:
+        image = Image.open(source_path(name))
+        image.load()
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError):
+        raise ResizeError("Source is not a readable image")
+    return image
+
+
+def _render(name, width, height, fmt, path):
+    with _open(name) as image:
+        image = ImageOps.exif_transpose(image)
+        box = (width, height or image.height)
+        image.thumbnail(box, Image.LANCZOS)  # never enlarges
+        if fmt == 'jpeg' and image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+        elif image.mode == 'P':
+            image = image.convert('RGBA')
+
+        handle, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        try:
+            with os.fdopen(handle, 'wb') as output:
+                options = {} if fmt == 'png' else {'quality': getattr(settings, 'IMAGE_VARIANT_QUALITY', 82)}
+                image.save(output, FORMATS[fmt], **options)
+            # Readers only ever see complete files
+            os.replace(temp_path, path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+
+
+def get_resized(name, width, height, fmt):
+    """
+    Return (path, key) of the resized file, creating it on first request.
+
+    Concurrent requests for the same missing variant wait for the first one
+    instead of each resizing the image.
+    """
+    key = variant_key(name, width, height, fmt)
+    path = cached_path(key, fmt)
+    if os.path.exists(path):
+        return path, key
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with _single_flight(key, path):
+        if not os.path.exists(path):
+            _render(name, width, height, fmt, path)
+    return path, key
+
+
+def resized_url(name, width, height=0, fmt='webp'):
+    """URL of the /img/ endpoint for a media file"""
+    return reverse('resized_image', kwargs={'width': width, 'height': height, 'fmt': fmt, 'path': name})
+
+
+def responsive_attributes(name, width=None):
+    """
+    src and srcset pointing at resized WebP copies of a media image.
+
+    Offers every width-only size in IMAGE_RESIZE_SIZES up to ``width`` (the
+    width the image is displayed at, when known). Returns None when the
+    file cannot be resized.
+    """
+    if not name.lower().endswith(SOURCE_EXTENSIONS) or not default_storage.exists(name):
+        return None
+    widths = sorted(w for w, h in allowed_sizes() if h == 0)
+    if width:
+        widths = [w for w in widths if w < width] + [w for w in widths if w >= width][:1]
+    if not widths:
+        return None
+    return {
+        'src': resized_url(name, widths[-1]),
+        'srcset': ', '.join(f"{resized_url(name, w)} {w}w" for w in widths),
+    }
@@ -0,0 +1,203 @@
+# Derived copies of CKEditor (RichTextField) content.
+#
+# Models list their rich text fields in RICH_TEXT_FIELDS and call
+# update_rich_text() from save(). Each field gets a sanitized "<field>_html"
+# copy for templates; the model also gets "body_text" (all fields as plain
+# text, for search) and "excerpt" (the first EXCERPT_WORDS words, for
+# summaries and meta descriptions). Images uploaded through the editor are
+# pointed at the /img/ resize endpoint (core.resize). `rebuild_rich_text`
+# refreshes existing rows after the rules below change.
+import html
+import re
+from html.parser import HTMLParser
+from urllib.parse import unquote, urlsplit
+
+from django.conf import settings
+from django.utils.html import strip_tags
+from django.utils.text import Truncator
+
+from .resize import responsive_attributes
+
+EXCERPT_WORDS = 30
+
+# Tags CKEditor produces; anything else is dropped but its text kept
+ALLOWED_TAGS = {
+    'a', 'abbr', 'b', 'blockquote', 'br', 'caption', 'cite', 'code', 'dd', 'div', 'dl', 'dt',
+    'em', 'figcaption', 'figure', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'hr', 'i', 'img', 'li',
+    'ol', 'p', 'pre', 'q', 's', 'small', 'span', 'strike', 'strong', 'sub', 'sup', 'table',
+    'tbody', 'td', 'tfoot', 'th', 'thead', 'tr', 'u', 'ul',
+}
+# Dropped together with everything inside them
+DROPPED_TAGS = {'script', 'style', 'iframe', 'object', 'embed', 'noscript', 'template', 'textarea', 'select'}
+VOID_TAGS = {'br', 'hr', 'img'}
+
+GLOBAL_ATTRIBUTES = {'class', 'style', 'title', 'dir', 'lang', 'align'}
+ALLOWED_ATTRIBUTES = {
+    'a': {'href', 'target', 'rel', 'name'},
+    'img': {'src', 'alt', 'width', 'height', 'loading', 'decoding'},
+    'td': {'colspan', 'rowspan', 'valign'},
+    'th': {'colspan', 'rowspan', 'valign', 'scope'},
+    'table': {'border', 'cellpadding', 'cellspacing', 'summary', 'width'},
+    'ol': {'start', 'type'},
+}
+URL_ATTRIBUTES = {'href', 'src'}
+_SAFE_URL = re.compile(r'^(?:https?:|mailto:|tel:|/|#|\.|\?|[^:/?#]*(?:[/?#]|$))', re.IGNORECASE)
+_STYLE_WIDTH = re.compile(r'(?:^|;)\s*width\s*:\s*(\d+)px', re.IGNORECASE)
+
+
+def _resized_image(attributes):
+    """Serve an editor image from the resize endpoint, sized for how it is shown"""
+    src = urlsplit(attributes.get('src', ''))
+    if src.scheme or src.netloc or not src.path.startswith(settings.MEDIA_URL):
+        return
+    width = attributes.get('width', '')
+    if not width.isdigit():
+        match = _STYLE_WIDTH.search(attributes.get('style', ''))
+        width = match.group(1) if match else ''
+    width = int(width) if width else None
+    resized = responsive_attributes(unquote(src.path[len(settings.MEDIA_URL):]), width)
+    if resized:
+        attributes.update(resized)
+        attributes['sizes'] = f"(max-width: {width}px) 100vw, {width}px" if width else '100vw'
+
+
+class _Sanitizer(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.out = []
+        self.open_tags = []
+        self.dropping = 0
+
+    def _attributes(self, tag, attrs):
+        allowed = GLOBAL_ATTRIBUTES | ALLOWED_ATTRIBUTES.get(tag, set())
+        kept = {}
+        for name, value in attrs:
+            value = value or ''
+            if name not in allowed:
+                continue
+            if name in URL_ATTRIBUTES and not _SAFE_URL.match(re.sub(r'[\s\x00-\x1f]', '', value)):
+                continue
+            if name == 'style' and re.search(r'expression|url\s*\(|javascript:', value, re.IGNORECASE):
+                continue
+            kept[name] = value
+        if tag == 'img':
+            _resized_image(kept)
+            kept.setdefault('loading', 'lazy')
+            kept.setdefault('decoding', 'async')
+        if tag == 'a' and kept.get('target') == '_blank':
+            kept['rel'] = 'noopener noreferrer'
+        return ''.join(f' {name}="{html.escape(value)}"' for name, value in kept.items())
+
+    def handle_starttag(self, tag, attrs):
+        if tag in DROPPED_TAGS:
+            self.dropping += 1
+        elif not self.dropping and tag in ALLOWED_TAGS:
+            self.out.append(f'<{tag}{self._attributes(tag, attrs)}>')
+            if tag not in VOID_TAGS:
+                self.open_tags.append(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        if tag in DROPPED_TAGS:
+            return
+        self.handle_starttag(tag, attrs)
+        if tag not in VOID_TAGS:
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag):
+        if tag in DROPPED_TAGS:
+            self.dropping = max(self.dropping - 1, 0)
+        elif not self.dropping and tag in self.open_tags:
+            # Close anything left open inside this element first
+            while self.open_tags:
+                open_tag = self.open_tags.pop()
+                self.out.append(f'</{open_tag}>')
+                if open_tag == tag:
+                    break
+
+    def handle_data(self, data):
+        if not self.dropping:
+            self.out.append(html.escape(data, quote=False))
+
+    def result(self):
+        self.close()
+        self.out.extend(f'</{tag}>' for tag in reversed(self.open_tags))
+        return ''.join(self.out)
+
+
+def sanitize_html(value):
+    """
+    Editor HTML reduced to an allowlist of tags and attributes.
+
+    Scripts, event handlers and javascript: URLs are removed. Images load
+    lazily and, when they are local uploads, from resized copies.
+    """
+    if not value:
+        return ''
+    parser = _Sanitizer()
+    parser.feed(value)
+    return parser.result()
+
+
+def plain_text(*parts):
+    """Join rich text fragments into plain searchable text"""
+    text = ' '.join(html.unescape(strip_tags(part or '')) for part in parts)
+    return re.sub(r'\s+', ' ', text).strip()
+
+
+def excerpt(text, words=EXCERPT_WORDS):
+    """The first words of plain text, with an ellipsis if it was cut"""
+    return Truncator(text).words(words)
+
+
+def derived_values(sources):
+    """Derived column values for a {field name: editor HTML} mapping"""
+    values = {f'{name}_html': sanitize_html(value) for name, value in sources.items()}
+    # From the sanitized copies, so script and style contents are left out
+    values['body_text'] = plain_text(*values.values())
+    values['excerpt'] = excerpt(values['body_text'])
+    return values
+
+
+def update_rich_text(instance, update_fields=None):
+    """
+    Refresh an instance's derived rich text columns before it is saved.
+
+    Returns the update_fields to pass on to Model.save(): unchanged when
+    none of the rich text fields are being saved, otherwise extended with
+    the derived columns.
+    """
+    fields = instance.RICH_TEXT_FIELDS
+    if update_fields is not None and not set(fields).intersection(update_fields):
+        return update_fields
+    values = derived_values({name: getattr(instance, name) for name in fields})
+    for name, value in values.items():
+        setattr(instance, name, value)
+    if update_fields is None:
+        return None
+    return list(dict.fromkeys([*update_fields, *values]))
+
+
+def rebuild_rich_text(queryset, fields, batch_size=200):
+    """
+    Recompute the derived columns of every row in queryset.
+
+    Takes the field names explicitly so migrations can pass historical
+    models. updated_at is left alone. Returns the number of rows.
+    """
+    batch = []
+    count = 0
+    derived = None
+    for obj in queryset.order_by('pk').iterator(chunk_size=batch_size):
+        values = derived_values({name: getattr(obj, name) for name in fields})
+        for name, value in values.items():
+            setattr(obj, name, value)
+        derived = list(values)
+        batch.append(obj)
+        if len(batch) >= batch_size:
+            queryset.model.objects.bulk_update(batch, derived)
+            count += len(batch)
+            batch = []
+    if batch:
+        queryset.model.objects.bulk_update(batch, derived)
+        count += len(batch)
+    return count
@@ -0,0 +1,167 @@
+# Full-text search over products and services.
+#
+# On SQLite the text lives in the core_search_index FTS5 table, kept in sync
+# by the receivers in core.signals and rebuilt with `rebuild_search_index`.
+# Other databases fall back to icontains filtering.
+import re
+
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from products.models import Product
+from services.models import Service
+
+from .richtext import plain_text
+
+INDEX_TABLE = 'core_search_index'
+
+PRODUCT = 'product'
+SERVICE = 'service'
+
+# Column weights for bm25(): kind, object_id, title, body
+RANK = f"bm25({INDEX_TABLE}, 0.0, 0.0, 10.0, 1.0)"
+
+# Control characters wrap snippet highlights so they survive HTML escaping
+_MARK_START = '\x02'
+_MARK_END = '\x03'
+
+
+def search_enabled():
+    """Whether the FTS5 index is available on this database"""
+    return connection.vendor == 'sqlite'
+
+
+def product_document(product):
+    return product.name, plain_text(product.sku, product.company, product.short_description, product.body_text)
+
+
+def service_document(service):
+    return service.title, plain_text(service.short_description, service.body_text)
+
+
+def match_expression(query):
+    """
+    Turn user input into an FTS5 MATCH expression.
+
+    Every word must match; the last one is treated as a prefix so results
+    appear while the user is still typing. Returns '' when there is nothing
+    to search for.
+    """
+    terms = re.findall(r'\w+', query.lower())
+    if not terms:
+        return ''
+    quoted = [f'"{term}"' for term in terms]
+    quoted[-1] += '*'
+    return ' '.join(quoted)
+
+
+def _write(kind, object_id, document):
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {INDEX_TABLE} WHERE kind = %s AND object_id = %s", [kind, object_id])
+        if document is not None:
+            cursor.execute(
+                f"INSERT INTO {INDEX_TABLE} (kind, object_id, title, body) VALUES (%s, %s, %s, %s)",
+                [kind, object_id, *document],
+            )
+
+
+def index_product(product):
+    """Add, refresh or drop a product's index entry"""
+    if search_enabled():
+        _write(PRODUCT, product.pk, product_document(product) if product.is_active else None)
+
+
+def index_service(service):
+    """Add, refresh or drop a service's index entry"""
+    if search_enabled():
+        _write(SERVICE, service.pk, service_document(service) if service.is_active else None)
+
+
+def remove_from_index(kind, object_id):
+    if search_enabled():
+        _write(kind, object_id, None)
+
+
+def rebuild_index():
+    """Re-index every active product and service, returning the number of rows"""
+    rows = [
+        (PRODUCT, product.pk, *product_document(product))
+        for product in Product.objects.filter(is_active=True).iterator()
+    ] + [
+        (SERVICE, service.pk, *service_document(service))
+        for service in Service.objects.filter(is_active=True).iterator()
+    ]
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {INDEX_TABLE}")
+        cursor.executemany(
+            f"INSERT INTO {INDEX_TABLE} (kind, object_id, title, body) VALUES (%s, %s, %s, %s)",
+            rows,
+        )
+    return len(rows)
+
+
+def _highlight(snippet):
+    return mark_safe(escape(snippet).replace(_MARK_START, '<mark>').replace(_MARK_END, '</mark>'))
+
+
+def _ranked(kind, model, query, limit):
+    """Objects of model matching query, best first, with search_snippet set"""
+    expression = match_expression(query)
+    if not expression:
+        return []
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT object_id, snippet({INDEX_TABLE}, 3, %s, %s, '…', 12) "
+            f"FROM {INDEX_TABLE} WHERE {INDEX_TABLE} MATCH %s AND kind = %s "
+            f"ORDER BY {RANK} LIMIT %s",
+            [_MARK_START, _MARK_END, expression, kind, limit],
+        )
+        hits = cursor.fetchall()
+
+    objects = model.objects.filter(is_active=True).in_bulk([int(object_id) for object_id, snippet in hits])
+    results = []
+    for object_id, snippet in hits:
+        obj = objects.get(int(object_id))
+        if obj is not None:
+            obj.search_snippet = _highlight(snippet)
+            results.append(obj)
+    return results
+
+
+def search_products(query, limit=12):
+    """Active products matching query, best match first"""
+    if search_enabled():
+        return _ranked(PRODUCT, Product, query, limit)
+    return list(filter_products(Product.objects.filter(is_active=True), query).distinct()[:limit])
+
+
+def search_services(query, limit=12):
+    """Active services matching query, best match first"""
+    if search_enabled():
+        return _ranked(SERVICE, Service, query, limit)
+    return list(Service.objects.filter(is_active=True).filter(
+        Q(title__icontains=query) |
+        Q(short_description__icontains=query) |
+        Q(body_text__icontains=query)
+    ).distinct()[:limit])
+
+
+def filter_products(queryset, query):
+    """Narrow a product queryset to matches for query without changing its ordering"""
+    if not search_enabled():
+        return queryset.filter(
+            Q(name__icontains=query) |
+            Q(short_description__icontains=query) |
+            Q(body_text__icontains=query) |
+            Q(sku__icontains=query)
+        )
+    expression = match_expression(query)
+    if not expression:
+        return queryset.none()
+    return queryset.filter(pk__in=RawSQL(
+        f"SELECT object_id FROM {INDEX_TABLE} WHERE {INDEX_TABLE} MATCH %s AND kind = %s",
+        [expression, PRODUCT],
+    ))
@@ -0,0 +1,111 @@
+from collections import defaultdict
+from functools import partial
+
+from django.apps import apps
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from products.models import Product
+from services.models import Service
+
+from . import page_cache, search
+from .images import IMAGE_FIELDS, delete_variants, generate_variants_safely, has_variants
+from .models import ContactInfo, HomePage, InformationPage, SiteSettings
+from .singletons import invalidate_singleton
+
+SINGLETON_MODELS = (SiteSettings, HomePage, InformationPage, ContactInfo)
+
+# Models read by views wrapped in core.page_cache.cached_page
+PAGE_CACHE_MODELS = (
+    'core.SiteSettings', 'core.ContactInfo', 'core.HomePage', 'core.InformationPage',
+    'products.Product', 'products.Category', 'products.ProductImage', 'products.ProductAttribute',
+    'services.Service', 'services.ServiceFeature', 'rfq.RFQRequest',
+)
+
+# Product columns copied into the full-text search index; a save that
+# writes none of them keeps the product's existing entry
+SEARCHABLE_PRODUCT_FIELDS = {
+    'name', 'sku', 'company', 'short_description', 'description', 'specifications', 'is_active',
+}
+
+
+def invalidate_singleton_cache(sender, **kwargs):
+    """Drop cached copies of a single-instance model when it changes."""
+    invalidate_singleton(sender)
+
+
+for model in SINGLETON_MODELS:
+    post_save.connect(invalidate_singleton_cache, sender=model)
+    post_delete.connect(invalidate_singleton_cache, sender=model)
+
+
+def purge_cached_pages(sender, **kwargs):
+    """Mark the cached pages built from this model as stale."""
+    page_cache.purge_tag(sender._meta.label)
+
+
+for label in PAGE_CACHE_MODELS:
+    post_save.connect(purge_cached_pages, sender=apps.get_model(label))
+    post_delete.connect(purge_cached_pages, sender=apps.get_model(label))
+
+
+@receiver(post_save, sender=Product)
+def index_saved_product(sender, instance, **kwargs):
+    """Keep the product's search index entry in step with the row."""
+    if kwargs.get('update_fields') and not SEARCHABLE_PRODUCT_FIELDS.intersection(kwargs['update_fields']):
+        return
+    search.index_product(instance)
+
+
+@receiver(post_delete, sender=Product)
+def unindex_deleted_product(sender, instance, **kwargs):
+    search.remove_from_index(search.PRODUCT, instance.pk)
+
+
+@receiver(post_save, sender=Service)
+def index_saved_service(sender, instance, **kwargs):
+    """Keep the service's search index entry in step with the row."""
+    search.index_service(instance)
+
+
+@receiver(post_delete, sender=Service)
+def unindex_deleted_service(sender, instance, **kwargs):
+    search.remove_from_index(search.SERVICE, instance.pk)
+
+
+IMAGE_FIELD_NAMES = defaultdict(list)
+for label, field_name in IMAGE_FIELDS:
+    IMAGE_FIELD_NAMES[apps.get_model(label)].append(field_name)
+
+
+def remember_stored_images(sender, instance, **kwargs):
+    """Note the image names being replaced, so their variants can be removed."""
+    instance._stored_image_names = {}
+    update_fields = kwargs.get('update_fields')
+    fields = [name for name in IMAGE_FIELD_NAMES[sender] if not update_fields or name in update_fields]
+    if instance.pk is None or not fields:
+        return
+    row = sender.objects.filter(pk=instance.pk).values(*fields).first()
+    if row is not None:
+        instance._stored_image_names = row
+
+
+def create_image_variants(sender, instance, **kwargs):
+    """Resize newly uploaded images once the upload is committed."""
+    update_fields = kwargs.get('update_fields')
+    stored = getattr(instance, '_stored_image_names', {})
+    for field_name in IMAGE_FIELD_NAMES[sender]:
+        if update_fields and field_name not in update_fields:
+            continue
+        name = getattr(instance, field_name).name
+        old_name = stored.get(field_name)
+        if old_name and old_name != name:
+            transaction.on_commit(partial(delete_variants, old_name))
+        if name and not has_variants(name):
+            transaction.on_commit(partial(generate_variants_safely, name))
+
+
+for model in IMAGE_FIELD_NAMES:
+    pre_save.connect(remember_stored_images, sender=model)
+    post_save.connect(create_image_variants, sender=model)
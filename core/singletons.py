@@ -0,0 +1,91 @@
+import copy
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+# Per-process copies of the single-row models, keyed by cache key.
+# Each entry is (expires_at, instance).
+_local_cache = {}
+_lock = threading.Lock()
+
+
+def _cache_key(model):
+    return f"singleton:{model._meta.label_lower}:1"
+
+
+def _version_key(model):
+    return f"{_cache_key(model)}:version"
+
+
+def _shared_key(model):
+    """
+    Shared cache key for the current version of a singleton.
+
+    invalidate_singleton() moves to a new version, so a reader that loaded
+    the old row just before an edit stores it under a key nobody reads.
+    """
+    version_key = _version_key(model)
+    version = cache.get(version_key)
+    if version is None:
+        cache.add(version_key, uuid.uuid4().hex, None)
+        version = cache.get(version_key)
+    return f"{_cache_key(model)}:{version}"
+
+
+def load_singleton(model):
+    """
+    Return the pk=1 row of a single-instance model.
+
+    Reads go through an in-process copy first, then the shared cache, and only
+    hit the database (get_or_create) when both tiers are cold. The in-process
+    copy lives for SINGLETON_LOCAL_TTL seconds so that other workers pick up
+    changes from the shared cache shortly after an edit.
+
+    Every call gets its own copy, so a caller that changes the instance
+    (e.g. before saving it) does not change what other requests see.
+    """
+    key = _cache_key(model)
+    now = time.monotonic()
+
+    entry = _local_cache.get(key)
+    if entry is not None and entry[0] > now:
+        return copy.copy(entry[1])
+
+    shared_key = _shared_key(model)
+    obj = cache.get(shared_key)
+    if obj is None:
+        obj, created = model.objects.get_or_create(pk=1)
+        if created:
+            # Saving the new row moved the version; this copy is the current one
+            shared_key = _shared_key(model)
+        cache.add(shared_key, obj, getattr(settings, 'SINGLETON_CACHE_TIMEOUT', None))
+
+    local_ttl = getattr(settings, 'SINGLETON_LOCAL_TTL', 5)
+    with _lock:
+        _local_cache[key] = (now + local_ttl, obj)
+    return copy.copy(obj)
+
+
+def invalidate_singleton(model):
+    """Drop a single-instance model from both cache tiers."""
+    key = _cache_key(model)
+
+    def _clear():
+        with _lock:
+            _local_cache.pop(key, None)
+        cache.set(_version_key(model), uuid.uuid4().hex, None)
+
+    # Clear now for this process, and again once the write is committed so
+    # anything a concurrent reader cached from the old row is left behind.
+    _clear()
+    transaction.on_commit(_clear)
+
+
+def clear_local_singletons():
+    """Forget every in-process copy (used by tests)."""
+    with _lock:
+        _local_cache.clear()
@@ -0,0 +1,79 @@
+# Static files storage used by collectstatic when STATIC_PIPELINE is on.
+#
+# On top of Django's manifest storage (content-hashed names, so files can be
+# cached for a year), it minifies our own CSS/JS before hashing and writes
+# .gz and .br copies of every text asset next to it for core.views.static_file
+# (or the web server) to hand out according to Accept-Encoding.
+import gzip
+import logging
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.base import ContentFile
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import rcssmin
+    import rjsmin
+except ImportError:
+    rcssmin = rjsmin = None
+
+logger = logging.getLogger(__name__)
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    minify_extensions = ('.css', '.js')
+    compress_extensions = ('.css', '.js', '.svg', '.json', '.txt', '.html', '.xml', '.ttf', '.eot', '.ico')
+    # Below this size compression saves less than the extra headers cost
+    compress_min_size = 512
+
+    def post_process(self, paths, dry_run=False, **options):
+        if not dry_run:
+            # Hash the minified copies rather than the finders' originals
+            paths = {**paths, **{name: (self, name) for name in self._minify(paths)}}
+        yield from super().post_process(paths, dry_run, **options)
+        if not dry_run:
+            names = set(paths) | set(self.hashed_files.values())
+            for name in sorted(names):
+                if name.endswith(self.compress_extensions):
+                    self._compress(name)
+
+    def _minify(self, paths):
+        """Minify collected CSS/JS in place; returns the names rewritten"""
+        if rcssmin is None:
+            logger.warning("rcssmin/rjsmin not installed; static CSS and JS are not minified")
+            return []
+        minified_names = []
+        for name in paths:
+            if not name.endswith(self.minify_extensions) or '.min.' in name:
+                continue
+            with self.open(name) as original:
+                content = original.read().decode('utf-8')
+            if name.endswith('.css'):
+                minified = rcssmin.cssmin(content, keep_bang_comments=True)
+            else:
+                minified = rjsmin.jsmin(content, keep_bang_comments=True)
+            self.delete(name)
+            self._save(name, ContentFile(minified.encode('utf-8')))
+            minified_names.append(name)
+        return minified_names
+
+    def _compress(self, name):
+        if not self.exists(name):
+            return
+        with self.open(name) as original:
+            content = original.read()
+        if len(content) < self.compress_min_size:
+            return
+        encoders = [('.gz', lambda data: gzip.compress(data, compresslevel=9, mtime=0))]
+        if brotli is not None:
+            encoders.append(('.br', lambda data: brotli.compress(data, quality=11)))
+        for suffix, encode in encoders:
+            compressed = encode(content)
+            if len(compressed) < len(content):
+                if self.exists(name + suffix):
+                    self.delete(name + suffix)
+                self._save(name + suffix, ContentFile(compressed))
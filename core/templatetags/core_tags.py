@@ -1,5 +1,11 @@
 from django import template
+from django.utils.html import format_html, format_html_join
+from django.utils.safestring import mark_safe
+from core.images import has_variants, srcset
+from core.resize import resized_url
 from core.models import ContactInfo
+from products.cards import render_cards
+from products.models import Category
 
 register = template.Library()
 
@@ -13,7 +19,49 @@ def get_contact_info():
 @register.inclusion_tag('products/category_tree.html')
 def render_category_tree(categories, selected_category=None):
     """Recursively render category tree with all nested levels"""
+    # Load every active category in one query and keep the requested roots
+    root_ids = {category.pk for category in categories}
+    nodes = [node for node in Category.tree(Category.objects.filter(is_active=True)) if node.pk in root_ids]
     return {
         'categories': categories,
+        'nodes': nodes,
         'selected_category': selected_category,
     }
+
+
+@register.simple_tag
+def responsive_image(image, sizes='100vw', alt='', **attrs):
+    """
+    Render an uploaded image as a <picture> offering WebP and resized variants.
+
+    ``sizes`` tells the browser how wide the image is displayed so it can
+    pick the smallest suitable file. Extra keyword arguments (class, style,
+    loading, ...) become <img> attributes; images load lazily unless
+    loading="eager" is passed. Falls back to the original file when no
+    variants exist yet.
+    """
+    if not image:
+        return ''
+    attrs.setdefault('loading', 'lazy')
+    extra = format_html_join('', ' {}="{}"', attrs.items())
+    if not has_variants(image.name):
+        return format_html('<img src="{}" alt="{}"{}>', image.url, alt, extra)
+    return format_html(
+        '<picture><source type="image/webp" srcset="{}" sizes="{}">'
+        '<img src="{}" srcset="{}" sizes="{}" alt="{}"{}></picture>',
+        srcset(image.name, webp=True), sizes, image.url, srcset(image.name), sizes, alt, extra,
+    )
+
+
+@register.simple_tag
+def resized_image_url(image, width, height=0, fmt='webp'):
+    """URL of an uploaded image resized on demand, e.g. {% resized_image_url image 320 %}"""
+    if not image:
+        return ''
+    return resized_url(getattr(image, 'name', image), width, height, fmt)
+
+
+@register.simple_tag
+def product_cards(products, variant):
+    """Render a card for each product, reusing cached cards that are still current"""
+    return mark_safe(''.join(render_cards(products, variant)))
@@ -0,0 +1,18 @@
+# Email backends shared by the apps' tests; not used outside the test suite.
+from django.core.mail.backends.locmem import EmailBackend as LocmemEmailBackend
+
+
+class CountingEmailBackend(LocmemEmailBackend):
+    """Locmem backend that counts how many connections are opened"""
+    opened = 0
+
+    def open(self):
+        CountingEmailBackend.opened += 1
+        return super().open()
+
+
+class FailingEmailBackend(LocmemEmailBackend):
+    """Backend that rejects every message"""
+
+    def send_messages(self, messages):
+        raise ConnectionRefusedError("SMTP server unavailable")
@@ -1,7 +1,39 @@
-from django.test import TestCase, Client
+import gzip
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from unittest import mock
+from io import BytesIO, StringIO
+
+from django.contrib import admin
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.http import Http404
+from django.core.management import call_command
+from django.utils import timezone
+from django.db import connection
+from django.core import mail
+from django.test import RequestFactory, TestCase, Client, override_settings
+from django.urls import reverse
 from django.template import Template, Context
 from products.models import Category, Product
+from PIL import Image
+from services.models import Service
+from core.models import ContactInfo, InformationPage, OutboxEmail, SiteSettings
+from rfq.models import RFQRequest
+from core import images, outbox, page_cache, resize, search, singletons, storage
+from core.admin import OutboxEmailAdmin
+from core.conditional import latest_changes
+from core.context_processors import contact_info
+from core.views import static_file
+from core.richtext import sanitize_html
+from core.singletons import clear_local_singletons
 from core.templatetags.core_tags import render_category_tree
+from core.testing import CountingEmailBackend
 
 
 class RenderCategoryTreeTagTest(TestCase):
@@ -96,3 +128,724 @@ class GetContactInfoTagTest(TestCase):
         # Should not raise an exception
         result = template.render(Context({}))
         self.assertIsNotNone(result)
+
+
+class SingletonCacheTest(TestCase):
+    """Tests for the cached single-instance model loader"""
+
+    def setUp(self):
+        cache.clear()
+        clear_local_singletons()
+
+    def tearDown(self):
+        cache.clear()
+        clear_local_singletons()
+
+    def test_load_is_served_from_cache_after_first_call(self):
+        """Test that repeated loads do not query the database"""
+        ContactInfo.load()
+        with self.assertNumQueries(0):
+            ContactInfo.load()
+
+    def test_shared_cache_serves_other_processes(self):
+        """Test that a cold in-process cache falls back to the shared cache"""
+        SiteSettings.load()
+        clear_local_singletons()
+        with self.assertNumQueries(0):
+            SiteSettings.load()
+
+    def test_save_invalidates_cache(self):
+        """Test that saving a singleton makes the next load see the change"""
+        contact = ContactInfo.load()
+        contact.phone = "+86 123"
+        contact.save()
+        self.assertEqual(ContactInfo.load().phone, "+86 123")
+
+    def test_late_write_of_old_row_is_ignored(self):
+        """Test that a reader caching the old row after an edit does not serve it"""
+        contact = ContactInfo.load()
+        stale_key = singletons._shared_key(ContactInfo)
+        stale = ContactInfo.objects.get(pk=1)
+        with self.captureOnCommitCallbacks(execute=True):
+            contact.phone = "+86 456"
+            contact.save()
+        # The slow reader finishes after the writer invalidated the cache
+        cache.set(stale_key, stale)
+        clear_local_singletons()
+        self.assertEqual(ContactInfo.load().phone, "+86 456")
+
+    def test_unsaved_changes_stay_private(self):
+        """Test that changing a loaded instance does not leak to other callers"""
+        contact = ContactInfo.load()
+        original = contact.phone
+        contact.phone = "+86 999"
+        self.assertEqual(ContactInfo.load().phone, original)
+
+    def test_context_processor_uses_cache(self):
+        """Test that rendering a page twice does not reload the singletons"""
+        client = Client()
+        client.get('/contact/')
+        ContactInfo.objects.filter(pk=1).update(phone="changed")
+        response = client.get('/contact/')
+        self.assertNotEqual(response.context['contact_info'].phone, "changed")
+
+
+class ContactInfoContextProcessorTest(TestCase):
+    """Tests for the lazy contact_info context processor"""
+
+    def setUp(self):
+        cache.clear()
+        clear_local_singletons()
+
+    def tearDown(self):
+        cache.clear()
+        clear_local_singletons()
+
+    def test_nothing_loaded_until_read(self):
+        """Test that the context processor itself runs no queries"""
+        with self.assertNumQueries(0):
+            contact_info(None)
+
+    def test_attribute_access_loads_object(self):
+        """Test that reading an attribute loads the underlying object"""
+        context = contact_info(None)
+        self.assertEqual(context['contact_info'].pk, 1)
+        self.assertFalse(context['site_settings'].has_logo())
+
+
+class FullTextSearchTest(TestCase):
+    """Tests for the FTS5 product and service search index"""
+
+    def setUp(self):
+        """Create test data"""
+        self.client = Client()
+        self.product = Product.objects.create(
+            name="Bamboo Toothbrush",
+            sku="BT-100",
+            description="<p>Biodegradable <strong>handle</strong> &amp; soft bristles</p>",
+            main_image="test.jpg",
+        )
+        self.other = Product.objects.create(
+            name="Steel Bottle",
+            sku="SB-200",
+            description="<p>Keeps drinks cold, no bamboo inside</p>",
+            main_image="test.jpg",
+        )
+        self.service = Service.objects.create(
+            title="Bamboo Sourcing",
+            short_description="Find bamboo suppliers",
+            description="<p>Factory audits</p>",
+        )
+
+    def test_saved_rows_are_searchable(self):
+        """Test that products and services are indexed on save"""
+        self.assertEqual(search.search_products("toothbrush"), [self.product])
+        self.assertEqual(search.search_services("audits"), [self.service])
+
+    def test_title_matches_rank_first(self):
+        """Test that BM25 ranks title matches above body matches"""
+        self.assertEqual(search.search_products("bamboo"), [self.product, self.other])
+
+    def test_prefix_query(self):
+        """Test that the last word matches as a prefix"""
+        self.assertEqual(search.search_products("biodeg"), [self.product])
+
+    def test_markup_is_not_indexed(self):
+        """Test that HTML tags are stripped before indexing"""
+        self.assertEqual(search.search_products("strong"), [])
+
+    def test_snippet_highlights_match(self):
+        """Test that results carry an escaped snippet with the match marked"""
+        result = search.search_products("bristles")[0]
+        self.assertIn("<mark>bristles</mark>", result.search_snippet)
+        self.assertIn("&amp;", result.search_snippet)
+
+    def test_deactivated_product_is_removed(self):
+        """Test that inactive products drop out of the index"""
+        self.product.is_active = False
+        self.product.save()
+        self.assertEqual(search.search_products("toothbrush"), [])
+
+    def test_deleted_service_is_removed(self):
+        """Test that deleting a service removes its entry"""
+        self.service.delete()
+        self.assertEqual(search.search_services("audits"), [])
+
+    def test_search_view_uses_index(self):
+        """Test that the global search view returns indexed matches"""
+        response = self.client.get('/search/', {'q': 'bamboo'})
+        self.assertEqual(response.context['products'], [self.product, self.other])
+        self.assertEqual(response.context['services'], [self.service])
+
+    def test_product_list_search_uses_index(self):
+        """Test that product_list?q= filters through the index"""
+        response = self.client.get('/products/', {'q': 'BT-100'})
+        self.assertEqual(list(response.context['products']), [self.product])
+
+    def test_punctuation_only_query(self):
+        """Test that a query without words returns nothing"""
+        self.assertEqual(search.search_products('"*'), [])
+
+    def test_rebuild_command(self):
+        """Test that the rebuild command restores a cleared index"""
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {search.INDEX_TABLE}")
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertEqual(search.search_products("toothbrush"), [self.product])
+
+
+@override_settings(EMAIL_OUTBOX_WORKER='command')
+class EmailOutboxTest(TestCase):
+    """Tests for the queued email outbox"""
+
+    def test_queue_does_not_send(self):
+        """Test that queueing only writes a pending row"""
+        outbox.queue_email("Hello", "Body", ["a@example.com"])
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(OutboxEmail.objects.get().status, 'pending')
+
+    @override_settings(EMAIL_BACKEND='core.testing.CountingEmailBackend')
+    def test_batch_sent_over_one_connection(self):
+        """Test that a batch reuses a single connection"""
+        CountingEmailBackend.opened = 0
+        for i in range(3):
+            outbox.queue_email(f"Hello {i}", "Body", [f"user{i}@example.com"])
+        self.assertEqual(outbox.send_queued(), (3, 0))
+        self.assertEqual(CountingEmailBackend.opened, 1)
+        self.assertEqual(len(mail.outbox), 3)
+        self.assertFalse(OutboxEmail.objects.exclude(status='sent').exists())
+
+    @override_settings(EMAIL_BACKEND='core.testing.FailingEmailBackend', EMAIL_OUTBOX_RETRY_DELAY=60)
+    def test_failure_retried_with_backoff(self):
+        """Test that a failed send is rescheduled and recorded"""
+        email = outbox.queue_email("Hello", "Body", ["a@example.com"])
+        with self.assertLogs('core.outbox', 'ERROR'):
+            self.assertEqual(outbox.send_queued(), (0, 1))
+        email.refresh_from_db()
+        self.assertEqual((email.status, email.attempts), ('pending', 1))
+        self.assertIn("SMTP server unavailable", email.last_error)
+        self.assertGreater(email.next_attempt_at, timezone.now())
+        # Not due yet, so nothing is retried immediately
+        self.assertEqual(outbox.send_queued(), (0, 0))
+
+    @override_settings(EMAIL_BACKEND='core.testing.FailingEmailBackend', EMAIL_OUTBOX_MAX_ATTEMPTS=2)
+    def test_gives_up_after_max_attempts(self):
+        """Test that an email is marked failed after the last attempt"""
+        email = outbox.queue_email("Hello", "Body", ["a@example.com"])
+        with self.assertLogs('core.outbox', 'ERROR'):
+            outbox.send_queued()
+            OutboxEmail.objects.update(next_attempt_at=timezone.now())
+            outbox.send_queued()
+        email.refresh_from_db()
+        self.assertEqual((email.status, email.attempts), ('failed', 2))
+
+    @override_settings(EMAIL_OUTBOX_MAX_ATTEMPTS=2)
+    def test_admin_retry_starts_attempts_over(self):
+        """Test that retrying a failed email from the admin really sends it again"""
+        email = outbox.queue_email("Hello", "Body", ["a@example.com"])
+        OutboxEmail.objects.update(status='failed', attempts=2)
+        model_admin = OutboxEmailAdmin(OutboxEmail, admin.site)
+        with mock.patch.object(model_admin, 'message_user'):
+            model_admin.retry_now(RequestFactory().post('/'), OutboxEmail.objects.all())
+        email.refresh_from_db()
+        self.assertEqual((email.status, email.attempts), ('pending', 0))
+        self.assertEqual(outbox.send_queued(), (1, 0))
+
+    def test_worker_picks_up_email_queued_while_finishing(self):
+        """Test that a commit during the worker's last pass is not left for cron"""
+        passes = []
+
+        def drain():
+            passes.append(1)
+            if len(passes) == 1:
+                # An email commits while this pass is finishing
+                outbox.start_worker_thread()
+            return 0, 0
+
+        with mock.patch.object(outbox, '_worker_thread', object()), \
+                mock.patch.object(outbox, 'drain', drain), \
+                mock.patch.object(outbox.connections, 'close_all'):
+            outbox._run_worker()
+            self.assertIsNone(outbox._worker_thread)
+        self.assertEqual(len(passes), 2)
+
+    def test_command_drains_queue(self):
+        """Test that the send_queued_email command delivers everything due"""
+        outbox.queue_email("Hello", "Body", ["a@example.com"])
+        call_command('send_queued_email', stdout=StringIO())
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ["a@example.com"])
+
+
+def make_image_file(name, size=(900, 600), image_format='JPEG'):
+    buffer = BytesIO()
+    Image.new('RGB', size, (40, 120, 60)).save(buffer, image_format)
+    return SimpleUploadedFile(name, buffer.getvalue())
+
+
+class ImageVariantTest(TestCase):
+    """Tests for resized and WebP image variants"""
+
+    def setUp(self):
+        """Use a throwaway media folder"""
+        cache.clear()
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root, IMAGE_VARIANT_WIDTHS=[160, 640, 1200])
+        self.settings_override.enable()
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+
+    def create_product(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Product.objects.create(
+                name="Chair", sku="CH-1", description="Test", main_image=make_image_file("chair.jpg"),
+            )
+
+    def test_upload_creates_variants(self):
+        """Test that saving an upload writes every width as JPEG and WebP"""
+        product = self.create_product()
+        name = product.main_image.name
+        self.assertTrue(images.has_variants(name))
+        with default_storage.open(images.variant_name(name, 160)) as f:
+            self.assertEqual(Image.open(f).size, (160, 107))
+        with default_storage.open(images.variant_name(name, 640, webp=True)) as f:
+            self.assertEqual(Image.open(f).format, 'WEBP')
+        # Never enlarged: the original's own width replaces the larger ones
+        self.assertEqual(images.stored_widths(name), [160, 640, 900])
+        self.assertFalse(default_storage.exists(images.variant_name(name, 1200)))
+        with default_storage.open(images.variant_name(name, 900)) as f:
+            self.assertEqual(Image.open(f).size, (900, 600))
+
+    def test_responsive_image_tag(self):
+        """Test that the tag offers WebP and resized sources"""
+        product = self.create_product()
+        html = Template(
+            '{% load core_tags %}{% responsive_image product.main_image sizes="60px" alt=product.name class="thumb" %}'
+        ).render(Context({'product': product}))
+        self.assertIn('<source type="image/webp"', html)
+        self.assertIn('chair-jpg-160w.webp 160w', html)
+        self.assertIn('chair-jpg-640w.jpg 640w', html)
+        self.assertIn('900w', html)
+        self.assertNotIn('1200w', html)
+        self.assertIn('sizes="60px"', html)
+        self.assertIn('class="thumb"', html)
+        self.assertIn('loading="lazy"', html)
+
+    def test_rendering_does_not_touch_storage(self):
+        """Test that variant availability comes from what generation recorded"""
+        product = self.create_product()
+        with mock.patch.object(default_storage, 'exists') as exists, \
+                mock.patch.object(default_storage, 'listdir') as listdir:
+            Template('{% load core_tags %}{% responsive_image image %}').render(Context({'image': product.main_image}))
+        exists.assert_not_called()
+        listdir.assert_not_called()
+
+    def test_same_stem_different_extensions_kept_apart(self):
+        """Test that chair.jpg and chair.png get their own variants"""
+        self.assertNotEqual(
+            images.variant_name('products/chair.jpg', 160, webp=True),
+            images.variant_name('products/chair.png', 160, webp=True),
+        )
+
+    def test_replaced_image_variants_deleted(self):
+        """Test that uploading a new image removes the old image's variants"""
+        product = self.create_product()
+        old_name = product.main_image.name
+        product.main_image = make_image_file("stool.jpg")
+        with self.captureOnCommitCallbacks(execute=True):
+            product.save()
+        self.assertFalse(default_storage.exists(images.variant_name(old_name, 160, webp=True)))
+        self.assertFalse(images.has_variants(old_name))
+        self.assertTrue(images.has_variants(product.main_image.name))
+
+    def test_deleting_variants_spares_similar_names(self):
+        """Test that chair.jpg's variants are not matched by prefix against chair-jpg-x.jpg's"""
+        chair = default_storage.save('products/chair.jpg', make_image_file("chair.jpg"))
+        other = default_storage.save('products/chair-jpg-x.jpg', make_image_file("chair-jpg-x.jpg"))
+        images.generate_variants(chair)
+        images.generate_variants(other)
+        images.delete_variants(chair)
+        self.assertFalse(default_storage.exists(images.variant_name(chair, 160, webp=True)))
+        self.assertTrue(default_storage.exists(images.variant_name(other, 160, webp=True)))
+        self.assertTrue(default_storage.exists(images.variant_name(other, 160)))
+
+    def test_responsive_image_tag_without_variants(self):
+        """Test that images without variants are rendered as uploaded"""
+        product = Product.objects.create(name="Lamp", sku="LA-1", description="Test", main_image="lamp.jpg")
+        html = Template(
+            '{% load core_tags %}{% responsive_image product.main_image alt=product.name %}'
+        ).render(Context({'product': product}))
+        self.assertNotIn('<picture>', html)
+        self.assertIn('src="/media/lamp.jpg"', html)
+
+    def test_backfill_command(self):
+        """Test that the backfill command creates missing variants"""
+        product = Product.objects.create(
+            name="Desk", sku="DE-1", description="Test", main_image=make_image_file("desk.png", image_format='PNG'),
+        )
+        self.assertFalse(images.has_variants(product.main_image.name))
+        out = StringIO()
+        call_command('generate_image_variants', workers=1, stdout=out)
+        self.assertTrue(images.has_variants(product.main_image.name))
+        self.assertTrue(default_storage.exists(images.variant_name(product.main_image.name, 640)))
+        self.assertIn("wrote 6 variant files", out.getvalue())
+
+
+class ResizedImageViewTest(TestCase):
+    """Tests for the on-demand /img/ resize endpoint"""
+
+    def setUp(self):
+        """Use a throwaway media folder with one image"""
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(
+            MEDIA_ROOT=self.media_root,
+            IMAGE_RESIZE_CACHE_DIR=f"{self.media_root}/resized",
+            IMAGE_RESIZE_SIZES=[(160, 160), (320, 0)],
+        )
+        self.settings_override.enable()
+        self.name = default_storage.save('products/chair.jpg', make_image_file('chair.jpg'))
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+
+    def url(self, width, height, fmt, path=None):
+        return reverse('resized_image', kwargs={'width': width, 'height': height, 'fmt': fmt, 'path': path or self.name})
+
+    def test_resizes_and_caches(self):
+        """Test that the first request resizes and later ones reuse the file"""
+        response = self.client.get(self.url(320, 0, 'webp'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'image/webp')
+        self.assertIn('max-age=', response['Cache-Control'])
+        image = Image.open(BytesIO(b''.join(response.streaming_content)))
+        self.assertEqual(image.size, (320, 213))
+
+        original_render = resize._render
+        with mock.patch.object(resize, '_render', side_effect=original_render) as render:
+            self.client.get(self.url(320, 0, 'webp'))
+        render.assert_not_called()
+
+    def test_fits_box(self):
+        """Test that WxH fits the image inside the box"""
+        response = self.client.get(self.url(160, 160, 'jpeg'))
+        self.assertEqual(Image.open(BytesIO(b''.join(response.streaming_content))).size, (160, 107))
+
+    def test_etag_not_modified(self):
+        """Test that a matching If-None-Match gets a 304"""
+        etag = self.client.get(self.url(320, 0, 'png'))['ETag']
+        response = self.client.get(self.url(320, 0, 'png'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_rejects_unlisted_sizes_and_bad_paths(self):
+        """Test that only whitelisted sizes of real media files are served"""
+        self.assertEqual(self.client.get(self.url(333, 0, 'webp')).status_code, 404)
+        self.assertEqual(self.client.get(self.url(320, 0, 'gif')).status_code, 404)
+        self.assertEqual(self.client.get(self.url(320, 0, 'webp', 'products/missing.jpg')).status_code, 404)
+        self.assertEqual(self.client.get(f"/img/320x0/webp/../{self.name}").status_code, 404)
+
+    def test_concurrent_requests_resize_once(self):
+        """Test that simultaneous requests for a new variant share one resize"""
+        calls = []
+        original_render = resize._render
+
+        def slow_render(*args):
+            calls.append(args)
+            time.sleep(0.2)
+            original_render(*args)
+
+        with mock.patch.object(resize, '_render', side_effect=slow_render):
+            threads = [
+                threading.Thread(target=resize.get_resized, args=(self.name, 320, 0, 'webp'))
+                for _ in range(4)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.assertEqual(len(calls), 1)
+
+    def test_head_request(self):
+        """Test that HEAD is answered like GET"""
+        response = self.client.head(self.url(320, 0, 'webp'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'image/webp')
+
+    def test_corrupt_source_is_not_found(self):
+        """Test that a file that is not an image gives a 404, not an error"""
+        name = default_storage.save('products/broken.jpg', SimpleUploadedFile('broken.jpg', b'not an image'))
+        self.assertEqual(self.client.get(self.url(320, 0, 'webp', name)).status_code, 404)
+
+    def test_lock_files_removed(self):
+        """Test that no .lock files are left in the cache folder"""
+        self.client.get(self.url(320, 0, 'webp'))
+        leftovers = [name for root, dirs, files in os.walk(resize.cache_dir()) for name in files if name.endswith('.lock')]
+        self.assertEqual(leftovers, [])
+
+    def test_editor_images_use_resized_copies(self):
+        """Test that the rich text sanitizer points uploaded images at the resize endpoint"""
+        html = sanitize_html(f'<p><img src="/media/{self.name}" style="width:300px"><img src="https://example.com/a.jpg"></p>')
+        self.assertIn(f'src="{self.url(320, 0, "webp")}"', html)
+        self.assertIn(f'srcset="{self.url(320, 0, "webp")} 320w"', html)
+        self.assertIn('sizes="(max-width: 300px) 100vw, 300px"', html)
+        self.assertIn('<img src="https://example.com/a.jpg" loading="lazy"', html)
+
+
+class StaticPipelineTest(TestCase):
+    """Tests for minified, hashed and precompressed static files"""
+
+    def setUp(self):
+        """Collect a small static tree into a throwaway folder"""
+        self.source = tempfile.mkdtemp()
+        self.root = tempfile.mkdtemp()
+        os.makedirs(f"{self.source}/css")
+        with open(f"{self.source}/css/site.css", 'w') as f:
+            f.write("/*! keep */\n/* comment */\nbody {\n    color : red ;\n}\n" + ".box { margin: 0; }\n" * 100)
+        self.settings_override = override_settings(
+            STATIC_ROOT=self.root,
+            STATICFILES_DIRS=[self.source],
+            STATICFILES_FINDERS=['django.contrib.staticfiles.finders.FileSystemFinder'],
+            STORAGES={
+                'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+                'staticfiles': {'BACKEND': 'core.storage.CompressedManifestStaticFilesStorage'},
+            },
+        )
+        self.settings_override.enable()
+        call_command('collectstatic', interactive=False, verbosity=0)
+        with open(f"{self.root}/staticfiles.json") as f:
+            self.hashed = json.load(f)['paths']['css/site.css']
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.source, ignore_errors=True)
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def test_collectstatic_minifies_hashes_and_compresses(self):
+        """Test that the hashed file is minified and has .gz/.br siblings"""
+        self.assertRegex(self.hashed, r'^css/site\.[0-9a-f]{12}\.css$')
+        with open(f"{self.root}/{self.hashed}") as f:
+            content = f.read()
+        if storage.rcssmin is not None:
+            self.assertIn("/*! keep */", content)
+            self.assertNotIn("/* comment */", content)
+            self.assertIn("body{color:red}", content)
+        with gzip.open(f"{self.root}/{self.hashed}.gz", 'rt') as f:
+            self.assertEqual(f.read(), content)
+        if storage.brotli is not None:
+            self.assertTrue(os.path.exists(f"{self.root}/{self.hashed}.br"))
+
+    def test_serves_precompressed_variant(self):
+        """Test that the handler picks the encoding the client accepts"""
+        factory = RequestFactory()
+        response = static_file(factory.get('/', HTTP_ACCEPT_ENCODING='gzip, deflate'), self.hashed)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Content-Type'], 'text/css')
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        self.assertIn('immutable', response['Cache-Control'])
+
+        response = static_file(factory.get('/', HTTP_ACCEPT_ENCODING='gzip;q=0'), self.hashed)
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+        response = static_file(factory.get('/'), 'css/site.css')
+        self.assertNotIn('immutable', response['Cache-Control'])
+
+    def test_rejects_paths_outside_static_root(self):
+        """Test that the handler only serves collected files"""
+        with self.assertRaises(Http404):
+            static_file(RequestFactory().get('/'), '../secret.txt')
+
+
+@override_settings(EMAIL_OUTBOX_WORKER='command')
+class PageConditionalGetTest(TestCase):
+    """Tests for ETag validation on the home, information and service pages"""
+
+    def setUp(self):
+        """Create test data"""
+        cache.clear()
+        clear_local_singletons()
+        self.client = Client()
+        self.product = Product.objects.create(name="Cup", sku="CU-1", description="Test", main_image="test.jpg")
+        self.service = Service.objects.create(title="Audits", slug="audits", description="Test")
+
+    def assert_revalidates(self, url):
+        etag = self.client.get(url)['ETag']
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        return etag
+
+    def test_home_not_modified_until_content_changes(self):
+        """Test that the home page ETag follows products and quote requests"""
+        etag = self.assert_revalidates(reverse('home'))
+        RFQRequest.objects.create(name='Jane', email='jane@example.com', phone='1', message='Hi', product=self.product)
+        response = self.client.get(reverse('home'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_information_and_service_pages(self):
+        """Test that the information and service pages revalidate"""
+        self.assert_revalidates(reverse('information'))
+        etag = self.assert_revalidates(reverse('services:detail', args=[self.service.slug]))
+        self.service.save()
+        response = self.client.get(reverse('services:detail', args=[self.service.slug]), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_site_settings_change_invalidates(self):
+        """Test that editing the footer contact details changes every ETag"""
+        etag = self.assert_revalidates(reverse('information'))
+        contact = ContactInfo.load()
+        contact.phone = '+1 555 0100'
+        contact.save()
+        response = self.client.get(reverse('information'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_latest_changes_in_one_query(self):
+        """Test that every source's newest value and count come from one query"""
+        Product.objects.create(name="Mug", sku="MU-1", description="Test", main_image="test.jpg")
+        with self.assertNumQueries(1):
+            changes = latest_changes(
+                (Product.objects.all(), 'pk'),
+                (Service.objects.filter(slug='missing'), 'updated_at'),
+                (Product.objects.filter(sku='CU-1'), 'pk'),
+            )
+        newest = Product.objects.latest('pk').pk
+        self.assertEqual(changes, [(newest, 2), (None, 0), (self.product.pk, 1)])
+
+    def test_pending_messages_get_full_page(self):
+        """Test that a page carrying flash messages is always rendered"""
+        etag = self.assert_revalidates(reverse('information'))
+        self.client.post(reverse('contact'), {
+            'name': 'Ann', 'email': 'ann@example.com', 'subject': 'Hi', 'message': 'Hello',
+        })
+        response = self.client.get(reverse('information'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Thank you for your message')
+
+
+class PageCacheTest(TestCase):
+    """Tests for the tagged full-page cache"""
+
+    def setUp(self):
+        """Create test data"""
+        cache.clear()
+        clear_local_singletons()
+        self.client = Client()
+        self.service = Service.objects.create(title="Audits", slug="audits", description="Test")
+        # Created on first use otherwise, which would purge the first cached page
+        SiteSettings.load()
+        ContactInfo.load()
+
+    def test_repeat_view_served_from_cache(self):
+        """Test that a second anonymous view needs no database queries"""
+        response = self.client.get(reverse('services:list'))
+        self.assertEqual(response['X-Page-Cache'], 'miss')
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('services:list'))
+        self.assertEqual(response['X-Page-Cache'], 'hit')
+        self.assertContains(response, 'Audits')
+
+    def test_save_purges_only_dependent_pages(self):
+        """Test that changing a service refreshes service pages but not the information page"""
+        self.client.get(reverse('services:list'))
+        self.client.get(reverse('information'))
+        self.service.title = "Energy audits"
+        self.service.save()
+        response = self.client.get(reverse('services:list'))
+        self.assertEqual(response['X-Page-Cache'], 'miss')
+        self.assertContains(response, 'Energy audits')
+        self.assertEqual(self.client.get(reverse('information'))['X-Page-Cache'], 'hit')
+
+        info = InformationPage.load()
+        info.save()
+        self.assertEqual(self.client.get(reverse('information'))['X-Page-Cache'], 'miss')
+
+    def test_delete_purges(self):
+        """Test that deleting a service drops it from the cached listing"""
+        self.client.get(reverse('services:list'))
+        self.service.delete()
+        self.assertNotContains(self.client.get(reverse('services:list')), 'Audits')
+
+    def test_stale_page_served_while_another_request_rebuilds(self):
+        """Test that only the lock holder re-renders a purged page"""
+        self.client.get(reverse('services:list'))
+        self.service.title = "Energy audits"
+        self.service.save()
+        with mock.patch.object(page_cache.cache, 'add', return_value=False):
+            response = self.client.get(reverse('services:list'))
+        self.assertEqual(response['X-Page-Cache'], 'stale')
+        self.assertNotContains(response, 'Energy audits')
+        self.assertContains(self.client.get(reverse('services:list')), 'Energy audits')
+
+    def test_site_settings_purge_every_page(self):
+        """Test that footer contact details are never served stale from the cache"""
+        self.client.get(reverse('services:list'))
+        contact = ContactInfo.load()
+        contact.phone = '+1 555 0100'
+        contact.save()
+        response = self.client.get(reverse('services:list'))
+        self.assertEqual(response['X-Page-Cache'], 'miss')
+
+    def test_bypassed_for_users_and_unknown_parameters(self):
+        """Test that logged-in users and unexpected query strings skip the cache"""
+        self.client.get(reverse('services:list'))
+        self.assertNotIn('X-Page-Cache', self.client.get(reverse('services:list') + '?utm=1'))
+        from django.contrib.auth.models import User
+        User.objects.create_user('editor', password='pass')
+        self.client.login(username='editor', password='pass')
+        self.assertNotIn('X-Page-Cache', self.client.get(reverse('services:list')))
+
+
+class RichTextTest(TestCase):
+    """Tests for the sanitized HTML, plain text and excerpts derived from rich text"""
+
+    def test_sanitize_html(self):
+        """Test that scripts, handlers and javascript: links are removed and images load lazily"""
+        html = sanitize_html(
+            '<p onclick="x()">Hi &amp; <a href="javascript:alert(1)">bye</a>'
+            '<img src="/media/a.jpg" onerror="alert(1)"><script>alert(1)</script>'
+        )
+        self.assertEqual(html, '<p>Hi &amp; <a>bye</a><img src="/media/a.jpg" loading="lazy" decoding="async"></p>')
+
+    def test_derived_fields_filled_on_save(self):
+        """Test that saving a product fills its derived columns"""
+        product = Product.objects.create(
+            name="Cup", sku="CU-1", main_image="test.jpg",
+            description="<p>Reusable <strong>bamboo</strong> cup " + "word " * 40 + "</p>",
+            specifications="<ul><li>350&nbsp;ml</li></ul>",
+        )
+        self.assertIn('<strong>bamboo</strong>', product.description_html)
+        self.assertTrue(product.body_text.startswith('Reusable bamboo cup'))
+        self.assertTrue(product.body_text.endswith('350 ml'))
+        self.assertEqual(len(product.excerpt.split()), 30)
+        self.assertTrue(product.excerpt.endswith('…'))
+
+    def test_unrelated_update_fields_skip_rich_text(self):
+        """Test that saves limited to other fields leave the derived columns alone"""
+        service = Service.objects.create(title="Audits", slug="audits", description="<p>Old</p>")
+        Service.objects.filter(pk=service.pk).update(description="<p>New</p>")
+        service.description = "<p>New</p>"
+        service.save(update_fields=['order'])
+        self.assertEqual(Service.objects.get(pk=service.pk).body_text, 'Old')
+        service.save(update_fields=['description'])
+        self.assertEqual(Service.objects.get(pk=service.pk).body_text, 'New')
+
+    def test_rebuild_command(self):
+        """Test that rebuild_rich_text refreshes rows changed behind the model's back"""
+        service = Service.objects.create(title="Audits", slug="audits", description="<p>Old</p>")
+        Service.objects.filter(pk=service.pk).update(description='<p>New <img src="/media/x.png"></p>')
+        call_command('rebuild_rich_text', stdout=StringIO())
+        service.refresh_from_db()
+        self.assertEqual(service.description_html, '<p>New <img src="/media/x.png" loading="lazy" decoding="async"></p>')
+        self.assertEqual(service.excerpt, 'New')
+
+    def test_detail_page_renders_sanitized_html(self):
+        """Test that the service page shows the sanitized copy and an excerpt meta description"""
+        Service.objects.create(
+            title="Audits", slug="audits", short_description="",
+            description='<p>Energy audits<script>alert(1)</script></p>',
+        )
+        response = self.client.get(reverse('services:detail', args=['audits']))
+        self.assertContains(response, '<p>Energy audits</p>')
+        self.assertNotContains(response, 'alert(1)')
+        self.assertContains(response, '<meta name="description" content="Energy audits">')
@@ -1,11 +1,40 @@
+import mimetypes
+import os
+import re
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
 from django.shortcuts import render, redirect
 from django.contrib import messages
-from django.db.models import Count, Q
+from django.db.models import Count
+from django.http import FileResponse, Http404, HttpResponseNotModified
+from django.utils._os import safe_join
+from django.utils.http import http_date, parse_etags
+from django.views.static import was_modified_since
+from django.views.decorators.http import require_safe
+from .conditional import conditional_page, latest_changes, make_etag
+from .page_cache import cached_page
 from .models import HomePage, InformationPage, ContactInfo
+from .resize import CONTENT_TYPES, ResizeError, get_resized
+from .search import search_products, search_services
 from products.models import Product, Category
+from rfq.models import RFQRequest
 from services.models import Service
 
 
+def _home_etag(request):
+    homepage = HomePage.load()
+    return make_etag('home', homepage.updated_at, latest_changes(
+        (Product.objects.filter(is_active=True), 'updated_at'),
+        (Service.objects.filter(is_active=True), 'updated_at'),
+        (Category.objects.filter(is_active=True, parent__isnull=True), 'updated_at'),
+        # Trending products are ranked by number of quote requests
+        (RFQRequest.objects.all(), 'pk'),
+    ))
+
+
+@conditional_page(_home_etag)
+@cached_page('core.HomePage', 'products.Product', 'products.Category', 'services.Service', 'rfq.RFQRequest')
 def home(request):
     """Homepage view with featured products, categories, and trending products"""
     homepage = HomePage.load()
@@ -37,24 +66,8 @@ def search(request):
     services = []
     
     if query:
-        # Search products
-        products = Product.objects.filter(
-            is_active=True
-        ).filter(
-            Q(name__icontains=query) |
-            Q(short_description__icontains=query) |
-            Q(description__icontains=query) |
-            Q(sku__icontains=query)
-        ).distinct()[:12]
-        
-        # Search services
-        services = Service.objects.filter(
-            is_active=True
-        ).filter(
-            Q(title__icontains=query) |
-            Q(short_description__icontains=query) |
-            Q(description__icontains=query)
-        ).distinct()[:12]
+        products = search_products(query, limit=12)
+        services = search_services(query, limit=12)
     
     context = {
         'query': query,
@@ -65,6 +78,12 @@ def search(request):
     return render(request, 'core/search_results.html', context)
 
 
+def _information_etag(request):
+    return make_etag('information', InformationPage.load().updated_at)
+
+
+@conditional_page(_information_etag)
+@cached_page('core.InformationPage')
 def information(request):
     """Information/About Us page"""
     info_page = InformationPage.load()
@@ -95,3 +114,81 @@ def contact(request):
         'contact_info': contact_info,
     }
     return render(request, 'core/contact.html', context)
+
+
+@require_safe
+def resized_image(request, width, height, fmt, path):
+    """Serve a media image resized to one of the allowed sizes"""
+    try:
+        file_path, key = get_resized(path, width, height, fmt)
+    except ResizeError:
+        raise Http404("Image not available in this size")
+
+    etag = f'"{key}"'
+    cache_control = f"public, max-age={getattr(settings, 'IMAGE_RESIZE_MAX_AGE', 30 * 24 * 60 * 60)}"
+    if etag in parse_etags(request.META.get('HTTP_IF_NONE_MATCH', '')):
+        response = HttpResponseNotModified()
+    else:
+        response = FileResponse(open(file_path, 'rb'), content_type=CONTENT_TYPES[fmt])
+    response['ETag'] = etag
+    response['Cache-Control'] = cache_control
+    return response
+
+
+# Names written by the manifest storage, e.g. css/style.59cfad6a72b3.css
+HASHED_STATIC_NAME = re.compile(r'\.[0-9a-f]{12}\.[^/.]+$')
+
+
+def _accepted_encodings(request):
+    """Content codings the client accepts (ignoring those sent with q=0)"""
+    accepted = set()
+    for item in request.META.get('HTTP_ACCEPT_ENCODING', '').split(','):
+        coding, _, params = item.partition(';')
+        quality = params.strip().partition('q=')[2]
+        try:
+            if quality and float(quality) == 0:
+                continue
+        except ValueError:
+            pass
+        accepted.add(coding.strip().lower())
+    return accepted
+
+
+@require_safe
+def static_file(request, path):
+    """
+    Serve a collected static file, preferring its .br or .gz copy.
+
+    Used when STATIC_PIPELINE is on. Content-hashed names never change, so
+    they are cached for a year; others get a short lifetime.
+    """
+    try:
+        file_path = safe_join(settings.STATIC_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404("Not found")
+    if not os.path.isfile(file_path):
+        raise Http404("Not found")
+
+    stat = os.stat(file_path)
+    if HASHED_STATIC_NAME.search(path):
+        cache_control = 'public, max-age=31536000, immutable'
+    else:
+        cache_control = f"public, max-age={getattr(settings, 'STATIC_MAX_AGE', 60 * 60)}"
+
+    if not was_modified_since(request.META.get('HTTP_IF_MODIFIED_SINCE'), stat.st_mtime):
+        response = HttpResponseNotModified()
+    else:
+        content_type = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        encoding = None
+        accepted = _accepted_encodings(request)
+        for coding, suffix in (('br', '.br'), ('gzip', '.gz')):
+            if coding in accepted and os.path.isfile(file_path + suffix):
+                encoding, file_path = coding, file_path + suffix
+                break
+        response = FileResponse(open(file_path, 'rb'), content_type=content_type)
+        if encoding:
+            response['Content-Encoding'] = encoding
+        response['Last-Modified'] = http_date(stat.st_mtime)
+    response['Cache-Control'] = cache_control
+    response['Vary'] = 'Accept-Encoding'
+    return response
@@ -1,7 +1,23 @@
-from django.contrib import admin
+from django.contrib import admin, messages
+from django.core.exceptions import PermissionDenied
+from django.http import StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.template.response import TemplateResponse
+from django.urls import path, reverse
+from django.utils.html import format_html
+from .analytics import daily_counts, field_histograms
+from .export import EXPORT_FORMATS
 from .models import Form, FormField, FormSubmission, FormSubmissionData
 
 
+def export_submissions_response(form_obj, export_format):
+    """Stream a form's submissions as a downloadable file"""
+    iter_rows, content_type = EXPORT_FORMATS[export_format]
+    response = StreamingHttpResponse(iter_rows(form_obj), content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{form_obj.slug}-submissions.{export_format}"'
+    return response
+
+
 class FormFieldInline(admin.TabularInline):
     """Inline admin for form fields"""
     model = FormField
@@ -13,21 +29,67 @@ class FormFieldInline(admin.TabularInline):
 @admin.register(Form)
 class FormAdmin(admin.ModelAdmin):
     """Admin interface for dynamic forms"""
-    list_display = ('title', 'slug', 'is_active', 'created_at')
+    list_display = ('title', 'slug', 'is_active', 'created_at', 'summary_link')
     list_filter = ('is_active', 'created_at')
     search_fields = ('title', 'slug')
     prepopulated_fields = {'slug': ('title',)}
     inlines = [FormFieldInline]
+    actions = ['export_csv', 'export_jsonl']
     
     fieldsets = (
         ('Basic Information', {
             'fields': ('title', 'slug', 'description')
         }),
         ('Settings', {
-            'fields': ('is_active', 'allow_multiple_submissions', 'email_notification')
+            'fields': ('is_active', 'allow_multiple_submissions', 'email_notification', 'email_digest')
         }),
     )
 
+    def get_urls(self):
+        urls = [
+            path(
+                '<path:object_id>/summary/',
+                self.admin_site.admin_view(self.summary_view),
+                name='forms_form_summary',
+            ),
+        ]
+        return urls + super().get_urls()
+
+    @admin.display(description="Summary")
+    def summary_link(self, obj):
+        return format_html('<a href="{}">View summary</a>', reverse('admin:forms_form_summary', args=[obj.pk]))
+
+    def summary_view(self, request, object_id):
+        """Daily submission counts and answer histograms for one form"""
+        form_obj = get_object_or_404(Form, pk=object_id)
+        if not self.has_view_permission(request, form_obj):
+            raise PermissionDenied
+        days = daily_counts(form_obj)
+        context = {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'original': form_obj,
+            'title': f"Submission summary: {form_obj.title}",
+            'daily_counts': days,
+            'max_daily': max(total for day, total in days) or 1,
+            'histograms': field_histograms(form_obj),
+        }
+        return TemplateResponse(request, 'admin/forms/form/summary.html', context)
+
+    def _export(self, request, queryset, export_format):
+        if queryset.count() != 1:
+            self.message_user(request, "Select exactly one form to export.", level=messages.WARNING)
+            return None
+        return export_submissions_response(queryset.get(), export_format)
+
+    @admin.action(description="Export submissions as CSV")
+    def export_csv(self, request, queryset):
+        return self._export(request, queryset, 'csv')
+
+    @admin.action(description="Export submissions as JSON Lines")
+    def export_jsonl(self, request, queryset):
+        return self._export(request, queryset, 'jsonl')
+
 
 class FormSubmissionDataInline(admin.TabularInline):
     """Inline display of submission data"""
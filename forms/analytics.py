@@ -0,0 +1,50 @@
+from datetime import timedelta
+
+from django.db.models import Count
+from django.db.models.fields.json import KeyTextTransform
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import FormSubmission
+
+# Field types whose answers come from a fixed set, so a histogram is useful
+HISTOGRAM_FIELD_TYPES = ('select', 'radio', 'checkbox')
+
+
+def daily_counts(form_obj, days=30):
+    """(date, submissions) for each of the last ``days`` days, oldest first"""
+    start = timezone.localdate() - timedelta(days=days - 1)
+    counts = dict(
+        FormSubmission.objects.filter(form=form_obj, submitted_at__date__gte=start)
+        .annotate(day=TruncDate('submitted_at'))
+        .order_by()
+        .values_list('day')
+        .annotate(total=Count('pk'))
+    )
+    days = [start + timedelta(days=offset) for offset in range(days)]
+    return [(day, counts.get(day, 0)) for day in days]
+
+
+def value_histogram(form_obj, label, since=None, limit=20):
+    """
+    Most common answers to one field, as [(value, submissions)].
+
+    Grouped in the database over the submissions' ``values`` snapshot, so
+    the per-field data rows are never read.
+    """
+    queryset = FormSubmission.objects.filter(form=form_obj)
+    if since is not None:
+        queryset = queryset.filter(submitted_at__gte=since)
+    return list(
+        queryset.annotate(answer=KeyTextTransform(label, 'values'))
+        .order_by()
+        .values_list('answer')
+        .annotate(total=Count('pk'))
+        .order_by('-total', 'answer')[:limit]
+    )
+
+
+def field_histograms(form_obj, since=None):
+    """Histograms for every choice-style field of a form, in form order"""
+    fields = form_obj.fields.filter(field_type__in=HISTOGRAM_FIELD_TYPES).order_by('order')
+    return [(field, value_histogram(form_obj, field.label, since)) for field in fields]
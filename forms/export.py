@@ -0,0 +1,96 @@
+import csv
+import json
+
+from .models import FormSubmission, FormSubmissionData
+
+META_COLUMNS = ['submission_id', 'submitted_at', 'user_ip']
+
+# Spreadsheet apps treat cells starting with these as formulas
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+class _Echo:
+    """File-like object whose write() returns the line, for streaming csv.writer output"""
+
+    def write(self, value):
+        return value
+
+
+def export_columns(form_obj):
+    """Field labels in form order, followed by labels of fields since deleted"""
+    labels = list(form_obj.fields.order_by('order').values_list('label', flat=True))
+    stored = (
+        FormSubmissionData.objects.filter(submission__form=form_obj)
+        .order_by('field_label')
+        .values_list('field_label', flat=True)
+        .distinct()
+    )
+    known = set(labels)
+    return labels + [label for label in stored if label not in known]
+
+
+def iter_submissions(form_obj, chunk_size=2000):
+    """
+    Yield (meta, values) per submission: the META_COLUMNS and a dict keyed by field label.
+
+    Reads each submission's values snapshot with a server-side cursor, so
+    memory use does not grow with the number of submissions. Submissions
+    without any answers are included with empty values.
+    """
+    rows = (
+        FormSubmission.objects.filter(form=form_obj)
+        .order_by('pk')
+        .values_list('pk', 'submitted_at', 'user_ip', 'values')
+        .iterator(chunk_size=chunk_size)
+    )
+    for submission_id, submitted_at, user_ip, values in rows:
+        meta = {
+            'submission_id': submission_id,
+            'submitted_at': submitted_at.isoformat(),
+            'user_ip': user_ip or '',
+        }
+        yield meta, values or {}
+
+
+def csv_headers(labels):
+    """Column headers for field labels, renamed where they clash with META_COLUMNS or each other"""
+    taken = set(META_COLUMNS)
+    headers = []
+    for label in labels:
+        header, n = label, 1
+        while header in taken:
+            n += 1
+            header = f"{label} (field)" if n == 2 else f"{label} (field {n - 1})"
+        taken.add(header)
+        headers.append(header)
+    return headers
+
+
+def csv_safe(value):
+    """Neutralise text a spreadsheet would run as a formula"""
+    value = str(value)
+    return "'" + value if value.startswith(FORMULA_PREFIXES) else value
+
+
+def iter_csv(form_obj):
+    """Yield a wide CSV export of a form's submissions, line by line"""
+    labels = export_columns(form_obj)
+    writer = csv.writer(_Echo())
+    yield writer.writerow([csv_safe(header) for header in META_COLUMNS + csv_headers(labels)])
+    for meta, values in iter_submissions(form_obj):
+        yield writer.writerow(
+            [meta[column] for column in META_COLUMNS] + [csv_safe(values.get(label, '')) for label in labels]
+        )
+
+
+def iter_jsonl(form_obj):
+    """Yield a JSON Lines export of a form's submissions, one object per line"""
+    for meta, values in iter_submissions(form_obj):
+        # Answers are nested so a field label can never replace a meta key
+        yield json.dumps({**meta, 'fields': values}, ensure_ascii=False) + '\n'
+
+
+EXPORT_FORMATS = {
+    'csv': (iter_csv, 'text/csv'),
+    'jsonl': (iter_jsonl, 'application/x-ndjson'),
+}
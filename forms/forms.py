@@ -1,15 +1,79 @@
+import threading
+from collections import OrderedDict
+
 from django import forms
+from django.conf import settings
 from django.forms import Form as DjangoForm
 from .models import FormField, FormSubmission, FormSubmissionData
+from .validation import pattern_validator
+
+# Field types whose value FormField.pattern is checked against
+PATTERN_FIELD_TYPES = ('text', 'email', 'number', 'textarea', 'phone')
+
+
+class CompiledForm:
+    """A built form class plus the field lookups needed to store submissions"""
+
+    def __init__(self, form_class, field_ids):
+        self.form_class = form_class
+        self.field_ids = field_ids  # field label -> FormField id
+
+
+# Compiled forms keyed by (form pk, updated_at, fields_version), least
+# recently used first
+_compiled_forms = OrderedDict()
+_compiled_forms_lock = threading.Lock()
+
+
+def get_compiled_form(form_obj):
+    """
+    Return the cached CompiledForm for a Form, building it on first use.
 
+    The key changes whenever the form is saved or one of its fields changes,
+    so stale entries are never served; they age out of the LRU instead.
+    """
+    key = (form_obj.pk, form_obj.updated_at, form_obj.fields_version)
+    with _compiled_forms_lock:
+        compiled = _compiled_forms.get(key)
+        if compiled is not None:
+            _compiled_forms.move_to_end(key)
+            return compiled
+
+    fields = list(form_obj.fields.all().order_by('order'))
+    compiled = CompiledForm(
+        create_dynamic_form(form_obj, fields),
+        {field.label: field.id for field in fields},
+    )
+
+    max_size = getattr(settings, 'DYNAMIC_FORM_CACHE_SIZE', 128)
+    with _compiled_forms_lock:
+        _compiled_forms[key] = compiled
+        _compiled_forms.move_to_end(key)
+        while len(_compiled_forms) > max_size:
+            _compiled_forms.popitem(last=False)
+    return compiled
+
+
+def get_dynamic_form(form_obj):
+    """Cached equivalent of create_dynamic_form(form_obj)"""
+    return get_compiled_form(form_obj).form_class
 
-def create_dynamic_form(form_obj):
+
+def clear_compiled_forms():
+    with _compiled_forms_lock:
+        _compiled_forms.clear()
+
+
+def create_dynamic_form(form_obj, fields=None):
     """
     Dynamically create a Django form from our Form model
     """
     form_fields = {}
     
-    for field in form_obj.fields.all().order_by('order'):
+    if fields is None:
+        fields = form_obj.fields.all().order_by('order')
+
+    for field in fields:
         widget_attrs = {
             'class': 'form-control',
             'placeholder': field.placeholder or field.label,
@@ -95,6 +159,10 @@ def create_dynamic_form(form_obj):
                 widget=forms.TextInput(attrs={**widget_attrs, 'type': 'tel'})
             )
     
+        validator = pattern_validator(field.pattern) if field.field_type in PATTERN_FIELD_TYPES else None
+        if validator is not None:
+            form_fields[field.label].validators.append(validator)
+    
     # Create form class dynamically
     DynamicForm = type('DynamicForm', (DjangoForm,), form_fields)
     return DynamicForm
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from forms.export import EXPORT_FORMATS
+from forms.models import Form
+
+
+class Command(BaseCommand):
+    help = "Export a form's submissions as CSV or JSON Lines, one column/key per field"
+
+    def add_arguments(self, parser):
+        parser.add_argument('slug', help="Slug of the form to export")
+        parser.add_argument('--format', choices=sorted(EXPORT_FORMATS), default='csv')
+        parser.add_argument('--output', help="File to write to (default: standard output)")
+
+    def handle(self, *args, **options):
+        try:
+            form_obj = Form.objects.get(slug=options['slug'])
+        except Form.DoesNotExist:
+            raise CommandError(f"No form with slug '{options['slug']}'")
+
+        iter_rows, content_type = EXPORT_FORMATS[options['format']]
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8', newline='') as output:
+                output.writelines(iter_rows(form_obj))
+        else:
+            self.stdout.ending = ''
+            for line in iter_rows(form_obj):
+                self.stdout.write(line)
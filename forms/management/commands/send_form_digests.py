@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from core.outbox import drain
+from forms.notifications import queue_digests
+
+
+class Command(BaseCommand):
+    help = "Queue digest emails for forms that collect submissions into a periodic digest"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--send', action='store_true', help="Deliver queued emails before exiting")
+
+    def handle(self, *args, **options):
+        queued = queue_digests()
+        self.stdout.write(f"Queued {queued} digest emails")
+        if options['send']:
+            sent, failed = drain()
+            self.stdout.write(f"Sent {sent} emails, {failed} failed")
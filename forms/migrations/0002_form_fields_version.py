@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-18 08:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("forms", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="form",
+            name="fields_version",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 4.2.30 on 2026-10-18 08:42
+
+from itertools import groupby
+
+from django.db import migrations, models
+
+
+def fill_values(apps, schema_editor):
+    FormSubmission = apps.get_model("forms", "FormSubmission")
+    FormSubmissionData = apps.get_model("forms", "FormSubmissionData")
+    rows = (
+        FormSubmissionData.objects.order_by("submission_id", "pk")
+        .values_list("submission_id", "field_label", "value")
+        .iterator()
+    )
+    batch = []
+    for submission_id, values in groupby(rows, key=lambda row: row[0]):
+        batch.append(
+            FormSubmission(
+                pk=submission_id, values={label: value for _, label, value in values}
+            )
+        )
+        if len(batch) >= 500:
+            FormSubmission.objects.bulk_update(batch, ["values"])
+            batch = []
+    FormSubmission.objects.bulk_update(batch, ["values"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("forms", "0002_form_fields_version"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="formsubmission",
+            name="values",
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name="formsubmission",
+            index=models.Index(
+                fields=["form", "submitted_at"], name="submission_form_date_idx"
+            ),
+        ),
+        migrations.RunPython(fill_values, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 4.2.30 on 2026-10-18 08:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("forms", "0003_submission_values"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="form",
+            name="digest_last_submission_id",
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name="form",
+            name="email_digest",
+            field=models.BooleanField(
+                default=False,
+                help_text="Send a periodic digest of new submissions instead of one email per submission",
+            ),
+        ),
+    ]
@@ -1,6 +1,9 @@
-from django.db import models
+from django.core.exceptions import ValidationError
+from django.db import models, transaction
 from django.core.validators import MinValueValidator
 
+from .validation import check_pattern, parse_choices
+
 
 class Form(models.Model):
     """Dynamic form model"""
@@ -12,7 +15,19 @@ class Form(models.Model):
     
     # Settings
     email_notification = models.EmailField(blank=True, help_text="Email to send form submissions to")
+    email_digest = models.BooleanField(
+        default=False,
+        help_text="Send a periodic digest of new submissions instead of one email per submission",
+    )
+    # Highest submission id already covered by a digest; set when the digest
+    # is switched on so older submissions are not re-sent. Form.save() always
+    # writes the stored value, never the instance's copy
+    digest_last_submission_id = models.PositiveIntegerField(null=True, blank=True, editable=False)
     
+    # Bumped by forms.signals whenever one of the form's fields changes, so
+    # cached form classes can be keyed on (pk, updated_at, fields_version)
+    fields_version = models.PositiveIntegerField(default=0, editable=False)
+
     # Timestamps
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -25,6 +40,36 @@ class Form(models.Model):
     def __str__(self):
         return self.title
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remembered so save() can tell when the digest is being switched off
+        instance._stored_email_digest = instance.__dict__.get('email_digest')
+        return instance
+
+    def save(self, *args, **kwargs):
+        with transaction.atomic():
+            if not self._state.adding:
+                if getattr(self, '_stored_email_digest', False) and not self.email_digest:
+                    # Switching the digest off sends what it was still holding
+                    from .notifications import queue_digest
+                    queue_digest(self)
+                # The marker is advanced by forms.notifications; take the stored
+                # value so saving a stale copy (e.g. an open admin page) cannot
+                # rewind it
+                self.digest_last_submission_id = (
+                    Form.objects.select_for_update().filter(pk=self.pk)
+                    .values_list('digest_last_submission_id', flat=True).first()
+                )
+            if not self.email_digest:
+                self.digest_last_submission_id = None
+            elif self.digest_last_submission_id is None:
+                # Start after the existing submissions so they are not re-sent
+                latest = self.submissions.order_by('-pk').values_list('pk', flat=True).first() if self.pk else None
+                self.digest_last_submission_id = latest or 0
+            super().save(*args, **kwargs)
+        self._stored_email_digest = self.email_digest
+
 
 class FormField(models.Model):
     """Fields that belong to a form"""
@@ -63,10 +108,18 @@ class FormField(models.Model):
     def __str__(self):
         return f"{self.form.title} - {self.label}"
 
+    def clean(self):
+        super().clean()
+        if self.pattern:
+            try:
+                check_pattern(self.pattern)
+            except ValidationError as e:
+                raise ValidationError({'pattern': e.messages})
+
     def get_choices_list(self):
         """Return choices as list"""
         if self.choices:
-            return [choice.strip() for choice in self.choices.split(',')]
+            return list(parse_choices(self.choices))
         return []
 
 
@@ -76,11 +129,17 @@ class FormSubmission(models.Model):
     submitted_at = models.DateTimeField(auto_now_add=True)
     user_ip = models.GenericIPAddressField(null=True, blank=True)
     user_agent = models.TextField(blank=True, help_text="Browser info")
+    # Wide copy of the submission's data rows ({field label: value}) so
+    # reporting can read one row per submission instead of joining them
+    values = models.JSONField(default=dict, blank=True, editable=False)
 
     class Meta:
         verbose_name = "Form Submission"
         verbose_name_plural = "Form Submissions"
         ordering = ['-submitted_at']
+        indexes = [
+            models.Index(fields=['form', 'submitted_at'], name='submission_form_date_idx'),
+        ]
 
     def __str__(self):
         return f"{self.form.title} - {self.submitted_at}"
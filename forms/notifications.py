@@ -0,0 +1,81 @@
+import logging
+
+from django.db import transaction
+
+from core.outbox import queue_email
+
+from .models import Form, FormSubmission
+
+logger = logging.getLogger(__name__)
+
+# Submissions listed in one digest email; larger backlogs span several emails
+DIGEST_BATCH_SIZE = 200
+
+
+def _submission_lines(submission):
+    lines = [f"{label}: {value}" for label, value in submission.values.items()]
+    lines.extend([
+        "",
+        f"Submitted at: {submission.submitted_at}",
+        f"IP Address: {submission.user_ip}",
+    ])
+    return lines
+
+
+def queue_submission_email(form_obj, submission):
+    """
+    Queue the notification for one submission.
+
+    Does nothing when the form has no notification address or collects its
+    submissions into a digest instead. The body is built from the
+    submission's values snapshot, so no data rows are read back.
+    """
+    if not form_obj.email_notification or form_obj.email_digest:
+        return None
+    lines = [f"Form: {form_obj.title}", "", "Submitted Data:", "-" * 50, ""] + _submission_lines(submission)
+    return queue_email(
+        f"New Form Submission: {form_obj.title}",
+        "\n".join(lines),
+        [form_obj.email_notification],
+        kind='form_submission',
+    )
+
+
+def queue_digest(form_obj):
+    """
+    Queue digest emails covering a form's submissions since the last digest.
+
+    The form row is locked while its marker is advanced, so two runs cannot
+    send the same submissions twice. Returns the number of emails queued.
+    """
+    queued = 0
+    while True:
+        with transaction.atomic():
+            form_obj = Form.objects.select_for_update().get(pk=form_obj.pk)
+            if not form_obj.email_digest or not form_obj.email_notification:
+                return queued
+            submissions = list(
+                FormSubmission.objects.filter(form=form_obj, pk__gt=form_obj.digest_last_submission_id or 0)
+                .order_by('pk')[:DIGEST_BATCH_SIZE]
+            )
+            if not submissions:
+                return queued
+
+            lines = [f"Form: {form_obj.title}", f"{len(submissions)} new submission(s)"]
+            for number, submission in enumerate(submissions, 1):
+                lines.extend(["", "-" * 50, f"Submission {number}", ""] + _submission_lines(submission))
+            queue_email(
+                f"Form digest: {form_obj.title} ({len(submissions)} new)",
+                "\n".join(lines),
+                [form_obj.email_notification],
+                kind='form_digest',
+            )
+            Form.objects.filter(pk=form_obj.pk).update(digest_last_submission_id=submissions[-1].pk)
+            queued += 1
+            logger.info(f"Form digest queued for {form_obj.slug} covering {len(submissions)} submissions")
+
+
+def queue_digests():
+    """Queue digests for every form that has them enabled; returns emails queued"""
+    forms = Form.objects.filter(email_digest=True).exclude(email_notification='')
+    return sum(queue_digest(form_obj) for form_obj in forms)
@@ -0,0 +1,12 @@
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Form, FormField
+
+
+@receiver(post_save, sender=FormField)
+@receiver(post_delete, sender=FormField)
+def bump_fields_version(sender, instance, **kwargs):
+    """Invalidate cached form classes when a field is added, edited or removed."""
+    Form.objects.filter(pk=instance.form_id).update(fields_version=F('fields_version') + 1)
@@ -0,0 +1,32 @@
+from django.db import transaction
+
+from .forms import get_compiled_form
+from .models import FormSubmission, FormSubmissionData
+
+
+def store_submission(form_obj, cleaned_data, user_ip=None, user_agent=''):
+    """
+    Write one submission and all its field values in a single transaction.
+
+    The field values go in with one bulk INSERT, so a 30-field form costs
+    two INSERTs instead of 31. Field ids come from the cached form
+    definition.
+    """
+    with transaction.atomic():
+        submission = FormSubmission.objects.create(
+            form=form_obj,
+            user_ip=user_ip,
+            user_agent=user_agent,
+            values={field_label: str(value) for field_label, value in cleaned_data.items()},
+        )
+        field_ids = get_compiled_form(form_obj).field_ids
+        FormSubmissionData.objects.bulk_create([
+            FormSubmissionData(
+                submission=submission,
+                field_id=field_ids.get(field_label),
+                field_label=field_label,
+                value=str(value),
+            )
+            for field_label, value in cleaned_data.items()
+        ], batch_size=500)
+    return submission
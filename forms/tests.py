@@ -1 +1,367 @@
-# Create empty test file
+import csv
+import io
+import json
+import os
+import tempfile
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core import mail
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+from forms import forms as dynamic_forms
+from forms.analytics import daily_counts, value_histogram
+from core.models import OutboxEmail
+from core.outbox import drain
+from forms.export import iter_csv, iter_jsonl
+from forms.models import Form, FormField, FormSubmission
+from forms.notifications import queue_digests
+from forms.validation import check_pattern, compile_pattern
+from forms.submissions import store_submission
+
+
+class DynamicFormCacheTest(TestCase):
+    """Tests for the cached dynamic form classes"""
+
+    def setUp(self):
+        """Create test data"""
+        dynamic_forms.clear_compiled_forms()
+        self.client = Client()
+        self.form = Form.objects.create(title="Contact", slug="contact-form")
+        FormField.objects.create(form=self.form, label="Name", field_type="text", order=1)
+        FormField.objects.create(form=self.form, label="Email", field_type="email", order=2)
+
+    def _load(self):
+        return Form.objects.get(pk=self.form.pk)
+
+    def test_class_reused_without_field_queries(self):
+        """Test that a warm cache builds no class and runs no field query"""
+        first = dynamic_forms.get_dynamic_form(self._load())
+        form_obj = self._load()
+        with self.assertNumQueries(0):
+            second = dynamic_forms.get_dynamic_form(form_obj)
+        self.assertIs(first, second)
+        self.assertEqual(list(second.base_fields), ["Name", "Email"])
+
+    def test_field_change_invalidates(self):
+        """Test that editing a field produces a new form class"""
+        first = dynamic_forms.get_dynamic_form(self._load())
+        FormField.objects.create(form=self.form, label="Phone", field_type="phone", order=3)
+        second = dynamic_forms.get_dynamic_form(self._load())
+        self.assertIsNot(first, second)
+        self.assertIn("Phone", second.base_fields)
+
+    def test_field_delete_invalidates(self):
+        """Test that removing a field produces a new form class"""
+        dynamic_forms.get_dynamic_form(self._load())
+        FormField.objects.get(label="Email").delete()
+        self.assertEqual(list(dynamic_forms.get_dynamic_form(self._load()).base_fields), ["Name"])
+
+    @override_settings(DYNAMIC_FORM_CACHE_SIZE=1)
+    def test_least_recently_used_evicted(self):
+        """Test that the cache keeps at most DYNAMIC_FORM_CACHE_SIZE classes"""
+        other = Form.objects.create(title="Other", slug="other-form")
+        first = dynamic_forms.get_dynamic_form(self._load())
+        dynamic_forms.get_dynamic_form(other)
+        self.assertIsNot(first, dynamic_forms.get_dynamic_form(self._load()))
+
+    def test_form_page_renders_from_cache(self):
+        """Test that the form page renders the cached fields"""
+        response = self.client.get(reverse('forms:detail', args=[self.form.slug]))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'name="Email"')
+
+
+class FormSubmissionStorageTest(TestCase):
+    """Tests for storing dynamic form submissions"""
+
+    def setUp(self):
+        """Create test data"""
+        dynamic_forms.clear_compiled_forms()
+        self.client = Client()
+        self.form = Form.objects.create(title="Survey", slug="survey")
+        self.fields = [
+            FormField.objects.create(form=self.form, label=f"Question {i}", field_type="text", order=i)
+            for i in range(30)
+        ]
+        self.post_data = {f"Question {i}": f"Answer {i}" for i in range(30)}
+
+    def test_post_stores_all_values(self):
+        """Test that a submission stores one data row per field"""
+        response = self.client.post(reverse('forms:detail', args=[self.form.slug]), self.post_data)
+        submission = FormSubmission.objects.get()
+        self.assertRedirects(response, reverse('forms:success', args=[submission.id]))
+        values = dict(submission.data.values_list('field_label', 'value'))
+        self.assertEqual(values, self.post_data)
+        self.assertEqual(submission.data.get(field_label="Question 3").field, self.fields[3])
+
+    def test_single_submission_uses_two_inserts(self):
+        """Test that a 30-field submission is two bulk INSERTs in one transaction"""
+        form_obj = Form.objects.get(pk=self.form.pk)
+        dynamic_forms.get_compiled_form(form_obj)
+        with self.assertNumQueries(4):  # savepoint, submission, data rows, release
+            store_submission(form_obj, self.post_data, user_ip="127.0.0.1")
+
+    def test_submission_keeps_values_snapshot(self):
+        """Test that the wide values snapshot is written with the submission"""
+        submission = store_submission(self.form, self.post_data)
+        submission.refresh_from_db()
+        self.assertEqual(submission.values, self.post_data)
+
+
+class FormSubmissionExportTest(TestCase):
+    """Tests for exporting submissions as wide CSV / JSON Lines"""
+
+    def setUp(self):
+        """Create test data"""
+        self.form = Form.objects.create(title="Feedback", slug="feedback")
+        FormField.objects.create(form=self.form, label="Name", field_type="text", order=1)
+        FormField.objects.create(form=self.form, label="Email", field_type="email", order=2)
+        store_submission(self.form, {"Name": "Ann", "Email": "ann@example.com"}, user_ip="10.0.0.1")
+        store_submission(self.form, {"Name": "Bob", "Email": "bob@example.com"})
+        # A field removed after people answered it keeps its column
+        old = FormField.objects.create(form=self.form, label="Phone", field_type="text", order=3)
+        store_submission(self.form, {"Name": "Cy", "Email": "cy@example.com", "Phone": "555"})
+        old.delete()
+
+    def test_csv_has_one_column_per_label(self):
+        """Test that the CSV export pivots field values into columns"""
+        rows = list(csv.DictReader(io.StringIO(''.join(iter_csv(self.form)))))
+        self.assertEqual(
+            list(rows[0].keys()),
+            ['submission_id', 'submitted_at', 'user_ip', 'Name', 'Email', 'Phone'],
+        )
+        self.assertEqual([row['Name'] for row in rows], ['Ann', 'Bob', 'Cy'])
+        self.assertEqual(rows[0]['user_ip'], '10.0.0.1')
+        self.assertEqual(rows[0]['Phone'], '')
+        self.assertEqual(rows[2]['Phone'], '555')
+
+    def test_jsonl_export(self):
+        """Test that the JSON Lines export has one object per submission"""
+        records = [json.loads(line) for line in iter_jsonl(self.form)]
+        self.assertEqual(len(records), 3)
+        self.assertEqual(records[1]['fields']['Email'], 'bob@example.com')
+        self.assertNotIn('Phone', records[1]['fields'])
+
+    def test_formulas_neutralised(self):
+        """Test that answers a spreadsheet would run as formulas are prefixed"""
+        store_submission(self.form, {"Name": "=HYPERLINK(\"http://evil\")", "Email": "@x.com"})
+        rows = list(csv.DictReader(io.StringIO(''.join(iter_csv(self.form)))))
+        self.assertEqual(rows[-1]['Name'], "'=HYPERLINK(\"http://evil\")")
+        self.assertEqual(rows[-1]['Email'], "'@x.com")
+
+    def test_label_clashing_with_meta_column(self):
+        """Test that a field labelled like a meta column gets its own header"""
+        FormField.objects.create(form=self.form, label="submission_id", field_type="text", order=4)
+        submission = store_submission(self.form, {"Name": "Di", "Email": "di@example.com", "submission_id": "x"})
+        rows = list(csv.DictReader(io.StringIO(''.join(iter_csv(self.form)))))
+        self.assertEqual(rows[-1]['submission_id'], str(submission.pk))
+        self.assertEqual(rows[-1]['submission_id (field)'], 'x')
+
+    def test_submission_without_answers_included(self):
+        """Test that a submission with no data rows still gets a row"""
+        empty = FormSubmission.objects.create(form=self.form)
+        rows = list(csv.DictReader(io.StringIO(''.join(iter_csv(self.form)))))
+        self.assertEqual(rows[-1]['submission_id'], str(empty.pk))
+        self.assertEqual(rows[-1]['Name'], '')
+
+    def test_management_command_writes_file(self):
+        """Test the export_form_submissions command"""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'export.jsonl')
+            call_command('export_form_submissions', 'feedback', format='jsonl', output=path)
+            with open(path, encoding='utf-8') as f:
+                self.assertEqual(len(f.readlines()), 3)
+
+    def test_admin_action_streams_csv(self):
+        """Test that the admin action returns a streaming download"""
+        User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        self.client.login(username='admin', password='password')
+        response = self.client.post(reverse('admin:forms_form_changelist'), {
+            'action': 'export_csv',
+            '_selected_action': [self.form.pk],
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertIn('feedback-submissions.csv', response['Content-Disposition'])
+        content = b''.join(response.streaming_content).decode()
+        self.assertIn('ann@example.com', content)
+
+
+class FormSummaryTest(TestCase):
+    """Tests for submission summaries read from the values snapshot"""
+
+    def setUp(self):
+        """Create test data"""
+        self.form = Form.objects.create(title="Poll", slug="poll")
+        FormField.objects.create(
+            form=self.form, label="Colour", field_type="select", choices="Red, Green, Blue", order=1,
+        )
+        FormField.objects.create(form=self.form, label="Comment", field_type="text", is_required=False, order=2)
+        answers = ["Red", "Green", "Red", "Blue", "Red"]
+        for colour in answers:
+            store_submission(self.form, {"Colour": colour, "Comment": ""})
+
+    def test_histogram_reads_only_submissions(self):
+        """Test that answer counts come from one grouped query on the snapshot"""
+        with self.assertNumQueries(1):
+            histogram = value_histogram(self.form, "Colour")
+        self.assertEqual(histogram, [("Red", 3), ("Blue", 1), ("Green", 1)])
+
+    def test_daily_counts(self):
+        """Test that today's submissions are counted and empty days are zero"""
+        days = daily_counts(self.form, days=7)
+        self.assertEqual(len(days), 7)
+        self.assertEqual(days[-1][1], 5)
+        self.assertEqual(sum(total for day, total in days[:-1]), 0)
+
+    def test_admin_summary_page(self):
+        """Test the admin summary view"""
+        User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        self.client.login(username='admin', password='password')
+        response = self.client.get(reverse('admin:forms_form_summary', args=[self.form.pk]))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "Colour")
+        self.assertContains(response, "<td>Red</td><td>3</td>", html=True)
+        self.assertNotContains(response, "<h2>Comment</h2>", html=True)
+
+
+@override_settings(EMAIL_OUTBOX_WORKER='command')
+class FormNotificationTest(TestCase):
+    """Tests for queued form notification emails and digests"""
+
+    def setUp(self):
+        """Create test data"""
+        dynamic_forms.clear_compiled_forms()
+        self.form = Form.objects.create(title="Contact", slug="contact", email_notification="staff@example.com")
+        FormField.objects.create(form=self.form, label="Name", field_type="text", order=1)
+
+    def submit(self, name):
+        return self.client.post(reverse('forms:detail', args=[self.form.slug]), {"Name": name})
+
+    def test_submission_queues_email(self):
+        """Test that a submission queues its notification instead of sending it"""
+        self.submit("Ann")
+        self.assertEqual(len(mail.outbox), 0)
+        email = OutboxEmail.objects.get()
+        self.assertEqual(email.kind, 'form_submission')
+        self.assertIn("Name: Ann", email.body)
+
+        drain()
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ["staff@example.com"])
+
+    def test_digest_collects_submissions(self):
+        """Test that digest forms send one email covering new submissions"""
+        self.submit("Before")
+        self.form.email_digest = True
+        self.form.save()
+        OutboxEmail.objects.all().delete()
+
+        self.submit("Ann")
+        self.submit("Bob")
+        self.assertFalse(OutboxEmail.objects.exists())
+
+        self.assertEqual(queue_digests(), 1)
+        email = OutboxEmail.objects.get()
+        self.assertEqual(email.kind, 'form_digest')
+        self.assertIn("Name: Ann", email.body)
+        self.assertIn("Name: Bob", email.body)
+        self.assertNotIn("Before", email.body)
+
+        # Nothing new, nothing sent
+        self.assertEqual(queue_digests(), 0)
+
+    def test_stale_save_keeps_digest_marker(self):
+        """Test that saving an old copy of a form does not rewind the digest"""
+        self.form.email_digest = True
+        self.form.save()
+        stale = Form.objects.get(pk=self.form.pk)
+
+        self.submit("Ann")
+        self.assertEqual(queue_digests(), 1)
+        stale.title = "Contact us"
+        stale.save()
+
+        self.assertEqual(queue_digests(), 0)
+        self.assertEqual(OutboxEmail.objects.filter(kind='form_digest').count(), 1)
+
+    def test_disabling_digest_sends_pending_submissions(self):
+        """Test that switching the digest off flushes what it was holding"""
+        self.form.email_digest = True
+        self.form.save()
+        self.submit("Ann")
+
+        self.form.email_digest = False
+        self.form.save()
+        email = OutboxEmail.objects.get(kind='form_digest')
+        self.assertIn("Name: Ann", email.body)
+        self.assertIsNone(Form.objects.get(pk=self.form.pk).digest_last_submission_id)
+
+        self.submit("Bob")
+        self.assertEqual(OutboxEmail.objects.filter(kind='form_submission').count(), 1)
+
+    def test_saving_without_digest_does_not_flush(self):
+        """Test that only switching the digest off queues a final digest"""
+        form_obj = Form.objects.get(pk=self.form.pk)
+        with mock.patch('forms.notifications.queue_digest') as flush:
+            form_obj.title = "Contact us"
+            form_obj.save()
+        flush.assert_not_called()
+
+    def test_save_keeps_default_semantics(self):
+        """Test that saving a concurrently deleted form behaves like any model save"""
+        form_obj = Form.objects.get(pk=self.form.pk)
+        Form.objects.filter(pk=form_obj.pk).delete()
+        form_obj.save()
+        self.assertTrue(Form.objects.filter(pk=form_obj.pk).exists())
+
+
+class FieldPatternTest(TestCase):
+    """Tests for FormField.pattern validation"""
+
+    def setUp(self):
+        """Create test data"""
+        dynamic_forms.clear_compiled_forms()
+        self.form = Form.objects.create(title="Order", slug="order")
+
+    def test_pattern_is_enforced(self):
+        """Test that submitted values must match the whole pattern"""
+        FormField.objects.create(form=self.form, label="Code", field_type="text", pattern=r"[A-Z]{3}-\d{4}")
+        DynamicForm = dynamic_forms.get_dynamic_form(Form.objects.get(pk=self.form.pk))
+        self.assertTrue(DynamicForm({"Code": "ABC-1234"}).is_valid())
+        self.assertFalse(DynamicForm({"Code": "ABC-12345"}).is_valid())
+        self.assertFalse(DynamicForm({"Code": "xABC-1234"}).is_valid())
+
+    def test_patterns_compiled_once(self):
+        """Test that the same pattern string reuses one compiled regex"""
+        self.assertIs(compile_pattern(r"\d+"), compile_pattern(r"\d+"))
+
+    def test_safe_patterns_accepted(self):
+        """Test that ordinary patterns pass the safety check"""
+        for pattern in [r"[A-Z]{3}-\d{4}", r"\+?[0-9 ()-]{7,20}", r"(\d{3}-?)+", r"(cat|dog)s?", r"[^@]+@[^@]+",
+                        r"(cat|dog)+", r"(\d|\s)+", r"(ab|Ac)+"]:
+            check_pattern(pattern)
+
+    def test_unsafe_patterns_rejected(self):
+        """Test that patterns prone to catastrophic backtracking are refused"""
+        for pattern in [r"(a+)+$", r"(\w+\s?)*$", r"(a|a?)+c", r"(.*)*x", r"(\w)\1", r"[unclosed",
+                        r"(.a|\wa)+$", r"(\w\w|\d)+", r"(x|[^y])+", r"(?i)(ab|Ac)+", r"((?:ab)?c|ad)+"]:
+            with self.assertRaises(ValidationError, msg=pattern):
+                check_pattern(pattern)
+
+    def test_admin_rejects_unsafe_pattern(self):
+        """Test that saving a field with a hostile pattern fails validation"""
+        field = FormField(form=self.form, label="Name", field_type="text", pattern=r"(a+)+$")
+        with self.assertRaises(ValidationError) as context:
+            field.full_clean()
+        self.assertIn('pattern', context.exception.message_dict)
+
+    def test_unsafe_stored_pattern_is_not_run(self):
+        """Test that a hostile pattern saved earlier is skipped, not evaluated"""
+        FormField.objects.create(form=self.form, label="Name", field_type="text", pattern=r"(a+)+$")
+        with self.assertLogs('forms.validation', 'WARNING'):
+            DynamicForm = dynamic_forms.get_dynamic_form(Form.objects.get(pk=self.form.pk))
+        self.assertTrue(DynamicForm({"Name": "a" * 40 + "!"}).is_valid())
@@ -0,0 +1,224 @@
+# Validation helpers for admin-defined form fields.
+#
+# FormField.pattern is written by staff but evaluated against every
+# submission, so patterns are vetted when the field is saved and compiled
+# once per distinct pattern. Python's re engine has no timeout, which is why
+# patterns that can backtrack exponentially are refused outright.
+import functools
+import logging
+import re
+
+from django.core.exceptions import ValidationError
+from django.core.validators import RegexValidator
+
+try:
+    from re import _parser as sre_parse
+except ImportError:  # Python < 3.11
+    import sre_parse
+
+logger = logging.getLogger(__name__)
+
+_REPEATS = {sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT}
+
+
+class UnsafePattern(ValueError):
+    pass
+
+
+# Single-character classes that share no character, in either order
+_DISJOINT_CATEGORIES = {
+    frozenset(pair) for pair in [
+        (sre_parse.CATEGORY_DIGIT, sre_parse.CATEGORY_NOT_DIGIT),
+        (sre_parse.CATEGORY_WORD, sre_parse.CATEGORY_NOT_WORD),
+        (sre_parse.CATEGORY_SPACE, sre_parse.CATEGORY_NOT_SPACE),
+        (sre_parse.CATEGORY_DIGIT, sre_parse.CATEGORY_SPACE),
+        (sre_parse.CATEGORY_WORD, sre_parse.CATEGORY_SPACE),
+        (sre_parse.CATEGORY_DIGIT, sre_parse.CATEGORY_NOT_WORD),
+    ]
+}
+_CATEGORY_PATTERNS = {
+    sre_parse.CATEGORY_DIGIT: re.compile(r'\d'),
+    sre_parse.CATEGORY_NOT_DIGIT: re.compile(r'\D'),
+    sre_parse.CATEGORY_WORD: re.compile(r'\w'),
+    sre_parse.CATEGORY_NOT_WORD: re.compile(r'\W'),
+    sre_parse.CATEGORY_SPACE: re.compile(r'\s'),
+    sre_parse.CATEGORY_NOT_SPACE: re.compile(r'\S'),
+}
+# Ranges wider than this are not enumerated and count as overlapping
+_MAX_ENUMERATED_RANGE = 4096
+
+
+def _first_chars(items):
+    """
+    What an alternative's first character can be, as a list of
+    ('literal', code), ('range', low, high), ('category', category) and
+    ('any',) items, or None when that cannot be worked out (including when
+    the alternative can match the empty string).
+    """
+    items = list(items)
+    while items:
+        op, av = items[0]
+        if op == sre_parse.LITERAL:
+            return [('literal', av)]
+        if op == sre_parse.ANY:
+            return [('any',)]
+        if op == sre_parse.IN:
+            chars = []
+            for set_op, set_av in av:
+                if set_op == sre_parse.LITERAL:
+                    chars.append(('literal', set_av))
+                elif set_op == sre_parse.RANGE:
+                    chars.append(('range', *set_av))
+                elif set_op == sre_parse.CATEGORY and set_av in _CATEGORY_PATTERNS:
+                    chars.append(('category', set_av))
+                else:
+                    # NEGATE and anything unusual
+                    return None
+            return chars
+        if op == sre_parse.AT:
+            # Anchors such as ^ and \b take no character
+            items = items[1:]
+        elif op == sre_parse.SUBPATTERN:
+            items = list(av[-1]) + items[1:]
+        elif op in _REPEATS:
+            low, high, sub = av
+            if low > 0:
+                items = list(sub) + items[1:]
+            else:
+                first, rest = _first_chars(sub), _first_chars(items[1:])
+                return None if first is None or rest is None else first + rest
+        elif op == sre_parse.BRANCH:
+            chars = []
+            for alternative in av[1]:
+                first = _first_chars(list(alternative) + items[1:])
+                if first is None:
+                    return None
+                chars.extend(first)
+            return chars
+        else:
+            return None
+    return None
+
+
+def _codes(char):
+    """The code points a literal or small range stands for, or None"""
+    if char[0] == 'literal':
+        return [char[1]]
+    if char[0] == 'range' and char[2] - char[1] < _MAX_ENUMERATED_RANGE:
+        return range(char[1], char[2] + 1)
+    return None
+
+
+def _matches(char, code, ignore_case):
+    variants = {code}
+    if ignore_case:
+        variants.update(ord(c) for c in (chr(code).lower(), chr(code).upper()) if len(c) == 1)
+    for variant in variants:
+        if char[0] == 'literal' and variant == char[1]:
+            return True
+        if char[0] == 'range' and char[1] <= variant <= char[2]:
+            return True
+        if char[0] == 'category' and _CATEGORY_PATTERNS[char[1]].match(chr(variant)):
+            return True
+    return False
+
+
+def _overlap(first, second, ignore_case):
+    """Whether two first characters might be the same; True unless provably not"""
+    if first[0] == 'any' or second[0] == 'any':
+        return True
+    if first[0] == 'category' and second[0] == 'category':
+        return frozenset((first[1], second[1])) not in _DISJOINT_CATEGORIES
+    for one, other in ((first, second), (second, first)):
+        codes = _codes(one)
+        if codes is not None:
+            return any(_matches(other, code, ignore_case) for code in codes)
+    return True
+
+
+def _alternatives_overlap(alternatives, ignore_case):
+    starts = [_first_chars(alternative) for alternative in alternatives]
+    if any(start is None for start in starts):
+        return True
+    return any(
+        _overlap(first, second, ignore_case)
+        for index, start in enumerate(starts)
+        for other in starts[index + 1:]
+        for first in start
+        for second in other
+    )
+
+
+def _check(items, repeated, ignore_case=False):
+    """
+    Walk a parsed pattern and raise UnsafePattern on constructs that can
+    backtrack exponentially: a variable-length repeat inside another repeat
+    (``(a+)+``, ``(\\w+\\s?)*``), alternatives that can match the same text
+    inside a repeat (``(a|a?)+``, ``(.a|\\wa)+``), and backreferences.
+
+    Alternatives inside a repeat must start with characters that provably
+    differ; when that cannot be shown the pattern is refused.
+    """
+    for op, av in items:
+        if op in _REPEATS:
+            low, high, sub = av
+            if repeated and high != low and high > 1:
+                raise UnsafePattern("nested repetition such as (a+)+")
+            _check(sub, repeated or high > 1, ignore_case)
+        elif op == sre_parse.SUBPATTERN:
+            add_flags = av[1] if len(av) == 4 else 0
+            _check(av[-1], repeated, ignore_case or bool(add_flags & re.IGNORECASE))
+        elif op == sre_parse.BRANCH:
+            alternatives = av[1]
+            if repeated and _alternatives_overlap(alternatives, ignore_case):
+                raise UnsafePattern("overlapping alternatives inside a repetition such as (a|a?)+")
+            for alternative in alternatives:
+                _check(alternative, repeated, ignore_case)
+        elif op in (sre_parse.ASSERT, sre_parse.ASSERT_NOT):
+            _check(av[1], repeated, ignore_case)
+        elif op in (sre_parse.GROUPREF, sre_parse.GROUPREF_EXISTS):
+            raise UnsafePattern("backreferences")
+
+
+def check_pattern(pattern):
+    """Raise ValidationError if pattern is not a valid, safe regular expression"""
+    try:
+        parsed = sre_parse.parse(pattern)
+    except re.error as e:
+        raise ValidationError(f"Invalid regular expression: {e}", code='invalid_pattern')
+    try:
+        _check(list(parsed), False, bool(parsed.state.flags & re.IGNORECASE))
+    except UnsafePattern as e:
+        raise ValidationError(
+            f"This pattern could take too long to check ({e}). Please simplify it.",
+            code='unsafe_pattern',
+        )
+
+
+@functools.lru_cache(maxsize=256)
+def compile_pattern(pattern):
+    """Compile a field pattern to match the whole value; cached per pattern"""
+    return re.compile(rf'\A(?:{pattern})\Z')
+
+
+def pattern_validator(pattern):
+    """
+    A validator enforcing pattern on the whole value, or None.
+
+    Patterns saved before they were vetted are skipped (and logged) rather
+    than run against submissions if they turn out to be invalid or unsafe.
+    """
+    if not pattern:
+        return None
+    try:
+        check_pattern(pattern)
+    except ValidationError as e:
+        logger.warning(f"Ignoring unusable form field pattern {pattern!r}: {e.messages[0]}")
+        return None
+    return RegexValidator(compile_pattern(pattern), "Enter a value in the expected format.", code='invalid')
+
+
+@functools.lru_cache(maxsize=256)
+def parse_choices(choices):
+    """Split a comma-separated choices string once; cached per string"""
+    return tuple(choice.strip() for choice in choices.split(','))
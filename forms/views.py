@@ -1,10 +1,13 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
+from django.db import transaction
 from django.views.decorators.http import require_http_methods
 from django.utils.decorators import decorator_from_middleware_with_args
 from django.middleware.common import CommonMiddleware
 from .models import Form, FormSubmission, FormSubmissionData, FormField
-from .forms import create_dynamic_form
+from .forms import get_dynamic_form
+from .notifications import queue_submission_email
+from .submissions import store_submission
 
 
 def get_client_ip(request):
@@ -33,37 +36,25 @@ def form_detail(request, slug):
     form_obj = get_object_or_404(Form, slug=slug, is_active=True)
     
     if request.method == 'POST':
-        DynamicForm = create_dynamic_form(form_obj)
+        DynamicForm = get_dynamic_form(form_obj)
         form = DynamicForm(request.POST)
         
         if form.is_valid():
-            # Create submission
-            submission = FormSubmission.objects.create(
-                form=form_obj,
-                user_ip=get_client_ip(request),
-                user_agent=request.META.get('HTTP_USER_AGENT', '')
-            )
-            
-            # Store form data
-            fields_dict = {field.label: field for field in form_obj.fields.all()}
-            
-            for field_label, value in form.cleaned_data.items():
-                field = fields_dict.get(field_label)
-                FormSubmissionData.objects.create(
-                    submission=submission,
-                    field=field,
-                    field_label=field_label,
-                    value=str(value)
+            # Submission, field values and queued notification in one
+            # transaction; the email is sent outside the request
+            with transaction.atomic():
+                submission = store_submission(
+                    form_obj,
+                    form.cleaned_data,
+                    user_ip=get_client_ip(request),
+                    user_agent=request.META.get('HTTP_USER_AGENT', ''),
                 )
-            
-            # Send email notification if configured
-            if form_obj.email_notification:
-                send_form_submission_email(form_obj, submission)
+                queue_submission_email(form_obj, submission)
             
             messages.success(request, f'Form "{form_obj.title}" submitted successfully!')
             return redirect('forms:success', submission_id=submission.id)
     else:
-        DynamicForm = create_dynamic_form(form_obj)
+        DynamicForm = get_dynamic_form(form_obj)
         form = DynamicForm()
     
     context = {
@@ -85,32 +76,3 @@ def form_success(request, submission_id):
     }
     return render(request, 'forms/form_success.html', context)
 
-
-def send_form_submission_email(form_obj, submission):
-    """Send email notification for form submission"""
-    from django.core.mail import send_mail
-    from django.template.loader import render_to_string
-    
-    try:
-        subject = f'New Form Submission: {form_obj.title}'
-        
-        # Build email content
-        email_content = f"Form: {form_obj.title}\n\n"
-        email_content += "Submitted Data:\n"
-        email_content += "-" * 50 + "\n\n"
-        
-        for data in submission.data.all():
-            email_content += f"{data.field_label}: {data.value}\n"
-        
-        email_content += f"\n\nSubmitted at: {submission.submitted_at}\n"
-        email_content += f"IP Address: {submission.user_ip}\n"
-        
-        send_mail(
-            subject,
-            email_content,
-            'noreply@kyagreen.com',
-            [form_obj.email_notification],
-            fail_silently=True,
-        )
-    except Exception as e:
-        print(f"Error sending form submission email: {e}")
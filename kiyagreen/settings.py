@@ -128,6 +128,21 @@ STATIC_URL = "static/"
 STATICFILES_DIRS = [BASE_DIR / "static"]
 STATIC_ROOT = BASE_DIR / "staticfiles"
 
+# With STATIC_PIPELINE=True, collectstatic minifies CSS/JS, writes
+# content-hashed names plus .gz/.br copies, and the app serves them from
+# STATIC_ROOT itself (core.views.static_file)
+STATIC_PIPELINE = os.getenv("STATIC_PIPELINE", "False") == "True"
+STORAGES = {
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    "staticfiles": {
+        "BACKEND": (
+            "core.storage.CompressedManifestStaticFilesStorage"
+            if STATIC_PIPELINE
+            else "django.contrib.staticfiles.storage.StaticFilesStorage"
+        ),
+    },
+}
+
 MEDIA_URL = "media/"
 MEDIA_ROOT = BASE_DIR / "media"
 
@@ -141,6 +156,47 @@ CKEDITOR_CONFIGS = {
     },
 }
 
+# Caching
+# Use a cache shared by every worker in production (e.g. file-based or
+# memcached) so invalidations reach all gunicorn processes.
+CACHES = {
+    "default": {
+        "BACKEND": os.getenv("CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"),
+        "LOCATION": os.getenv("CACHE_LOCATION", "kiyagreen"),
+    }
+}
+
+# Site-wide single-row models (logo, contact info, home/information pages)
+SINGLETON_CACHE_TIMEOUT = None  # shared cache: keep until invalidated
+SINGLETON_LOCAL_TTL = int(os.getenv("SINGLETON_LOCAL_TTL", "5"))  # per-process copy, seconds
+
+# Rendered public pages for anonymous visitors (core.page_cache)
+PAGE_CACHE_TIMEOUT = int(os.getenv("PAGE_CACHE_TIMEOUT", "300"))  # seconds before a page is re-rendered
+PAGE_CACHE_STALE_TIMEOUT = 60  # seconds an old copy may be served while one request re-renders it
+PAGE_CACHE_LOCK_TIMEOUT = 30  # seconds
+
+# Rendered product cards, keyed by product and last edit (products.cards)
+PRODUCT_CARD_CACHE_TIMEOUT = 60 * 60  # seconds
+
+# Product listing page size (cursor-paginated)
+PRODUCTS_PER_PAGE = 24
+
+# Product page views are buffered per process and written in batches
+PRODUCT_VIEWS_FLUSH_INTERVAL = 30  # seconds
+PRODUCT_VIEWS_FLUSH_THRESHOLD = 500  # buffered views
+
+# Built dynamic form classes kept per process (least recently used evicted)
+DYNAMIC_FORM_CACHE_SIZE = 128
+
+# Widths (px) of the resized copies made for uploaded images (core.images)
+IMAGE_VARIANT_WIDTHS = [160, 320, 640, 1200]
+IMAGE_VARIANT_QUALITY = 82
+
+# Sizes (width, height; 0 = keep aspect ratio) served by /img/<w>x<h>/<fmt>/<path>
+IMAGE_RESIZE_SIZES = [(60, 60), (160, 160), (320, 0), (640, 0), (1200, 0)]
+IMAGE_RESIZE_CACHE_DIR = MEDIA_ROOT / "resized"
+IMAGE_RESIZE_MAX_AGE = 30 * 24 * 60 * 60  # seconds
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -155,3 +211,11 @@ EMAIL_HOST_USER = os.getenv("EMAIL_HOST_USER", "hadibuxmahessar@gmail.com")
 EMAIL_HOST_PASSWORD = os.getenv("EMAIL_HOST_PASSWORD", "wtfu yilm bktz wqwf")
 DEFAULT_FROM_EMAIL = os.getenv("DEFAULT_FROM_EMAIL", "admin@example.com")
 ADMIN_EMAIL = os.getenv("ADMIN_EMAIL", "hadibuxmahessar@gmail.com")  # Email address to receive admin notifications for new RFQs
+
+# Email outbox: notifications are queued in the database and delivered
+# outside the request. "thread" drains the queue in a background thread after
+# each commit; "command" leaves it to `manage.py send_queued_email --loop`.
+# Run the command (e.g. from cron) in either mode to pick up retries.
+EMAIL_OUTBOX_WORKER = os.getenv("EMAIL_OUTBOX_WORKER", "thread")
+EMAIL_OUTBOX_MAX_ATTEMPTS = 5
+EMAIL_OUTBOX_RETRY_DELAY = 60  # seconds, doubled after each failed attempt
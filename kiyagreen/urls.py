@@ -1,8 +1,10 @@
 """
 URL configuration for kiyagreen project.
 """
+import re
+
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
 from django.conf import settings
 from django.conf.urls.static import static
 from core import views as core_views
@@ -13,6 +15,7 @@ urlpatterns = [
     path("search/", core_views.search, name="search"),
     path("information/", core_views.information, name="information"),
     path("contact/", core_views.contact, name="contact"),
+    path("img/<int:width>x<int:height>/<str:fmt>/<path:path>", core_views.resized_image, name="resized_image"),
     path("products/", include("products.urls")),
     path("services/", include("services.urls")),
     path("rfq/", include("rfq.urls")),
@@ -20,6 +23,12 @@ urlpatterns = [
     path("ckeditor/", include("ckeditor_uploader.urls")),
 ]
 
+# Collected static files, precompressed, served by the app itself
+if settings.STATIC_PIPELINE:
+    urlpatterns += [
+        re_path(rf"^{re.escape(settings.STATIC_URL.lstrip('/'))}(?P<path>.*)$", core_views.static_file),
+    ]
+
 # Serve media files in development
 if settings.DEBUG:
     urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
@@ -1,6 +1,6 @@
 from django import forms
 from django.contrib import admin
-from .models import Category, Product, ProductImage, ProductAttribute
+from .models import Category, Product, ProductImage, ProductAttribute, ProductViewDaily
 
 
 class ProductAdminForm(forms.ModelForm):
@@ -18,10 +18,7 @@ class ProductAdminForm(forms.ModelForm):
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        # Get all categories and sort them by hierarchy
-        categories = Category.objects.all().order_by('order', 'name')
-        
-        # Create a sorted queryset with hierarchical display
+        # Create a sorted list with hierarchical display
         choices = [('', '---------')]  # Empty choice
         
         def add_category_choices(category, level=0):
@@ -31,12 +28,11 @@ class ProductAdminForm(forms.ModelForm):
             choices.append((category.id, display_name))
             
             # Add children
-            for child in category.children.all().order_by('order', 'name'):
+            for child in category.child_nodes:
                 add_category_choices(child, level + 1)
         
-        # Add root categories first
-        root_categories = categories.filter(parent__isnull=True)
-        for cat in root_categories:
+        # Whole tree in one query, root categories first
+        for cat in Category.tree():
             add_category_choices(cat)
         
         self.fields['category'].choices = choices
@@ -90,3 +86,19 @@ class ProductAdmin(admin.ModelAdmin):
 
     def save_model(self, request, obj, form, change):
         super().save_model(request, obj, form, change)
+
+
+@admin.register(ProductViewDaily)
+class ProductViewDailyAdmin(admin.ModelAdmin):
+    list_display = ['product', 'date', 'views']
+    list_filter = ['date']
+    search_fields = ['product__name', 'product__sku']
+    date_hierarchy = 'date'
+    list_select_related = ['product']
+
+    def has_add_permission(self, request):
+        # Rows are written by the view counter
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,233 @@
+import bisect
+import threading
+import uuid
+from collections import defaultdict
+
+from django.core.cache import cache
+
+from .models import Product
+
+# Shared change log. Each product change takes the next number from
+# SEQUENCE_CACHE_KEY and stores the product id under CHANGE_CACHE_KEY, so
+# other workers reload just the products changed since their last look.
+# GENERATION_CACHE_KEY starts a new log when the cache was cleared; a worker
+# on an older generation, or too far behind, rebuilds the whole index.
+GENERATION_CACHE_KEY = 'products:autocomplete_generation'
+SEQUENCE_CACHE_KEY = 'products:autocomplete_sequence'
+CHANGE_CACHE_KEY = 'products:autocomplete_change:{}'
+CHANGE_LOG_TIMEOUT = 60 * 60 * 24
+# Changes replayed one by one; further behind than this, rebuild instead
+MAX_REPLAYED_CHANGES = 500
+
+# Ranking classes, best first
+EXACT_SKU, NAME_PREFIX, WORD_PREFIX, SKU_PREFIX, SUBSTRING = range(5)
+
+
+def _trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class AutocompleteIndex:
+    """
+    In-memory prefix and trigram index over active product names and SKUs.
+
+    Prefix lookups bisect sorted lists of (key, product id) pairs, one per
+    ranking class: full names, the name from each later word on, and SKUs.
+    Substring lookups intersect trigram postings and confirm the hit against
+    the text.
+    """
+    PREFIX_LISTS = ('names', 'words', 'skus')
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._keys = {kind: [] for kind in self.PREFIX_LISTS}
+        self._postings = defaultdict(set)
+        self.version = None
+
+    def _prefix_keys(self, product_id, name, sku):
+        """(list, key) pairs for a product"""
+        words = name.split()
+        keys = {('names', (name, product_id))}
+        keys.update(('words', (' '.join(words[i:]), product_id)) for i in range(1, len(words)))
+        if sku:
+            keys.add(('skus', (sku, product_id)))
+        return keys
+
+    def _add(self, product_id, name, sku):
+        name_key, sku_key = name.lower(), (sku or '').lower()
+        self._entries[product_id] = (name, sku, name_key, sku_key)
+        for kind, key in self._prefix_keys(product_id, name_key, sku_key):
+            bisect.insort(self._keys[kind], key)
+        for gram in _trigrams(name_key) | _trigrams(sku_key):
+            self._postings[gram].add(product_id)
+
+    def _remove(self, product_id):
+        entry = self._entries.pop(product_id, None)
+        if entry is None:
+            return
+        name, sku, name_key, sku_key = entry
+        for kind, key in self._prefix_keys(product_id, name_key, sku_key):
+            keys = self._keys[kind]
+            position = bisect.bisect_left(keys, key)
+            if position < len(keys) and keys[position] == key:
+                del keys[position]
+        for gram in _trigrams(name_key) | _trigrams(sku_key):
+            ids = self._postings.get(gram)
+            if ids is not None:
+                ids.discard(product_id)
+                if not ids:
+                    del self._postings[gram]
+
+    def rebuild(self, version=None):
+        """Reload every active product from the database"""
+        rows = Product.objects.filter(is_active=True).values_list('pk', 'name', 'sku')
+        with self._lock:
+            self._entries = {}
+            self._keys = {kind: [] for kind in self.PREFIX_LISTS}
+            self._postings = defaultdict(set)
+            for product_id, name, sku in rows:
+                self._add(product_id, name, sku)
+            self.version = version
+
+    def apply(self, product_ids, version=None):
+        """Reload a set of changed products in one query"""
+        rows = Product.objects.filter(pk__in=product_ids, is_active=True).values_list('pk', 'name', 'sku')
+        with self._lock:
+            for product_id in product_ids:
+                self._remove(product_id)
+            for product_id, name, sku in rows:
+                self._add(product_id, name, sku)
+            self.version = version
+
+    def update(self, product, version=None):
+        """Apply one product change; inactive products are removed"""
+        with self._lock:
+            self._remove(product.pk)
+            if product.is_active:
+                self._add(product.pk, product.name, product.sku)
+            self.version = version
+
+    def remove(self, product_id, version=None):
+        with self._lock:
+            self._remove(product_id)
+            self.version = version
+
+    def _classify(self, query, name_key, sku_key):
+        if sku_key == query:
+            return EXACT_SKU
+        if name_key.startswith(query):
+            return NAME_PREFIX
+        if any(word.startswith(query) for word in name_key.split()):
+            return WORD_PREFIX
+        if sku_key.startswith(query):
+            return SKU_PREFIX
+        return SUBSTRING
+
+    def search(self, query, limit=10):
+        """Products whose name or SKU contains query, best matches first"""
+        query = query.strip().lower()
+        if not query:
+            return []
+
+        with self._lock:
+            # Exact SKUs first, then each prefix list in ranking order, so a
+            # class is only scanned while the better ones leave room
+            skus = self._keys['skus']
+            position = bisect.bisect_left(skus, (query,))
+            candidates = set()
+            while position < len(skus) and skus[position][0] == query:
+                candidates.add(skus[position][1])
+                position += 1
+            for kind in self.PREFIX_LISTS:
+                keys = self._keys[kind]
+                position = bisect.bisect_left(keys, (query,))
+                while len(candidates) < limit and position < len(keys) and keys[position][0].startswith(query):
+                    candidates.add(keys[position][1])
+                    position += 1
+
+            # Substring-only matches rank below every prefix match
+            grams = _trigrams(query) if len(candidates) < limit else set()
+            if grams:
+                postings = sorted((self._postings.get(gram, set()) for gram in grams), key=len)
+                candidates.update(set.intersection(*postings))
+
+            scored = []
+            for product_id in candidates:
+                name, sku, name_key, sku_key = self._entries[product_id]
+                if query not in name_key and query not in sku_key:
+                    continue
+                scored.append((self._classify(query, name_key, sku_key), len(name), name_key, product_id, name, sku))
+
+        scored.sort()
+        return [
+            {'id': product_id, 'name': name, 'sku': sku}
+            for rank, length, name_key, product_id, name, sku in scored[:limit]
+        ]
+
+
+_index = AutocompleteIndex()
+_build_lock = threading.Lock()
+
+
+def _shared_version():
+    """(generation, sequence) of the shared change log, starting one if needed"""
+    values = cache.get_many([GENERATION_CACHE_KEY, SEQUENCE_CACHE_KEY])
+    if len(values) < 2:
+        cache.add(GENERATION_CACHE_KEY, uuid.uuid4().hex, None)
+        cache.add(SEQUENCE_CACHE_KEY, 0, None)
+        values = cache.get_many([GENERATION_CACHE_KEY, SEQUENCE_CACHE_KEY])
+    return values.get(GENERATION_CACHE_KEY), values.get(SEQUENCE_CACHE_KEY, 0)
+
+
+def _changed_since(version, shared_version):
+    """Product ids changed between two versions, or None if the log has gaps"""
+    if version is None or version[0] != shared_version[0]:
+        return None
+    first, last = version[1] + 1, shared_version[1]
+    if last - first + 1 > MAX_REPLAYED_CHANGES:
+        return None
+    keys = [CHANGE_CACHE_KEY.format(sequence) for sequence in range(first, last + 1)]
+    changes = cache.get_many(keys)
+    if len(changes) < len(keys):
+        return None
+    return set(changes.values())
+
+
+def get_index():
+    """The process-wide index, brought up to date with other processes' changes"""
+    shared_version = _shared_version()
+    if _index.version != shared_version:
+        with _build_lock:
+            if _index.version != shared_version:
+                changed = _changed_since(_index.version, shared_version)
+                if changed is None:
+                    _index.rebuild(shared_version)
+                else:
+                    _index.apply(changed, shared_version)
+    return _index
+
+
+def _record_change(product_id):
+    """Append a product to the shared change log; returns the new version"""
+    generation, sequence = _shared_version()
+    try:
+        sequence = cache.incr(SEQUENCE_CACHE_KEY)
+    except ValueError:
+        # Evicted in between: a fresh log makes every worker rebuild
+        generation, sequence = _shared_version()
+    cache.set(CHANGE_CACHE_KEY.format(sequence), product_id, CHANGE_LOG_TIMEOUT)
+    return generation, sequence
+
+
+def product_changed(product):
+    """Update this process's index and log the change for other processes"""
+    version = _record_change(product.pk)
+    if _index.version == (version[0], version[1] - 1):
+        _index.update(product, version)
+
+
+def product_deleted(product_id):
+    version = _record_change(product_id)
+    if _index.version == (version[0], version[1] - 1):
+        _index.remove(product_id, version)
@@ -0,0 +1,43 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import get_template
+
+from core.conditional import release_token
+
+# Card markup per place a product is listed
+CARD_TEMPLATES = {
+    'grid': 'products/cards/grid.html',
+    'featured': 'products/cards/featured.html',
+    'trending': 'products/cards/trending.html',
+    'related': 'products/cards/related.html',
+}
+
+
+def card_key(product, variant):
+    """
+    Cache key for one rendered card.
+
+    The product's updated_at makes every edit produce a new key, and the
+    release token does the same for template changes, so cards never need
+    to be purged; old entries simply expire.
+    """
+    release = hashlib.sha1(release_token().encode()).hexdigest()[:12]
+    return f"product_card:{variant}:{product.pk}:{product.updated_at.timestamp()}:{release}"
+
+
+def render_cards(products, variant):
+    """Rendered cards for products, in order, fetching cached ones in one round-trip"""
+    products = list(products)
+    keys = [card_key(product, variant) for product in products]
+    cards = cache.get_many(keys)
+
+    missing = {}
+    template = get_template(CARD_TEMPLATES[variant])
+    for product, key in zip(products, keys):
+        if key not in cards:
+            cards[key] = missing[key] = template.render({'product': product})
+    if missing:
+        cache.set_many(missing, getattr(settings, 'PRODUCT_CARD_CACHE_TIMEOUT', 60 * 60))
+    return [cards[key] for key in keys]
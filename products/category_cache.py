@@ -0,0 +1,53 @@
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Category
+
+DESCENDANTS_CACHE_KEY = 'products:category_descendants'
+NAMES_CACHE_KEY = 'products:category_names'
+
+
+def _build_descendant_map():
+    """
+    Map every visible category id to the ids of itself and its visible
+    descendants.
+
+    A category is visible when it and all of its ancestors are active, so an
+    inactive subcategory hides its whole subtree. Built from one query over
+    the materialized paths.
+    """
+    rows = list(Category.objects.values_list('pk', 'tree_path', 'is_active'))
+    inactive = {pk for pk, tree_path, is_active in rows if not is_active}
+
+    descendants = {}
+    for pk, tree_path, is_active in rows:
+        ancestor_ids = [int(segment) for segment in tree_path.split('/') if segment]
+        if not is_active or inactive.intersection(ancestor_ids):
+            continue
+        descendants.setdefault(pk, set()).add(pk)
+        for ancestor_id in ancestor_ids:
+            descendants.setdefault(ancestor_id, set()).add(pk)
+    return {pk: frozenset(ids) for pk, ids in descendants.items()}
+
+
+def get_descendant_ids(category):
+    """Ids of a category and all its visible descendants, from the cache"""
+    descendant_map = cache.get(DESCENDANTS_CACHE_KEY)
+    if descendant_map is None:
+        descendant_map = _build_descendant_map()
+        cache.set(DESCENDANTS_CACHE_KEY, descendant_map, getattr(settings, 'CATEGORY_TREE_CACHE_TIMEOUT', None))
+    return descendant_map.get(category.pk, frozenset([category.pk]))
+
+
+def get_category_names():
+    """Map of every category id to its name, from the cache"""
+    names = cache.get(NAMES_CACHE_KEY)
+    if names is None:
+        names = dict(Category.objects.values_list('pk', 'name'))
+        cache.set(NAMES_CACHE_KEY, names, getattr(settings, 'CATEGORY_TREE_CACHE_TIMEOUT', None))
+    return names
+
+
+def invalidate_category_tree():
+    """Forget the cached descendant sets and names after any category change"""
+    cache.delete_many([DESCENDANTS_CACHE_KEY, NAMES_CACHE_KEY])
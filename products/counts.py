@@ -0,0 +1,68 @@
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import Count, F
+
+from .models import Category, Product
+
+
+# Totals only include products whose category is visible: it and all its
+# ancestors are active. That is the set the category pages list (see
+# category_cache.get_descendant_ids), so the badges match the listings.
+
+
+def adjust_product_counts(category_id, delta):
+    """Add delta to a category's direct count and to the totals of it and its ancestors"""
+    if category_id is None or not delta:
+        return
+    tree_path = Category.objects.filter(pk=category_id).values_list('tree_path', flat=True).first()
+    if tree_path is None:
+        return
+    ancestor_ids = [int(segment) for segment in tree_path.split('/') if segment]
+    Category.objects.filter(pk=category_id).update(direct_product_count=F('direct_product_count') + delta)
+    if Category.objects.filter(pk__in=ancestor_ids + [category_id], is_active=False).exists():
+        return
+    Category.objects.filter(pk__in=ancestor_ids + [category_id]).update(
+        total_product_count=F('total_product_count') + delta
+    )
+
+
+def recount_product_counts():
+    """
+    Recompute every category's product counts from scratch.
+
+    Used after category moves and deletes, and by the
+    recount_category_products command to repair drift.
+    """
+    rows = (
+        Product.objects.filter(is_active=True, category__isnull=False)
+        .order_by()
+        .values('category_id')
+        .annotate(n=Count('pk'))
+    )
+    direct = Counter({row['category_id']: row['n'] for row in rows})
+
+    categories = list(Category.objects.only(
+        'pk', 'tree_path', 'is_active', 'direct_product_count', 'total_product_count'
+    ))
+    inactive = {category.pk for category in categories if not category.is_active}
+    totals = Counter()
+    for category in categories:
+        ancestor_ids = category.ancestor_ids()
+        if category.pk in inactive or inactive.intersection(ancestor_ids):
+            continue
+        count = direct[category.pk]
+        totals[category.pk] += count
+        for ancestor_id in ancestor_ids:
+            totals[ancestor_id] += count
+
+    changed = []
+    for category in categories:
+        if (category.direct_product_count, category.total_product_count) != (direct[category.pk], totals[category.pk]):
+            category.direct_product_count = direct[category.pk]
+            category.total_product_count = totals[category.pk]
+            changed.append(category)
+
+    with transaction.atomic():
+        Category.objects.bulk_update(changed, ['direct_product_count', 'total_product_count'], batch_size=500)
+    return len(changed)
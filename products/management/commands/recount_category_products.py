@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from products.counts import recount_product_counts
+
+
+class Command(BaseCommand):
+    help = "Recompute the stored active product counts of every category"
+
+    def handle(self, *args, **options):
+        changed = recount_product_counts()
+        self.stdout.write(self.style.SUCCESS(f"Updated product counts on {changed} categories"))
@@ -0,0 +1,42 @@
+# Generated by Django 4.2.30 on 2026-10-18 08:32
+
+from django.db import migrations, models
+
+
+def build_tree_paths(apps, schema_editor):
+    Category = apps.get_model("products", "Category")
+    categories = {c.pk: c for c in Category.objects.all()}
+
+    def resolve(category):
+        if category.parent_id is None:
+            return "", 0
+        parent = categories[category.parent_id]
+        parent_path, parent_depth = resolve(parent)
+        return parent_path + f"{parent.pk:010d}/", parent_depth + 1
+
+    for category in categories.values():
+        category.tree_path, category.depth = resolve(category)
+    Category.objects.bulk_update(categories.values(), ["tree_path", "depth"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("products", "0004_product_created_id_idx"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="category",
+            name="depth",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="category",
+            name="tree_path",
+            field=models.CharField(
+                blank=True, db_index=True, default="", editable=False, max_length=500
+            ),
+        ),
+        migrations.RunPython(build_tree_paths, migrations.RunPython.noop),
+    ]
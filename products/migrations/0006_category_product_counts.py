@@ -0,0 +1,54 @@
+# Generated by Django 4.2.30 on 2026-10-18 08:33
+
+from collections import Counter
+
+from django.db import migrations, models
+
+
+def count_products(apps, schema_editor):
+    Category = apps.get_model("products", "Category")
+    Product = apps.get_model("products", "Product")
+    direct = Counter(
+        Product.objects.filter(is_active=True, category__isnull=False).values_list(
+            "category_id", flat=True
+        )
+    )
+    categories = list(Category.objects.all())
+    totals = Counter()
+    for category in categories:
+        ids = [int(s) for s in category.tree_path.split("/") if s] + [category.pk]
+        for pk in ids:
+            totals[pk] += direct[category.pk]
+    for category in categories:
+        category.direct_product_count = direct[category.pk]
+        category.total_product_count = totals[category.pk]
+    Category.objects.bulk_update(
+        categories, ["direct_product_count", "total_product_count"]
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("products", "0005_category_tree_path"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="category",
+            name="direct_product_count",
+            field=models.IntegerField(
+                default=0, editable=False, help_text="Active products in this category"
+            ),
+        ),
+        migrations.AddField(
+            model_name="category",
+            name="total_product_count",
+            field=models.IntegerField(
+                default=0,
+                editable=False,
+                help_text="Active products including subcategories",
+            ),
+        ),
+        migrations.RunPython(count_products, migrations.RunPython.noop),
+    ]
@@ -1,6 +1,12 @@
-from django.db import models
+from django.core.exceptions import ValidationError
+from django.db import models, transaction
+from django.db.models import F, Value
+from django.db.models.functions import Concat, Substr
 from django.utils.text import slugify
 from ckeditor.fields import RichTextField
+from core.richtext import update_rich_text
+
+CYCLE_ERROR = "A category cannot be moved under itself or one of its subcategories."
 
 
 class Category(models.Model):
@@ -18,6 +24,17 @@ class Category(models.Model):
     is_active = models.BooleanField(default=True)
     order = models.IntegerField(default=0, help_text="Display order")
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    # Materialized path: zero-padded ids of all ancestors, root first, each
+    # followed by "/". Maintained by save(); do not edit by hand.
+    tree_path = models.CharField(max_length=500, blank=True, default='', editable=False, db_index=True)
+    depth = models.PositiveIntegerField(default=0, editable=False)
+
+    # Active product counts, maintained by products.signals and repairable
+    # with the recount_category_products command.
+    direct_product_count = models.IntegerField(default=0, editable=False, help_text="Active products in this category")
+    total_product_count = models.IntegerField(default=0, editable=False, help_text="Active products including subcategories")
 
     class Meta:
         verbose_name = "Category"
@@ -27,21 +44,127 @@ class Category(models.Model):
     def __str__(self):
         return self.get_hierarchical_name()
 
+    @staticmethod
+    def path_segment(pk):
+        return f"{pk:010d}/"
+
+    @property
+    def descendant_prefix(self):
+        """tree_path prefix shared by every descendant of this category"""
+        return self.tree_path + self.path_segment(self.pk)
+
+    def ancestor_ids(self):
+        """Ids of all ancestors, root first, read from tree_path"""
+        return [int(segment) for segment in self.tree_path.split('/') if segment]
+
+    def ancestors(self):
+        """All ancestors, root first, in one query"""
+        return Category.objects.filter(pk__in=self.ancestor_ids()).order_by('depth')
+
+    def descendants(self):
+        """All descendants at any depth, in one query"""
+        return Category.objects.filter(tree_path__startswith=self.descendant_prefix).order_by('depth', 'order', 'name')
+
+    @classmethod
+    def tree(cls, queryset=None):
+        """
+        Build the category tree in one query.
+
+        Returns the root nodes; each node's ``child_nodes`` attribute holds its
+        children in display order. Nodes whose parent is not in ``queryset``
+        are left out.
+        """
+        if queryset is None:
+            queryset = cls.objects.all()
+        nodes = list(queryset.order_by('depth', 'order', 'name'))
+        by_id = {}
+        roots = []
+        for node in nodes:
+            node.child_nodes = []
+            by_id[node.pk] = node
+            if node.parent_id is None:
+                roots.append(node)
+            elif node.parent_id in by_id:
+                by_id[node.parent_id].child_nodes.append(node)
+        return roots
+
     def get_hierarchical_name(self):
         """Return category name with hierarchy indentation"""
-        if self.parent:
-            parent_name = self.parent.get_hierarchical_name()
-            return f"{parent_name} → {self.name}"
-        return self.name
+        if not self.parent_id:
+            return self.name
+        # Ancestor names come from one cached map, so listing many categories
+        # (admin changelists, FK dropdowns) does not query once per row
+        from .category_cache import get_category_names
+        all_names = get_category_names()
+        ancestor_ids = self.ancestor_ids()
+        if all(pk in all_names for pk in ancestor_ids):
+            names = [all_names[pk] for pk in ancestor_ids]
+        else:
+            names = [ancestor.name for ancestor in self.ancestors()]
+        return " → ".join(names + [self.name])
+
+    def creates_cycle(self):
+        """Whether the chosen parent is this category or one of its descendants"""
+        if not self.pk or not self.parent_id:
+            return False
+        if self.parent_id == self.pk:
+            return True
+        parent_path = Category.objects.filter(pk=self.parent_id).values_list('tree_path', flat=True).first() or ''
+        return self.path_segment(self.pk) in parent_path
+
+    def clean(self):
+        super().clean()
+        if self.creates_cycle():
+            raise ValidationError({'parent': CYCLE_ERROR})
 
     def save(self, *args, **kwargs):
         if not self.slug:
             self.slug = slugify(self.name)
-        super().save(*args, **kwargs)
+
+        old = None
+        if self.pk:
+            old = Category.objects.filter(pk=self.pk).values(
+                'tree_path', 'depth', 'is_active', 'direct_product_count', 'total_product_count'
+            ).first()
+        if old:
+            # Counts are maintained with F() updates; never write back a stale copy
+            self.direct_product_count = old['direct_product_count']
+            self.total_product_count = old['total_product_count']
+
+        if self.parent_id:
+            parent = Category.objects.filter(pk=self.parent_id).values('tree_path', 'depth').get()
+            # Also enforced here for saves that skip clean(), e.g. from code
+            if self.pk and (self.parent_id == self.pk or self.path_segment(self.pk) in parent['tree_path']):
+                raise ValidationError({'parent': CYCLE_ERROR})
+            self.tree_path = parent['tree_path'] + self.path_segment(self.parent_id)
+            self.depth = parent['depth'] + 1
+        else:
+            self.tree_path = ''
+            self.depth = 0
+
+        # Read by the post_save receivers to refresh tree-derived data
+        self._tree_moved = bool(old) and old['tree_path'] != self.tree_path
+        # Hiding or showing a subtree changes which products the totals include
+        self._visibility_changed = bool(old) and old['is_active'] != self.is_active
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if self._tree_moved:
+                self._move_descendants(old['tree_path'], old['depth'])
+
+    def _move_descendants(self, old_tree_path, old_depth):
+        """Rewrite descendants' paths after this category changed parent"""
+        old_prefix = old_tree_path + self.path_segment(self.pk)
+        new_prefix = self.descendant_prefix
+        Category.objects.filter(tree_path__startswith=old_prefix).update(
+            tree_path=Concat(Value(new_prefix), Substr('tree_path', len(old_prefix) + 1)),
+            depth=F('depth') + (self.depth - old_depth),
+        )
 
 
 class Product(models.Model):
     """Product model with all details"""
+    RICH_TEXT_FIELDS = ('description', 'specifications')
+
     name = models.CharField(max_length=300)
     slug = models.SlugField(unique=True, blank=True)
     sku = models.CharField(max_length=100, unique=True, blank=True, help_text="Stock Keeping Unit")
@@ -50,6 +173,11 @@ class Product(models.Model):
     short_description = models.TextField(max_length=500, blank=True)
     description = RichTextField()
     specifications = RichTextField(blank=True, help_text="Technical specifications")
+    # Derived from the fields above on save (core.richtext)
+    description_html = models.TextField(blank=True, editable=False)
+    specifications_html = models.TextField(blank=True, editable=False)
+    body_text = models.TextField(blank=True, editable=False)
+    excerpt = models.TextField(blank=True, editable=False)
 
     # Pricing
     price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True, help_text="Display price (optional)")
@@ -76,13 +204,31 @@ class Product(models.Model):
         verbose_name = "Product"
         verbose_name_plural = "Products"
         ordering = ['-created_at']
+        indexes = [
+            # Keyset pagination in product_list orders on (-created_at, -id)
+            models.Index(fields=['-created_at', '-id'], name='product_created_id_idx'),
+        ]
 
     def __str__(self):
         return self.name
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember which category this row is counted in, so the count
+        # signals can detect changes without re-reading the row
+        if 'category_id' in instance.__dict__ and 'is_active' in instance.__dict__:
+            instance._counted_category_id = instance.counted_category_id()
+        return instance
+
+    def counted_category_id(self):
+        """Category whose product counts include this product, if any"""
+        return self.category_id if self.is_active else None
+
     def save(self, *args, **kwargs):
         if not self.slug:
             self.slug = slugify(self.name)
+        kwargs['update_fields'] = update_rich_text(self, kwargs.get('update_fields'))
         super().save(*args, **kwargs)
 
 
@@ -119,3 +265,19 @@ class ProductAttribute(models.Model):
 
     def __str__(self):
         return f"{self.product.name} - {self.name}: {self.value}"
+
+
+class ProductViewDaily(models.Model):
+    """Per-day product page view totals, written in batches by products.view_counts"""
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='daily_views')
+    date = models.DateField()
+    views = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Product Daily Views"
+        verbose_name_plural = "Product Daily Views"
+        ordering = ['-date', '-views']
+        unique_together = ('product', 'date')
+
+    def __str__(self):
+        return f"{self.product.name} - {self.date}: {self.views}"
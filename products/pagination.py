@@ -0,0 +1,83 @@
+import base64
+import binascii
+from datetime import datetime
+
+from django.db.models import Q
+
+
+class KeysetPage:
+    """One page of a keyset-paginated queryset"""
+
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+def encode_cursor(obj):
+    """Encode an object's (created_at, id) position as a URL-safe token"""
+    raw = f"{obj.created_at.isoformat()}|{obj.pk}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Decode a cursor token, returning (created_at, id) or None if invalid"""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode()).decode()
+        created_at, pk = raw.rsplit('|', 1)
+        return datetime.fromisoformat(created_at), int(pk)
+    except (ValueError, binascii.Error, UnicodeDecodeError):
+        return None
+
+
+def paginate_keyset(queryset, page_size, after=None, before=None):
+    """
+    Paginate a queryset on (-created_at, -id) using cursors.
+
+    ``after`` returns the page following a cursor, ``before`` the page
+    preceding it. Because pages are anchored on row values rather than
+    offsets, new rows never shift the contents of a page already seen.
+    """
+    after_key = decode_cursor(after) if after else None
+    before_key = decode_cursor(before) if before else None
+
+    if before_key:
+        created_at, pk = before_key
+        rows = list(
+            queryset.filter(Q(created_at__gt=created_at) | Q(created_at=created_at, id__gt=pk))
+            .order_by('created_at', 'id')[:page_size + 1]
+        )
+        if len(rows) <= page_size:
+            # Reached the start of the listing: show the regular first page
+            return paginate_keyset(queryset, page_size)
+        rows = rows[:page_size]
+        rows.reverse()
+        # Coming back from a later page, so there is always a next page
+        return KeysetPage(rows, encode_cursor(rows[-1]), encode_cursor(rows[0]))
+
+    queryset = queryset.order_by('-created_at', '-id')
+    if after_key:
+        created_at, pk = after_key
+        queryset = queryset.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk))
+
+    rows = list(queryset[:page_size + 1])
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+    next_cursor = encode_cursor(rows[-1]) if has_more else None
+    previous_cursor = encode_cursor(rows[0]) if rows and after_key else None
+    return KeysetPage(rows, next_cursor, previous_cursor)
@@ -0,0 +1,87 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import autocomplete
+from .category_cache import invalidate_category_tree
+from .counts import adjust_product_counts, recount_product_counts
+from .models import Category, Product
+
+# What the autocomplete index holds per product; bumping the view counter
+# and other saves that write none of these skip the index update
+AUTOCOMPLETE_FIELDS = {'name', 'sku', 'is_active'}
+# Fields that decide which category a product is counted in; saves that
+# write none of them leave the category counts untouched
+COUNTED_FIELDS = {'category', 'category_id', 'is_active'}
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def category_tree_changed(sender, **kwargs):
+    """Drop cached descendant sets when a category is added, moved or removed."""
+    invalidate_category_tree()
+    transaction.on_commit(invalidate_category_tree)
+
+
+@receiver(post_save, sender=Category)
+def recount_after_move(sender, instance, created, **kwargs):
+    """A moved, hidden or re-shown subtree changes its ancestors' totals."""
+    if getattr(instance, '_tree_moved', False) or getattr(instance, '_visibility_changed', False):
+        recount_product_counts()
+
+
+@receiver(post_delete, sender=Category)
+def recount_after_category_delete(sender, instance, **kwargs):
+    """Products of a deleted category are detached without signals."""
+    transaction.on_commit(recount_product_counts)
+
+
+@receiver(pre_save, sender=Product)
+def remember_counted_category(sender, instance, **kwargs):
+    """Capture the category this product was counted in before the save."""
+    if instance._state.adding:
+        instance._counted_category_id = None
+    elif not hasattr(instance, '_counted_category_id'):
+        previous = sender.objects.filter(pk=instance.pk).values('category_id', 'is_active').first()
+        instance._counted_category_id = (
+            previous['category_id'] if previous and previous['is_active'] else None
+        )
+
+
+@receiver(post_save, sender=Product)
+def update_product_counts(sender, instance, update_fields=None, **kwargs):
+    """Move the product's count when its category or active flag changes."""
+    if update_fields and not COUNTED_FIELDS.intersection(update_fields):
+        return
+    previous = instance._counted_category_id
+    if update_fields and not ('is_active' in update_fields and {'category', 'category_id'}.intersection(update_fields)):
+        # Only part of what decides the count was saved; the row is the truth
+        row = sender.objects.filter(pk=instance.pk).values('category_id', 'is_active').get()
+        current = row['category_id'] if row['is_active'] else None
+    else:
+        current = instance.counted_category_id()
+    if previous != current:
+        adjust_product_counts(previous, -1)
+        adjust_product_counts(current, 1)
+    instance._counted_category_id = current
+
+
+@receiver(post_delete, sender=Product)
+def remove_product_counts(sender, instance, **kwargs):
+    """Stop counting a deleted product."""
+    previous = getattr(instance, '_counted_category_id', instance.counted_category_id())
+    adjust_product_counts(previous, -1)
+
+
+@receiver(post_save, sender=Product)
+def update_autocomplete(sender, instance, update_fields=None, **kwargs):
+    """Refresh the product's autocomplete entry once the save is committed."""
+    if update_fields and not AUTOCOMPLETE_FIELDS.intersection(update_fields):
+        return
+    transaction.on_commit(lambda: autocomplete.product_changed(instance))
+
+
+@receiver(post_delete, sender=Product)
+def remove_from_autocomplete(sender, instance, **kwargs):
+    product_id = instance.pk
+    transaction.on_commit(lambda: autocomplete.product_deleted(product_id))
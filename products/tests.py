@@ -1,6 +1,17 @@
-from django.test import TestCase, Client
+from io import StringIO
+from unittest import mock
+
+from django.core.exceptions import ValidationError
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, Client, override_settings
 from django.urls import reverse
-from products.models import Category, Product
+from django.utils import timezone
+from core.singletons import clear_local_singletons
+from products import autocomplete, cards
+from products import view_counts
+from products.models import Category, Product, ProductViewDaily
 
 
 class CategoryModelTest(TestCase):
@@ -36,6 +47,190 @@ class CategoryModelTest(TestCase):
         self.assertIn(self.child_category, self.parent_category.children.all())
 
 
+class CategoryTreeTest(TestCase):
+    """Tests for the materialized category tree"""
+
+    def setUp(self):
+        """Create test data"""
+        self.root = Category.objects.create(name="Root", slug="root")
+        self.child = Category.objects.create(name="Child", slug="child", parent=self.root)
+        self.grandchild = Category.objects.create(name="Grandchild", slug="grandchild", parent=self.child)
+        self.other_root = Category.objects.create(name="Other", slug="other")
+
+    def test_depth_and_path_maintained(self):
+        """Test that depth and tree_path are set on save"""
+        self.assertEqual(self.root.depth, 0)
+        self.assertEqual(self.grandchild.depth, 2)
+        self.assertEqual(self.grandchild.ancestor_ids(), [self.root.pk, self.child.pk])
+
+    def test_ancestors_in_one_query(self):
+        """Test that ancestors are fetched root first in a single query"""
+        with self.assertNumQueries(1):
+            self.assertEqual(list(self.grandchild.ancestors()), [self.root, self.child])
+
+    def test_descendants_in_one_query(self):
+        """Test that descendants at every depth are fetched in a single query"""
+        with self.assertNumQueries(1):
+            self.assertEqual(list(self.root.descendants()), [self.child, self.grandchild])
+
+    def test_tree_in_one_query(self):
+        """Test that the whole tree is built from a single query"""
+        with self.assertNumQueries(1):
+            roots = Category.tree()
+            self.assertEqual([node.name for node in roots], ["Other", "Root"])
+            root = roots[1]
+            self.assertEqual(root.child_nodes, [self.child])
+            self.assertEqual(root.child_nodes[0].child_nodes, [self.grandchild])
+
+    def test_hierarchical_name(self):
+        """Test that the hierarchical name lists every ancestor"""
+        self.assertEqual(str(self.grandchild), "Root → Child → Grandchild")
+
+    def test_hierarchical_names_share_one_query(self):
+        """Test that naming many categories does not query once per row"""
+        cache.clear()
+        categories = list(Category.objects.all())
+        with self.assertNumQueries(1):
+            names = [str(category) for category in categories]
+        self.assertIn("Root → Child → Grandchild", names)
+
+    def test_rename_updates_hierarchical_name(self):
+        """Test that renaming an ancestor shows up in descendants' names"""
+        str(self.grandchild)
+        self.root.name = "Top"
+        self.root.save()
+        self.assertEqual(str(self.grandchild), "Top → Child → Grandchild")
+
+    def test_move_updates_descendants(self):
+        """Test that moving a category rewrites the paths below it"""
+        self.child.parent = self.other_root
+        self.child.save()
+        self.grandchild.refresh_from_db()
+        self.assertEqual(self.grandchild.ancestor_ids(), [self.other_root.pk, self.child.pk])
+        self.assertEqual(list(self.other_root.descendants()), [self.child, self.grandchild])
+        self.assertEqual(list(self.root.descendants()), [])
+
+    def test_move_to_root_updates_depth(self):
+        """Test that promoting a category to the top level fixes descendant depth"""
+        self.child.parent = None
+        self.child.save()
+        self.grandchild.refresh_from_db()
+        self.assertEqual(self.child.depth, 0)
+        self.assertEqual(self.grandchild.depth, 1)
+
+    def test_cannot_move_under_own_descendant(self):
+        """Test that clean() rejects cycles"""
+        self.root.parent = self.grandchild
+        with self.assertRaises(ValidationError):
+            self.root.clean()
+
+    def test_save_rejects_cycles(self):
+        """Test that save() refuses a cycle even when clean() is skipped"""
+        self.root.parent = self.grandchild
+        with self.assertRaises(ValidationError):
+            self.root.save()
+        self.child.parent = self.child
+        with self.assertRaises(ValidationError):
+            self.child.save()
+        self.grandchild.refresh_from_db()
+        self.assertEqual(self.grandchild.ancestor_ids(), [self.root.pk, self.child.pk])
+
+
+class CategoryProductCountTest(TestCase):
+    """Tests for the maintained per-category product counts"""
+
+    def setUp(self):
+        """Create test data"""
+        self.root = Category.objects.create(name="Root", slug="root")
+        self.child = Category.objects.create(name="Child", slug="child", parent=self.root)
+        self.other = Category.objects.create(name="Other", slug="other")
+        self.product = Product.objects.create(
+            name="Counted",
+            sku="counted",
+            category=self.child,
+            description="Test",
+            main_image="test.jpg",
+        )
+
+    def assertCounts(self, category, direct, total):
+        category.refresh_from_db()
+        self.assertEqual((category.direct_product_count, category.total_product_count), (direct, total))
+
+    def test_create_counts_in_category_and_ancestors(self):
+        """Test that a new active product counts toward its category and ancestors"""
+        self.assertCounts(self.child, 1, 1)
+        self.assertCounts(self.root, 0, 1)
+
+    def test_deactivate_removes_count(self):
+        """Test that deactivating a product removes it from the counts"""
+        self.product.is_active = False
+        self.product.save()
+        self.assertCounts(self.child, 0, 0)
+        self.assertCounts(self.root, 0, 0)
+
+    def test_change_category_moves_count(self):
+        """Test that changing a product's category moves its count"""
+        product = Product.objects.get(pk=self.product.pk)
+        product.category = self.other
+        product.save()
+        self.assertCounts(self.root, 0, 0)
+        self.assertCounts(self.other, 1, 1)
+
+    def test_delete_removes_count(self):
+        """Test that deleting a product removes it from the counts"""
+        self.product.delete()
+        self.assertCounts(self.child, 0, 0)
+        self.assertCounts(self.root, 0, 0)
+
+    def test_unrelated_save_runs_no_count_queries(self):
+        """Test that saving without a category or status change skips count updates"""
+        product = Product.objects.get(pk=self.product.pk)
+        with self.assertNumQueries(1):
+            product.save(update_fields=['views'])
+
+    def test_partial_save_ignores_unsaved_changes(self):
+        """Test that a save limited to other fields does not count an unsaved category change"""
+        product = Product.objects.get(pk=self.product.pk)
+        product.category = self.other
+        product.save(update_fields=['name'])
+        self.assertCounts(self.child, 1, 1)
+        self.assertCounts(self.other, 0, 0)
+        product.is_active = False
+        product.save(update_fields=['is_active'])
+        self.assertCounts(self.child, 0, 0)
+        self.assertCounts(self.other, 0, 0)
+
+    def test_inactive_subcategory_excluded_from_totals(self):
+        """Test that products under a hidden subcategory are not in the ancestors' totals"""
+        self.child.is_active = False
+        self.child.save()
+        self.assertCounts(self.root, 0, 0)
+        Product.objects.create(name="Hidden", sku="hidden", category=self.child, description="Test", main_image="t.jpg")
+        self.assertCounts(self.root, 0, 0)
+        self.assertCounts(self.child, 2, 0)
+        self.child.is_active = True
+        self.child.save()
+        self.assertCounts(self.root, 0, 2)
+        Category.objects.update(total_product_count=7)
+        call_command('recount_category_products', stdout=StringIO())
+        self.assertCounts(self.root, 0, 2)
+
+    def test_moving_category_updates_ancestor_totals(self):
+        """Test that moving a subtree updates totals on both sides"""
+        self.child.parent = self.other
+        self.child.save()
+        self.assertCounts(self.root, 0, 0)
+        self.assertCounts(self.other, 0, 1)
+
+    def test_recount_command_repairs_drift(self):
+        """Test that the management command recomputes the counts"""
+        Category.objects.update(direct_product_count=7, total_product_count=7)
+        call_command('recount_category_products', stdout=StringIO())
+        self.assertCounts(self.child, 1, 1)
+        self.assertCounts(self.root, 0, 1)
+        self.assertCounts(self.other, 0, 0)
+
+
 class ProductModelTest(TestCase):
     """Tests for Product model"""
 
@@ -140,18 +335,49 @@ class ProductListViewTest(TestCase):
         self.assertIn(self.parent_product, response.context['products'])
         self.assertIn(self.child_product, response.context['products'])
 
-    def test_category_filter_shows_only_selected_category_products(self):
-        """Test that filtering by parent category shows only parent category products"""
+    def test_category_filter_includes_subcategory_products(self):
+        """Test that filtering by parent category also shows subcategory products"""
         response = self.client.get(
             reverse('products:category', args=[self.parent_category.slug])
         )
         self.assertEqual(response.status_code, 200)
         products = list(response.context['products'])
 
-        # Should only show parent category product, not child category product
+        # Should show parent category product and child category product
+        self.assertIn(self.parent_product, products)
+        self.assertIn(self.child_product, products)
+
+    def test_category_filter_skips_inactive_subcategories(self):
+        """Test that products of an inactive subcategory stay hidden"""
+        self.child_category.is_active = False
+        self.child_category.save()
+        response = self.client.get(
+            reverse('products:category', args=[self.parent_category.slug])
+        )
+        products = list(response.context['products'])
         self.assertIn(self.parent_product, products)
         self.assertNotIn(self.child_product, products)
 
+    def test_new_subcategory_products_appear_under_parent(self):
+        """Test that the cached descendant sets are refreshed on tree changes"""
+        self.client.get(reverse('products:category', args=[self.parent_category.slug]))
+        new_child = Category.objects.create(
+            name="New Child",
+            slug="new-child",
+            parent=self.parent_category,
+        )
+        new_product = Product.objects.create(
+            name="New Child Product",
+            sku="new-child-sku",
+            category=new_child,
+            description="Test",
+            main_image="test.jpg",
+        )
+        response = self.client.get(
+            reverse('products:category', args=[self.parent_category.slug])
+        )
+        self.assertIn(new_product, list(response.context['products']))
+
     def test_child_category_filter_shows_only_child_products(self):
         """Test that filtering by child category shows only child category products"""
         response = self.client.get(
@@ -198,3 +424,370 @@ class ProductListViewTest(TestCase):
             reverse('products:category', args=[self.parent_category.slug])
         )
         self.assertEqual(response.context['selected_category'], self.parent_category)
+
+
+@override_settings(PRODUCTS_PER_PAGE=2)
+class ProductListPaginationTest(TestCase):
+    """Tests for cursor pagination on the product list"""
+
+    def setUp(self):
+        """Create test data"""
+        self.client = Client()
+        self.category = Category.objects.create(name="Paged", slug="paged")
+        self.products = [
+            Product.objects.create(
+                name=f"Paged Product {i}",
+                sku=f"paged-{i}",
+                category=self.category,
+                description="Test",
+                main_image="test.jpg",
+            )
+            for i in range(5)
+        ]
+
+    def _walk(self, url):
+        """Follow next links from url, returning the products of each page"""
+        pages = []
+        while url:
+            response = self.client.get(url)
+            pages.append(list(response.context['products']))
+            url = response.context['next_url']
+        return pages
+
+    def test_first_page_is_newest_products(self):
+        """Test that the first page holds the newest products"""
+        response = self.client.get(reverse('products:list'))
+        self.assertEqual(list(response.context['products']), self.products[:-3:-1])
+        self.assertEqual(response.context['total_count'], 5)
+        self.assertIsNone(response.context['previous_url'])
+
+    def test_next_links_cover_every_product_once(self):
+        """Test that walking the next links visits each product exactly once"""
+        pages = self._walk(reverse('products:list'))
+        self.assertEqual([len(page) for page in pages], [2, 2, 1])
+        seen = [product for page in pages for product in page]
+        self.assertEqual(seen, list(reversed(self.products)))
+
+    def test_previous_link_returns_to_earlier_page(self):
+        """Test that the previous link on page two leads back to page one"""
+        first = self.client.get(reverse('products:list'))
+        second = self.client.get(first.context['next_url'])
+        third = self.client.get(second.context['next_url'])
+        back = self.client.get(third.context['previous_url'])
+        self.assertEqual(list(back.context['products']), list(second.context['products']))
+
+    def test_pages_stable_across_inserts(self):
+        """Test that a new product does not shift the following page"""
+        first = self.client.get(reverse('products:list'))
+        Product.objects.create(
+            name="Brand New",
+            sku="brand-new",
+            category=self.category,
+            description="Test",
+            main_image="test.jpg",
+        )
+        second = self.client.get(first.context['next_url'])
+        self.assertEqual(list(second.context['products']), self.products[2:0:-1])
+
+    def test_search_query_kept_in_page_links(self):
+        """Test that pagination links preserve the search query"""
+        response = self.client.get(reverse('products:list'), {'q': 'Paged'})
+        self.assertIn('q=Paged', response.context['next_url'])
+
+    def test_invalid_cursor_shows_first_page(self):
+        """Test that a malformed cursor falls back to the first page"""
+        response = self.client.get(reverse('products:list'), {'after': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['products']), 2)
+
+
+class ProductAutocompleteTest(TestCase):
+    """Tests for the in-memory autocomplete endpoint"""
+
+    def setUp(self):
+        """Create test data"""
+        cache.clear()
+        self.client = Client()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.solar = Product.objects.create(
+                name="Solar Panel 400W", sku="SP-400", description="Test", main_image="test.jpg"
+            )
+            self.lamp = Product.objects.create(
+                name="Garden Solar Lamp", sku="GL-10", description="Test", main_image="test.jpg"
+            )
+            self.battery = Product.objects.create(
+                name="Battery Pack", sku="BP-solar", description="Test", main_image="test.jpg"
+            )
+
+    def _search(self, q, **params):
+        response = self.client.get(reverse('products:search'), {'q': q, **params})
+        return [item['id'] for item in response.json()]
+
+    def test_ranked_results(self):
+        """Test that name prefixes rank above word prefixes and SKU matches"""
+        self.assertEqual(self._search('solar'), [self.solar.id, self.lamp.id, self.battery.id])
+
+    def test_exact_sku_ranks_first(self):
+        """Test that an exact SKU match comes first"""
+        self.assertEqual(self._search('gl-10'), [self.lamp.id])
+
+    def test_substring_match(self):
+        """Test that matches inside a word are found through trigrams"""
+        self.assertEqual(self._search('ttery'), [self.battery.id])
+
+    def test_limit_parameter(self):
+        """Test that the limit parameter caps the results"""
+        self.assertEqual(len(self._search('solar', limit=2)), 2)
+
+    def test_short_query_returns_nothing(self):
+        """Test that single-character queries are ignored"""
+        self.assertEqual(self._search('s'), [])
+
+    def test_answers_without_queries(self):
+        """Test that a warm index needs no database queries"""
+        self._search('solar')
+        with self.assertNumQueries(0):
+            self._search('panel')
+
+    def test_rename_updates_index(self):
+        """Test that product changes are applied incrementally"""
+        self._search('solar')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.lamp.name = "Garden Lantern"
+            self.lamp.save()
+        self.assertEqual(self._search('solar'), [self.solar.id, self.battery.id])
+        self.assertEqual(self._search('lantern'), [self.lamp.id])
+
+    def test_inactive_products_removed(self):
+        """Test that deactivated products disappear from suggestions"""
+        self._search('solar')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.solar.is_active = False
+            self.solar.save()
+        self.assertNotIn(self.solar.id, self._search('solar'))
+
+    def test_other_process_change_is_replayed(self):
+        """Test that a change logged elsewhere reloads only that product"""
+        self._search('solar')
+        Product.objects.filter(pk=self.lamp.pk).update(name="Garden Torch")
+        autocomplete._record_change(self.lamp.pk)
+        with self.assertNumQueries(1):
+            self.assertEqual(self._search('torch'), [self.lamp.id])
+
+    def test_lost_change_log_triggers_rebuild(self):
+        """Test that the index reloads everything when the log has gaps"""
+        self._search('solar')
+        Product.objects.filter(pk=self.lamp.pk).update(name="Garden Torch")
+        cache.clear()
+        self.assertEqual(self._search('torch'), [self.lamp.id])
+
+    def test_name_prefix_not_crowded_out_by_word_prefixes(self):
+        """Test that a bounded scan still returns the best-ranked matches"""
+        with self.captureOnCommitCallbacks(execute=True):
+            for number in range(10):
+                Product.objects.create(
+                    name=f"zz abc{number}", sku=f"ZZ-{number}", description="Test", main_image="test.jpg"
+                )
+            widget = Product.objects.create(name="abz widget", sku="AW-1", description="Test", main_image="test.jpg")
+            single = Product.objects.create(name="x ab", sku="XA-1", description="Test", main_image="test.jpg")
+        self.assertEqual(self._search('ab', limit=5)[0], widget.id)
+        self.assertEqual(self._search('ab', limit=1), [widget.id])
+        self.assertIn(single.id, self._search('ab', limit=20))
+
+    def test_prefix_scan_stops_at_limit(self):
+        """Test that a common prefix only collects as many matches as needed"""
+        self._search('solar')
+        with self.captureOnCommitCallbacks(execute=True):
+            for number in range(20):
+                Product.objects.create(
+                    name=f"Solar Kit {number}", sku=f"SK-{number}", description="Test", main_image="test.jpg"
+                )
+        index = autocomplete.get_index()
+        with mock.patch.object(autocomplete, '_trigrams', wraps=autocomplete._trigrams) as trigrams:
+            results = index.search('solar', limit=3)
+        self.assertEqual(len(results), 3)
+        self.assertEqual(trigrams.call_count, 0)
+
+
+class ProductViewCounterTest(TestCase):
+    """Tests for the buffered product view counter"""
+
+    def setUp(self):
+        """Create test data"""
+        view_counts.flush_views()
+        self.client = Client()
+        self.product = Product.objects.create(
+            name="Viewed", sku="viewed", description="Test", main_image="test.jpg"
+        )
+
+    def tearDown(self):
+        view_counts.flush_views()
+
+    def test_detail_view_does_not_write_views(self):
+        """Test that a page view is buffered instead of saved"""
+        self.client.get(reverse('products:detail', args=[self.product.slug]))
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.views, 0)
+
+    def test_flush_writes_totals_and_daily_rollup(self):
+        """Test that flushing adds buffered views to the product and today's row"""
+        for _ in range(3):
+            self.client.get(reverse('products:detail', args=[self.product.slug]))
+        self.assertEqual(view_counts.flush_views(), 3)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.views, 3)
+        daily = ProductViewDaily.objects.get(product=self.product)
+        self.assertEqual((daily.date, daily.views), (timezone.localdate(), 3))
+
+    def test_repeated_flushes_accumulate(self):
+        """Test that later flushes add to the existing daily row"""
+        view_counts.record_view(self.product.pk)
+        view_counts.flush_views()
+        view_counts.record_view(self.product.pk)
+        view_counts.record_view(self.product.pk)
+        view_counts.flush_views()
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.views, 3)
+        self.assertEqual(ProductViewDaily.objects.get(product=self.product).views, 3)
+
+    @override_settings(PRODUCT_VIEWS_FLUSH_THRESHOLD=2)
+    def test_threshold_triggers_flush(self):
+        """Test that reaching the buffer threshold flushes automatically"""
+        view_counts.record_view(self.product.pk)
+        view_counts.record_view(self.product.pk)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.views, 2)
+
+    def test_failed_flush_keeps_views(self):
+        """Test that a database error puts the views back instead of failing the page"""
+        view_counts.record_view(self.product.pk)
+        with mock.patch.object(view_counts, '_add_daily_views', side_effect=Exception("database is locked")):
+            with self.assertLogs('products.view_counts', 'ERROR'):
+                self.assertEqual(view_counts.flush_views(), 0)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.views, 0)
+        self.assertEqual(view_counts.flush_views(), 1)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.views, 1)
+
+    def test_daily_row_created_concurrently_is_added_to(self):
+        """Test that a rollup row inserted by another worker is incremented, not duplicated"""
+        view_counts.record_view(self.product.pk)
+        ProductViewDaily.objects.create(product=self.product, date=timezone.localdate(), views=4)
+        view_counts.flush_views()
+        self.assertEqual(ProductViewDaily.objects.get(product=self.product).views, 5)
+
+    def test_deleted_product_views_dropped(self):
+        """Test that views for a deleted product are discarded"""
+        view_counts.record_view(self.product.pk)
+        self.product.delete()
+        self.assertEqual(view_counts.flush_views(), 0)
+
+
+class ProductConditionalGetTest(TestCase):
+    """Tests for ETag validation on the product detail page"""
+
+    def setUp(self):
+        """Create test data"""
+        cache.clear()
+        clear_local_singletons()
+        view_counts.flush_views()
+        self.client = Client()
+        self.category = Category.objects.create(name="Lamps", slug="lamps")
+        self.product = Product.objects.create(
+            name="Desk Lamp", sku="DL-1", description="Test", main_image="test.jpg", category=self.category,
+        )
+        self.related = Product.objects.create(
+            name="Floor Lamp", sku="FL-1", description="Test", main_image="test.jpg", category=self.category,
+        )
+        self.url = reverse('products:detail', args=[self.product.slug])
+
+    def tearDown(self):
+        view_counts.flush_views()
+
+    def revalidate(self, etag):
+        return self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+
+    def test_repeat_request_gets_304(self):
+        """Test that a matching ETag is answered with one query and no render"""
+        etag = self.client.get(self.url)['ETag']
+        with self.assertNumQueries(1), self.assertTemplateNotUsed('products/product_detail.html'):
+            response = self.revalidate(etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        self.assertIn('no-cache', response['Cache-Control'])
+
+    def test_not_modified_still_counts_view(self):
+        """Test that 304 responses are counted as views"""
+        etag = self.client.get(self.url)['ETag']
+        self.revalidate(etag)
+        self.assertEqual(view_counts.flush_views(), 2)
+
+    def test_changes_invalidate_etag(self):
+        """Test that editing the product, its category or a related product changes the ETag"""
+        etag = self.client.get(self.url)['ETag']
+        for obj in (self.product, self.category, self.related):
+            obj.save()
+            response = self.revalidate(etag)
+            self.assertEqual(response.status_code, 200)
+            etag = response['ETag']
+
+    def test_staff_always_get_full_page(self):
+        """Test that staff users are never sent a 304"""
+        etag = self.client.get(self.url)['ETag']
+        User.objects.create_user('staff', password='password', is_staff=True)
+        self.client.login(username='staff', password='password')
+        response = self.revalidate(etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.has_header('ETag'))
+
+    def test_missing_product_is_404(self):
+        """Test that unknown slugs still 404"""
+        response = self.client.get(reverse('products:detail', args=['missing']), HTTP_IF_NONE_MATCH='"x"')
+        self.assertEqual(response.status_code, 404)
+
+
+class ProductCardCacheTest(TestCase):
+    """Tests for the rendered product card cache"""
+
+    def setUp(self):
+        """Create test data"""
+        cache.clear()
+        self.products = [
+            Product.objects.create(name=f"Bottle {i}", sku=f"BT-{i}", description="Test", short_description="Steel bottle")
+            for i in range(3)
+        ]
+
+    def test_cards_rendered_in_order(self):
+        """Test that every product gets its card, in the given order"""
+        rendered = cards.render_cards(reversed(self.products), 'grid')
+        self.assertEqual(len(rendered), 3)
+        self.assertIn('Bottle 2', rendered[0])
+        self.assertIn('Bottle 0', rendered[2])
+
+    def test_cached_cards_fetched_in_one_round_trip(self):
+        """Test that a second render reads every card with a single get_many"""
+        first = cards.render_cards(self.products, 'grid')
+        with mock.patch.object(cards, 'get_template') as get_template, \
+                mock.patch.object(cards.cache, 'get_many', wraps=cards.cache.get_many) as get_many:
+            second = cards.render_cards(self.products, 'grid')
+        self.assertEqual(first, second)
+        get_many.assert_called_once()
+        get_template.return_value.render.assert_not_called()
+
+    def test_edit_renders_new_card(self):
+        """Test that saving a product replaces its card but keeps the others"""
+        cards.render_cards(self.products, 'featured')
+        product = self.products[0]
+        product.name = "Flask"
+        product.save()
+        rendered = cards.render_cards(self.products, 'featured')
+        self.assertIn('Flask', rendered[0])
+        self.assertIn('Bottle 1', rendered[1])
+
+    def test_variants_cached_separately(self):
+        """Test that each listing keeps its own card markup"""
+        grid = cards.render_cards(self.products[:1], 'grid')[0]
+        trending = cards.render_cards(self.products[:1], 'trending')[0]
+        self.assertIn('Request Quote', grid)
+        self.assertNotIn('Request Quote', trending)
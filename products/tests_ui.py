@@ -110,22 +110,22 @@ class UIIntegrationTest(TestCase):
         response = self.client.get(reverse('products:category', args=[self.parent1.slug]))
         self.assertEqual(response.status_code, 200)
         products = list(response.context['products'])
-        # Should only show parent category product
-        self.assertEqual(len(products), 1)
+        # Should show products from the parent and every subcategory
+        self.assertEqual(len(products), 3)
         self.assertIn(self.product_parent, products)
-        self.assertNotIn(self.product_child, products)
-        self.assertNotIn(self.product_grandchild, products)
+        self.assertIn(self.product_child, products)
+        self.assertIn(self.product_grandchild, products)
 
     def test_filter_by_child_category(self):
         """Test filtering products by child category"""
         response = self.client.get(reverse('products:category', args=[self.child1.slug]))
         self.assertEqual(response.status_code, 200)
         products = list(response.context['products'])
-        # Should only show child category product
-        self.assertEqual(len(products), 1)
+        # Should show child and grandchild products, not the parent's
+        self.assertEqual(len(products), 2)
         self.assertIn(self.product_child, products)
+        self.assertIn(self.product_grandchild, products)
         self.assertNotIn(self.product_parent, products)
-        self.assertNotIn(self.product_grandchild, products)
 
     def test_filter_by_grandchild_category(self):
         """Test filtering products by grandchild category"""
@@ -0,0 +1,116 @@
+import atexit
+import logging
+import threading
+import time
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Product, ProductViewDaily
+
+logger = logging.getLogger(__name__)
+
+# Views recorded by this process and not yet written, keyed by (product id, date)
+_pending = Counter()
+_pending_total = 0
+_lock = threading.Lock()
+_last_flush = time.monotonic()
+
+
+def record_view(product_id):
+    """Count one product page view; written to the database in batches"""
+    global _pending_total
+    key = (product_id, timezone.localdate())
+    with _lock:
+        _pending[key] += 1
+        _pending_total += 1
+        interval = getattr(settings, 'PRODUCT_VIEWS_FLUSH_INTERVAL', 30)
+        threshold = getattr(settings, 'PRODUCT_VIEWS_FLUSH_THRESHOLD', 500)
+        due = (
+            time.monotonic() - _last_flush >= interval
+            or _pending_total >= threshold
+        )
+    if due:
+        flush_views()
+
+
+def _group_by_count(counts):
+    """Invert {id: n} to {n: [ids]} so each distinct increment is one UPDATE"""
+    groups = defaultdict(list)
+    for pk, count in counts.items():
+        groups[count].append(pk)
+    return groups
+
+
+def _requeue(batch):
+    """Put views that could not be written back into the buffer"""
+    global _pending_total
+    with _lock:
+        _pending.update(batch)
+        _pending_total += sum(batch.values())
+
+
+def _add_daily_views(date, counts):
+    """Add counts to the date's rollup rows, creating missing rows, in one statement"""
+    table = ProductViewDaily._meta.db_table
+    with connection.cursor() as cursor:
+        # An upsert, so two workers creating the same row cannot collide
+        cursor.executemany(
+            f"INSERT INTO {table} (product_id, date, views) VALUES (%s, %s, %s) "
+            f"ON CONFLICT (product_id, date) DO UPDATE SET views = {table}.views + excluded.views",
+            [(product_id, date, count) for product_id, count in counts.items()],
+        )
+
+
+def flush_views():
+    """
+    Write buffered views to Product.views and the daily rollup table.
+
+    Returns the number of views written. Views for products deleted in the
+    meantime are dropped. If the database write fails the views go back
+    into the buffer for the next flush, so a page view never fails because
+    of the counter.
+    """
+    global _last_flush, _pending_total
+    with _lock:
+        batch = dict(_pending)
+        _pending.clear()
+        _pending_total = 0
+        _last_flush = time.monotonic()
+    if not batch:
+        return 0
+
+    try:
+        product_ids = {product_id for product_id, date in batch}
+        existing = set(Product.objects.filter(pk__in=product_ids).values_list('pk', flat=True))
+        batch = {key: count for key, count in batch.items() if key[0] in existing}
+
+        totals = Counter()
+        by_date = defaultdict(dict)
+        for (product_id, date), count in batch.items():
+            totals[product_id] += count
+            by_date[date][product_id] = count
+
+        with transaction.atomic():
+            for count, ids in _group_by_count(totals).items():
+                Product.objects.filter(pk__in=ids).update(views=F('views') + count)
+            for date, counts in by_date.items():
+                _add_daily_views(date, counts)
+    except Exception:
+        logger.exception("Could not write %d buffered product views; will retry", sum(batch.values()))
+        _requeue(batch)
+        return 0
+
+    return sum(batch.values())
+
+
+@atexit.register
+def _flush_on_exit():
+    try:
+        flush_views()
+    except Exception:
+        # The database may already be gone during interpreter shutdown
+        pass
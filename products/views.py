@@ -1,76 +1,108 @@
+from django.conf import settings
 from django.shortcuts import render, get_object_or_404
 from django.http import JsonResponse
-from django.db.models import Q
 from .models import Product, Category
+from .autocomplete import get_index as get_autocomplete_index
+from .category_cache import get_descendant_ids
+from core.conditional import conditional_allowed, latest_changes, make_etag, not_modified, set_validators
+from core.page_cache import cached_page
+from core.search import filter_products
+from .pagination import paginate_keyset
+from .view_counts import record_view
 import logging
 
 logger = logging.getLogger(__name__)
 
 
+@cached_page('products.Product', 'products.Category', query=('q', 'after', 'before'))
 def product_list(request, slug=None):
-    """Product listing with category filtering"""
-    print(f"\n{'='*60}")
-    print(f"📝 PRODUCT LIST VIEW CALLED")
-    print(f"{'='*60}")
-    print(f"📌 Received slug parameter: {slug}")
-    print(f"📌 Request path: {request.path}")
-    print(f"📌 Request GET params: {request.GET}")
-    
+    """Product listing with category filtering and cursor pagination"""
     products = Product.objects.filter(is_active=True)
     categories = Category.objects.filter(is_active=True, parent=None)
     selected_category = None
 
-    print(f"✅ Total active products: {products.count()}")
-    print(f"✅ Total parent categories: {categories.count()}")
-
     # Filter by category if slug is provided
     if slug:
-        print(f"\n🔍 FILTERING BY CATEGORY: {slug}")
         selected_category = get_object_or_404(Category, slug=slug, is_active=True)
-        print(f"   ✅ Found category: {selected_category.name} (ID: {selected_category.id})")
-        
-        # Get products from selected category only
-        products = products.filter(category=selected_category)
-        print(f"   ✅ Products after filter: {products.count()}")
-        for p in products:
-            print(f"      - {p.name}")
-    else:
-        print(f"\n⚪ NO CATEGORY FILTER - showing all products")
+        # Include products from every subcategory
+        products = products.filter(category_id__in=get_descendant_ids(selected_category))
 
     # Search functionality
     search_query = request.GET.get('q', '')
     if search_query:
-        print(f"\n🔎 SEARCH QUERY: '{search_query}'")
-        products = products.filter(
-            Q(name__icontains=search_query) |
-            Q(description__icontains=search_query) |
-            Q(short_description__icontains=search_query)
-        )
-        print(f"   ✅ Products after search: {products.count()}")
+        products = filter_products(products, search_query)
+
+    page_size = getattr(settings, 'PRODUCTS_PER_PAGE', 24)
+    page = paginate_keyset(
+        products,
+        page_size,
+        after=request.GET.get('after'),
+        before=request.GET.get('before'),
+    )
+    logger.debug("Product list %s: %d products on page", request.path, len(page))
 
     context = {
-        'products': products,
+        'products': page.object_list,
+        'page': page,
+        'total_count': products.count(),
+        'next_url': _page_url(request, 'after', page.next_cursor),
+        'previous_url': _page_url(request, 'before', page.previous_cursor),
         'categories': categories,
         'selected_category': selected_category,
         'search_query': search_query,
     }
-    
-    print(f"\n📤 RENDERING TEMPLATE WITH:")
-    print(f"   - Total products: {context['products'].count()}")
-    print(f"   - Selected category: {context['selected_category'].name if context['selected_category'] else 'None'}")
-    print(f"   - Search query: '{search_query}'")
-    print(f"{'='*60}\n")
-    
     return render(request, 'products/product_list.html', context)
 
 
+def _page_url(request, direction, cursor):
+    """Build a link to another page, keeping the current query string"""
+    if not cursor:
+        return None
+    params = request.GET.copy()
+    params.pop('after', None)
+    params.pop('before', None)
+    params[direction] = cursor
+    return f"{request.path}?{params.urlencode()}"
+
+
+def _product_detail_state(slug):
+    """(product id, ETag) for a product page from one aggregate query, or None"""
+    product = Product.objects.filter(slug=slug, is_active=True)
+    related = Product.objects.filter(is_active=True, category__products__slug=slug).exclude(slug=slug)
+    (product_id, found), (updated_at, _), (category_updated_at, _), related_state = latest_changes(
+        (product, 'pk'), (product, 'updated_at'), (product, 'category__updated_at'), (related, 'updated_at'),
+    )
+    if not found:
+        return None
+    return product_id, make_etag('product', product_id, updated_at, category_updated_at, related_state)
+
+
 def product_detail(request, slug):
     """Product detail page"""
-    product = get_object_or_404(Product, slug=slug, is_active=True)
+    etag = product_id = None
+    if conditional_allowed(request):
+        state = _product_detail_state(slug)
+        if state is not None:
+            product_id, etag = state
+            response = not_modified(request, etag)
+            if response is not None:
+                record_view(product_id)
+                return response
 
-    # Increment view count
-    product.views += 1
-    product.save(update_fields=['views'])
+    if product_id is None:
+        product_id = get_object_or_404(Product.objects.values_list('pk', flat=True), slug=slug, is_active=True)
+
+    # Buffered; written to the database in batches. Counted here rather than
+    # in the page view so that cached pages are counted too.
+    record_view(product_id)
+
+    response = _product_page(request, slug)
+    return set_validators(response, etag) if etag else response
+
+
+@cached_page('products.Product', 'products.Category', 'products.ProductImage', 'products.ProductAttribute')
+def _product_page(request, slug):
+    product = get_object_or_404(Product, slug=slug, is_active=True)
 
     # Get related products from same category
     related_products = Product.objects.filter(
@@ -86,16 +118,16 @@ def product_detail(request, slug):
 
 
 def product_search(request):
-    """AJAX product search for autocomplete"""
+    """AJAX product search for autocomplete, answered from the in-memory index"""
     query = request.GET.get('q', '')
     products = []
 
     if query and len(query) >= 2:
-        products_qs = Product.objects.filter(
-            Q(name__icontains=query) | Q(sku__icontains=query),
-            is_active=True
-        )[:10]
-
-        products = [{'id': p.id, 'name': p.name, 'sku': p.sku} for p in products_qs]
+        try:
+            limit = int(request.GET.get('limit', 10))
+        except ValueError:
+            limit = 10
+        limit = max(1, min(limit, 50))
+        products = get_autocomplete_index().search(query, limit)
 
     return JsonResponse(products, safe=False)
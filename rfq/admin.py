@@ -2,6 +2,17 @@ from django.contrib import admin
 from .models import RFQRequest, RFQItem
 
 
+def make_set_status_action(status, label):
+    """Admin action moving the selected RFQs to one status in a single UPDATE"""
+    @admin.action(description=f"Set status to {label}")
+    def set_status(modeladmin, request, queryset):
+        count = queryset.set_status(status)
+        modeladmin.message_user(request, f"{count} RFQ request(s) set to {label}; customers will be notified.")
+
+    set_status.__name__ = f"set_status_{status}"
+    return set_status
+
+
 class RFQItemInline(admin.TabularInline):
     model = RFQItem
     extra = 0
@@ -16,6 +27,8 @@ class RFQRequestAdmin(admin.ModelAdmin):
     list_editable = ['status']
     inlines = [RFQItemInline]
     readonly_fields = ['created_at', 'updated_at']
+    list_select_related = ['product']
+    actions = [make_set_status_action(status, label) for status, label in RFQRequest.STATUS_CHOICES]
 
     fieldsets = (
         ('Customer Information', {
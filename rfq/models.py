@@ -1,5 +1,30 @@
-from django.db import models
+from django.db import models, transaction
+from django.utils import timezone
 from products.models import Product
+from .notifications import queue_status_change_emails
+
+
+class RFQRequestQuerySet(models.QuerySet):
+    def set_status(self, status):
+        """
+        Move every RFQ in the queryset to status with a single UPDATE.
+
+        Customers whose RFQs actually changed are notified, one email per
+        address. Returns the number of RFQs changed.
+        """
+        with transaction.atomic():
+            changed = list(self.exclude(status=status).select_related(None).only(
+                'id', 'name', 'email', 'status', 'admin_notes',
+            ))
+            if not changed:
+                return 0
+            RFQRequest.objects.filter(pk__in=[rfq.pk for rfq in changed]).update(
+                status=status, updated_at=timezone.now(),
+            )
+            for rfq in changed:
+                rfq.status = status
+            queue_status_change_emails(changed)
+        return len(changed)
 
 
 class RFQRequest(models.Model):
@@ -38,6 +63,8 @@ class RFQRequest(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = RFQRequestQuerySet.as_manager()
+
     class Meta:
         verbose_name = "RFQ Request"
         verbose_name_plural = "RFQ Requests"
@@ -48,6 +75,56 @@ class RFQRequest(models.Model):
             return f"RFQ #{self.id} - {self.name} - {self.product.name}"
         return f"RFQ #{self.id} - {self.name} - General Inquiry"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._take_snapshot()
+        return instance
+
+    def _take_snapshot(self, attnames=None):
+        """Remember field values as stored, so changes can be detected without a query"""
+        values = {
+            field.attname: self.__dict__[field.attname]
+            for field in self._meta.concrete_fields
+            if field.attname in self.__dict__ and (attnames is None or field.attname in attnames)
+        }
+        if attnames is None:
+            self._loaded_values = values
+        else:
+            self._loaded_values = {**getattr(self, '_loaded_values', {}), **values}
+
+    @property
+    def changed_fields(self):
+        """
+        Names of fields changed since the row was loaded or last saved.
+
+        During a save(update_fields=...) only the fields being written count.
+        """
+        loaded = getattr(self, '_loaded_values', None)
+        if loaded is None:
+            return set()
+        changed = {name for name, value in loaded.items() if self.__dict__.get(name, value) != value}
+        saving = getattr(self, '_saving_attnames', None)
+        return changed if saving is None else changed & saving
+
+    def loaded_value(self, attname, default=None):
+        """Value of a field as it was when the row was loaded or last saved"""
+        return getattr(self, '_loaded_values', {}).get(attname, default)
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        saving = None
+        if update_fields is not None:
+            saving = {self._meta.get_field(name).attname for name in update_fields}
+        self._saving_attnames = saving
+        try:
+            super().save(*args, **kwargs)
+        finally:
+            self._saving_attnames = None
+        # post_save receivers have seen the changes; start tracking afresh,
+        # keeping unsaved changes to fields left out of update_fields
+        self._take_snapshot(saving)
+
 
 class RFQItem(models.Model):
     """Multiple items in a single RFQ"""
@@ -0,0 +1,67 @@
+import logging
+from collections import defaultdict
+
+from core.outbox import queue_email
+
+logger = logging.getLogger(__name__)
+
+CLOSING_LINES = [
+    "",
+    "If you have any questions, feel free to reply to this email.",
+    "Thank you for choosing Kiya Green.",
+]
+
+
+def _single_status_email(rfq):
+    subject = f"Your quotation status changed to {rfq.get_status_display()}"
+    message_lines = [
+        f"Hello {rfq.name},",
+        "",
+        f"We have updated the status of your quotation request (ID: {rfq.id}).",
+        f"New status: {rfq.get_status_display()}",
+    ]
+
+    if rfq.admin_notes:
+        message_lines.extend(["", "Notes from our team:", rfq.admin_notes])
+
+    return subject, message_lines + CLOSING_LINES
+
+
+def _merged_status_email(rfqs):
+    subject = f"Status update for {len(rfqs)} of your quotation requests"
+    message_lines = [
+        f"Hello {rfqs[0].name},",
+        "",
+        "We have updated the status of the following quotation requests:",
+    ]
+    for rfq in rfqs:
+        message_lines.extend(["", f"Request ID {rfq.id}: {rfq.get_status_display()}"])
+        if rfq.admin_notes:
+            message_lines.append(f"Notes from our team: {rfq.admin_notes}")
+
+    return subject, message_lines + CLOSING_LINES
+
+
+def queue_status_change_emails(rfqs):
+    """
+    Queue status change notifications, one email per customer address.
+
+    A customer with several changed RFQs gets a single combined email. The
+    queued emails are later delivered in batches over one connection by
+    core.outbox. Returns the number of emails queued.
+    """
+    by_email = defaultdict(list)
+    for rfq in rfqs:
+        by_email[rfq.email.lower()].append(rfq)
+
+    for customer_rfqs in by_email.values():
+        if len(customer_rfqs) == 1:
+            subject, message_lines = _single_status_email(customer_rfqs[0])
+        else:
+            subject, message_lines = _merged_status_email(customer_rfqs)
+        queue_email(subject, "\n".join(message_lines), [customer_rfqs[0].email], kind='rfq_status_change')
+        logger.info(
+            f"RFQ status change email queued for {customer_rfqs[0].email} "
+            f"for RFQ IDs {', '.join(str(rfq.id) for rfq in customer_rfqs)}"
+        )
+    return len(by_email)
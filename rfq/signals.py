@@ -1,28 +1,15 @@
 import logging
 from django.conf import settings
-from django.core.mail import send_mail
-from django.db.models.signals import post_save, pre_save
+from django.db.models.signals import post_save
 from django.dispatch import receiver
 
+from core.outbox import queue_email
 from .models import RFQRequest
+from .notifications import queue_status_change_emails
 
 logger = logging.getLogger(__name__)
 
 
-@receiver(pre_save, sender=RFQRequest)
-def store_previous_status(sender, instance, **kwargs):
-    """Capture existing status so we can detect changes in post_save."""
-    if not instance.pk:
-        instance._previous_status = None
-        return
-
-    try:
-        previous = sender.objects.get(pk=instance.pk)
-        instance._previous_status = previous.status
-    except sender.DoesNotExist:
-        instance._previous_status = None
-
-
 @receiver(post_save, sender=RFQRequest)
 def send_rfq_confirmation_email(sender, instance, created, **kwargs):
     """Send confirmation email to client when new RFQ is created."""
@@ -43,19 +30,8 @@ def send_rfq_confirmation_email(sender, instance, created, **kwargs):
         "Thank you for choosing Kiya Green.",
     ]
 
-    from_email = getattr(settings, "DEFAULT_FROM_EMAIL", "noreply@kyagreen.com")
-
-    try:
-        send_mail(
-            subject,
-            "\n".join(message_lines),
-            from_email,
-            [instance.email],
-            fail_silently=False,
-        )
-        logger.info(f"RFQ confirmation email sent to {instance.email} for RFQ ID {instance.id}")
-    except Exception as e:
-        logger.error(f"Failed to send RFQ confirmation email to {instance.email}: {str(e)}")
+    queue_email(subject, "\n".join(message_lines), [instance.email], kind='rfq_confirmation')
+    logger.info(f"RFQ confirmation email queued for {instance.email} for RFQ ID {instance.id}")
 
 
 @receiver(post_save, sender=RFQRequest)
@@ -64,42 +40,11 @@ def send_status_change_email(sender, instance, created, **kwargs):
     if created:
         return
 
-    previous_status = getattr(instance, "_previous_status", None)
-    if not previous_status or previous_status == instance.status:
+    # Compared with the value captured when the row was loaded; no extra query
+    if 'status' not in instance.changed_fields:
         return
 
-    subject = f"Your quotation status changed to {instance.get_status_display()}"
-    message_lines = [
-        f"Hello {instance.name},",
-        "",
-        f"We have updated the status of your quotation request (ID: {instance.id}).",
-        f"New status: {instance.get_status_display()}",
-    ]
-
-    if instance.admin_notes:
-        message_lines.extend(["", "Notes from our team:", instance.admin_notes])
-
-    message_lines.extend(
-        [
-            "",
-            "If you have any questions, feel free to reply to this email.",
-            "Thank you for choosing Kiya Green.",
-        ]
-    )
-
-    from_email = getattr(settings, "DEFAULT_FROM_EMAIL", "noreply@kyagreen.com")
-
-    try:
-        send_mail(
-            subject,
-            "\n".join(message_lines),
-            from_email,
-            [instance.email],
-            fail_silently=False,
-        )
-        logger.info(f"RFQ status change email sent to {instance.email} for RFQ ID {instance.id}")
-    except Exception as e:
-        logger.error(f"Failed to send RFQ status change email to {instance.email}: {str(e)}")
+    queue_status_change_emails([instance])
 
 
 @receiver(post_save, sender=RFQRequest)
@@ -130,16 +75,5 @@ def notify_admin_new_rfq(sender, instance, created, **kwargs):
         f"View in admin: {instance.id}",
     ]
 
-    from_email = getattr(settings, "DEFAULT_FROM_EMAIL", "noreply@kyagreen.com")
-
-    try:
-        send_mail(
-            subject,
-            "\n".join(message_lines),
-            from_email,
-            [admin_email],
-            fail_silently=False,
-        )
-        logger.info(f"Admin notification email sent for new RFQ ID {instance.id}")
-    except Exception as e:
-        logger.error(f"Failed to send admin notification email for RFQ ID {instance.id}: {str(e)}")
+    queue_email(subject, "\n".join(message_lines), [admin_email], kind='rfq_admin_notification')
+    logger.info(f"Admin notification email queued for new RFQ ID {instance.id}")
@@ -1,3 +1,156 @@
-from django.test import TestCase
+from django.contrib.auth.models import User
+from django.core import mail
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+from core.models import OutboxEmail
+from core.outbox import drain
+from core.testing import CountingEmailBackend
+from rfq.models import RFQRequest
 
-# Create your tests here.
+
+@override_settings(EMAIL_OUTBOX_WORKER='command', ADMIN_EMAIL='admin@example.com')
+class RFQEmailTest(TestCase):
+    """Tests for RFQ notification emails"""
+
+    def setUp(self):
+        """Create test data"""
+        self.client = Client()
+
+    def _submit(self):
+        return self.client.post(reverse('rfq:create'), {
+            'name': 'Jane Buyer',
+            'email': 'jane@example.com',
+            'phone': '+123',
+            'message': 'Need a quote',
+            'quantity': 5,
+        })
+
+    def test_create_queues_emails_without_sending(self):
+        """Test that submitting an RFQ queues both emails instead of sending them"""
+        response = self._submit()
+        self.assertRedirects(response, reverse('rfq:success'))
+        self.assertEqual(len(mail.outbox), 0)
+        kinds = set(OutboxEmail.objects.values_list('kind', flat=True))
+        self.assertEqual(kinds, {'rfq_confirmation', 'rfq_admin_notification'})
+
+    def test_queued_emails_delivered_by_worker(self):
+        """Test that draining the outbox delivers confirmation and admin emails"""
+        self._submit()
+        drain()
+        recipients = sorted(message.to[0] for message in mail.outbox)
+        self.assertEqual(recipients, ['admin@example.com', 'jane@example.com'])
+
+    def test_status_change_queues_email(self):
+        """Test that changing the status queues a notification"""
+        rfq = RFQRequest.objects.create(name='Jane', email='jane@example.com', phone='1', message='Hi')
+        rfq.status = 'quoted'
+        rfq.save()
+        email = OutboxEmail.objects.get(kind='rfq_status_change')
+        self.assertIn('Quoted', email.subject)
+
+
+@override_settings(EMAIL_OUTBOX_WORKER='command')
+class RFQChangeTrackingTest(TestCase):
+    """Tests for load-time change tracking on RFQRequest"""
+
+    def setUp(self):
+        """Create test data"""
+        for i in range(3):
+            RFQRequest.objects.create(name=f'Buyer {i}', email=f'b{i}@example.com', phone='1', message='Hi')
+
+    def test_changed_fields(self):
+        """Test that changed_fields lists only modified fields"""
+        rfq = RFQRequest.objects.first()
+        self.assertEqual(rfq.changed_fields, set())
+        rfq.status = 'quoted'
+        rfq.admin_notes = 'Sent price list'
+        self.assertEqual(rfq.changed_fields, {'status', 'admin_notes'})
+        self.assertEqual(rfq.loaded_value('status'), 'pending')
+
+    def test_save_resets_tracking(self):
+        """Test that saving starts tracking from the saved values"""
+        rfq = RFQRequest.objects.first()
+        rfq.status = 'quoted'
+        rfq.save()
+        self.assertEqual(rfq.changed_fields, set())
+        self.assertEqual(rfq.loaded_value('status'), 'quoted')
+
+    def test_partial_save_ignores_unsaved_status(self):
+        """Test that update_fields limits which changes are reported and emailed"""
+        rfq = RFQRequest.objects.first()
+        OutboxEmail.objects.all().delete()
+        rfq.status = 'quoted'
+        rfq.admin_notes = 'Sent price list'
+        rfq.save(update_fields=['admin_notes'])
+        self.assertFalse(OutboxEmail.objects.exists())
+        self.assertEqual(rfq.changed_fields, {'status'})
+        rfq.save(update_fields=['status'])
+        self.assertEqual(OutboxEmail.objects.filter(kind='rfq_status_change').count(), 1)
+
+    def test_status_saves_do_not_reread_rows(self):
+        """Test that saving loaded rows costs one UPDATE plus the queued email each"""
+        rfqs = list(RFQRequest.objects.all())
+        OutboxEmail.objects.all().delete()
+        with self.assertNumQueries(2 * len(rfqs)):
+            for rfq in rfqs:
+                rfq.status = 'in_progress'
+                rfq.save()
+        self.assertEqual(OutboxEmail.objects.filter(kind='rfq_status_change').count(), 3)
+
+    def test_unchanged_status_sends_nothing(self):
+        """Test that saving other fields does not notify the customer"""
+        rfq = RFQRequest.objects.first()
+        OutboxEmail.objects.all().delete()
+        rfq.admin_notes = 'Internal only'
+        rfq.save()
+        self.assertFalse(OutboxEmail.objects.exists())
+
+
+@override_settings(EMAIL_OUTBOX_WORKER='command')
+class RFQBulkStatusTest(TestCase):
+    """Tests for bulk RFQ status updates"""
+
+    def setUp(self):
+        """Create test data"""
+        self.jane = [
+            RFQRequest.objects.create(name='Jane', email='jane@example.com', phone='1', message='Hi')
+            for _ in range(2)
+        ]
+        self.bob = RFQRequest.objects.create(name='Bob', email='bob@example.com', phone='1', message='Hi')
+        self.done = RFQRequest.objects.create(
+            name='Ann', email='ann@example.com', phone='1', message='Hi', status='quoted'
+        )
+        OutboxEmail.objects.all().delete()
+
+    def test_set_status_updates_and_merges_emails(self):
+        """Test that one UPDATE moves the rows and each customer gets one email"""
+        count = RFQRequest.objects.all().set_status('quoted')
+        self.assertEqual(count, 3)
+        self.assertFalse(RFQRequest.objects.exclude(status='quoted').exists())
+
+        emails = {email.recipients[0]: email for email in OutboxEmail.objects.all()}
+        self.assertEqual(set(emails), {'jane@example.com', 'bob@example.com'})
+        self.assertIn(str(self.jane[0].id), emails['jane@example.com'].body)
+        self.assertIn(str(self.jane[1].id), emails['jane@example.com'].body)
+        self.assertIn('Quoted', emails['bob@example.com'].subject)
+
+    @override_settings(EMAIL_BACKEND='core.testing.CountingEmailBackend')
+    def test_merged_emails_sent_over_one_connection(self):
+        """Test that draining the outbox delivers every notification over one connection"""
+        RFQRequest.objects.all().set_status('completed')
+        CountingEmailBackend.opened = 0
+        self.assertEqual(drain(), (3, 0))
+        self.assertEqual(len(mail.outbox), 3)
+        self.assertEqual(CountingEmailBackend.opened, 1)
+
+    def test_admin_action(self):
+        """Test the bulk set-status admin action"""
+        admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        self.client.force_login(admin)
+        response = self.client.post(reverse('admin:rfq_rfqrequest_changelist'), {
+            'action': 'set_status_in_progress',
+            '_selected_action': [rfq.pk for rfq in self.jane],
+        })
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(RFQRequest.objects.filter(status='in_progress').count(), 2)
+        self.assertEqual(OutboxEmail.objects.count(), 1)
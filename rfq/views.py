@@ -1,5 +1,6 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
+from django.db import transaction
 from products.models import Product
 from .forms import RFQRequestForm
 
@@ -9,7 +10,9 @@ def rfq_create(request):
     if request.method == 'POST':
         form = RFQRequestForm(request.POST, request.FILES)
         if form.is_valid():
-            rfq = form.save()
+            # The RFQ and its queued emails are committed together
+            with transaction.atomic():
+                rfq = form.save()
             messages.success(request, 'Your request for quotation has been submitted successfully! We will contact you soon.')
             return redirect('rfq:success')
     else:
@@ -29,7 +32,9 @@ def rfq_create_for_product(request, product_id):
     if request.method == 'POST':
         form = RFQRequestForm(request.POST, request.FILES, product_id=product_id)
         if form.is_valid():
-            rfq = form.save()
+            # The RFQ and its queued emails are committed together
+            with transaction.atomic():
+                rfq = form.save()
             messages.success(request, f'Your request for quotation for "{product.name}" has been submitted successfully!')
             return redirect('rfq:success')
     else:
@@ -0,0 +1,35 @@
+# Generated by Django 4.2.30 on 2026-10-18 08:59
+
+from django.db import migrations, models
+
+from core.richtext import rebuild_rich_text
+
+
+def fill_rich_text(apps, schema_editor):
+    rebuild_rich_text(apps.get_model("services", "Service").objects.all(), ("description",))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("services", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="service",
+            name="body_text",
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name="service",
+            name="description_html",
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name="service",
+            name="excerpt",
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.RunPython(fill_rich_text, migrations.RunPython.noop),
+    ]
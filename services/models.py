@@ -1,14 +1,21 @@
 from django.db import models
 from django.utils.text import slugify
 from ckeditor.fields import RichTextField
+from core.richtext import update_rich_text
 
 
 class Service(models.Model):
     """Services offered by KiyaGreen"""
+    RICH_TEXT_FIELDS = ('description',)
+
     title = models.CharField(max_length=200)
     slug = models.SlugField(unique=True, blank=True)
     short_description = models.TextField(max_length=300)
     description = RichTextField()
+    # Derived from the fields above on save (core.richtext)
+    description_html = models.TextField(blank=True, editable=False)
+    body_text = models.TextField(blank=True, editable=False)
+    excerpt = models.TextField(blank=True, editable=False)
     icon = models.CharField(max_length=100, blank=True, help_text="CSS icon class (e.g., bi-truck, bi-gear)")
     image = models.ImageField(upload_to='services/', blank=True, null=True)
     is_active = models.BooleanField(default=True)
@@ -27,6 +34,7 @@ class Service(models.Model):
     def save(self, *args, **kwargs):
         if not self.slug:
             self.slug = slugify(self.title)
+        kwargs['update_fields'] = update_rich_text(self, kwargs.get('update_fields'))
         super().save(*args, **kwargs)
 
 
@@ -1,7 +1,10 @@
 from django.shortcuts import render, get_object_or_404
+from core.conditional import conditional_page, latest_changes, make_etag
+from core.page_cache import cached_page
 from .models import Service
 
 
+@cached_page('services.Service')
 def service_list(request):
     """Services listing page"""
     services = Service.objects.filter(is_active=True)
@@ -12,6 +15,16 @@ def service_list(request):
     return render(request, 'services/service_list.html', context)
 
 
+def _service_detail_etag(request, slug):
+    service = Service.objects.filter(slug=slug, is_active=True)
+    (service_id, found), (updated_at, _) = latest_changes((service, 'pk'), (service, 'updated_at'))
+    if not found:
+        return None
+    return make_etag('service', service_id, updated_at)
+
+
+@conditional_page(_service_detail_etag)
+@cached_page('services.Service', 'services.ServiceFeature')
 def service_detail(request, slug):
     """Service detail page"""
     service = get_object_or_404(Service, slug=slug, is_active=True)
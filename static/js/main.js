@@ -101,8 +101,17 @@ $(document).ready(function() {
 
     // Image gallery for product detail
     $('.gallery-thumbnail').on('click', function() {
-        var newSrc = $(this).attr('src');
-        $('#main-product-image').attr('src', newSrc);
+        var thumbnail = $(this);
+        var mainImage = $('#main-product-image');
+        mainImage.attr('src', thumbnail.attr('src'));
+        mainImage.attr('srcset', thumbnail.attr('srcset') || null);
+        // Resized WebP variants, when the images have them
+        var webp = thumbnail.siblings('source').attr('srcset');
+        if (webp) {
+            mainImage.siblings('source').attr('srcset', webp);
+        } else {
+            mainImage.siblings('source').remove();
+        }
         $('.gallery-thumbnail').removeClass('active');
         $(this).addClass('active');
     });